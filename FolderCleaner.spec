@@ -1,9 +1,15 @@
 # -*- mode: python ; coding: utf-8 -*-
+import sys
 from PyInstaller.utils.hooks import collect_all
 
+# 按需导入的模块列表与 build.py 共用，新增按需导入的模块时只需修改一处
+sys.path.insert(0, SPECPATH)
+from build import LAZY_MODULES
+
 datas = [('README.md', '.')]
 binaries = []
-hiddenimports = ['customtkinter', 'concurrent.futures', 'queue', 'subprocess', 're', 'os', 'time', 'tkinter', 'tkinter.messagebox', 'tkinter.filedialog']
+hiddenimports = ['customtkinter', 'gui', 'cli', 'sqlite3', 'concurrent.futures', 'queue', 'subprocess', 're', 'os', 'time', 'tkinter', 'tkinter.messagebox', 'tkinter.filedialog']
+hiddenimports += LAZY_MODULES
 tmp_ret = collect_all('customtkinter')
 datas += tmp_ret[0]; binaries += tmp_ret[1]; hiddenimports += tmp_ret[2]
 
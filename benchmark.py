@@ -0,0 +1,705 @@
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from scan_engine import get_folder_size, human_readable_size, scan_tree
+
+
+# 生成合成目录树：top个顶层文件夹，每层width个子文件夹，共depth层，文件平均分布到所有目录
+# file_size(i) 为第i个文件的大小，超过1KB的文件用truncate生成稀疏文件，不实际写入数据
+def make_tree(root, files, top=20, width=4, depth=4, file_size=None):
+    dirs = []
+    level = []
+    for i in range(top):
+        path = os.path.join(root, f"top_{i:03d}")
+        os.makedirs(path)
+        level.append(path)
+    dirs.extend(level)
+    for _ in range(depth - 1):
+        next_level = []
+        for parent in level:
+            for j in range(width):
+                path = os.path.join(parent, f"d{j}")
+                os.mkdir(path)
+                next_level.append(path)
+        dirs.extend(next_level)
+        level = next_level
+
+    payload = b"x" * 1024
+    for i in range(files):
+        path = os.path.join(dirs[i % len(dirs)], f"f{i}.bin")
+        size = file_size(i) if file_size is not None else i % 1024
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT, 0o644)
+        try:
+            if size > len(payload):
+                os.truncate(fd, size)
+            else:
+                os.write(fd, payload[:size])
+        finally:
+            os.close(fd)
+    return len(dirs)
+
+
+# 测试套件的目录树形状: 名称 -> (说明, make_tree参数, 文件数占 --files 的比例)
+SHAPES = {
+    "balanced": ("20个顶层文件夹，4叉4层", dict(top=20, width=4, depth=4), 1),
+    "wide": ("2000个顶层文件夹，没有子文件夹", dict(top=2000, width=0, depth=1), 1),
+    "deep": ("4条100层深的单链", dict(top=4, width=1, depth=100), 1),
+    "tiny": ("1460个目录，文件不超过64字节", dict(top=20, width=8, depth=3, file_size=lambda i: i % 64), 1),
+    "huge": ("少量256MB的稀疏大文件", dict(top=10, width=1, depth=2, file_size=lambda i: 256 * 1024 * 1024),
+             0.001),
+}
+STAGES = ("get_folder_size", "scan", "sort", "delete")
+
+
+# 当前进程的峰值常驻内存（字节），不支持的平台返回0
+def peak_rss():
+    try:
+        import resource
+    except ImportError:
+        import ctypes
+        from ctypes import wintypes
+
+        class Counters(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                        ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaNonPagedPoolUsage", ctypes.c_size_t), ("PagefileUsage", ctypes.c_size_t),
+                        ("PeakPagefileUsage", ctypes.c_size_t)]
+        counters = Counters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return 0
+        return counters.PeakWorkingSetSize
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage if sys.platform == "darwin" else usage * 1024  # Linux下单位为KB
+
+
+# 生成用于重复文件测试的目录树，dup_ratio比例的文件是之前某个文件的副本
+def make_dupe_tree(root, files, dup_ratio, seed=0):
+    rng = random.Random(seed)
+    originals = []
+    for i in range(files):
+        folder = os.path.join(root, f"dir_{i % 50:02d}")
+        os.makedirs(folder, exist_ok=True)
+        if originals and rng.random() < dup_ratio:
+            data = rng.choice(originals)
+        else:
+            data = rng.randbytes(int(2 ** rng.uniform(10, 20)))  # 1KB~1MB
+            originals.append(data)
+        with open(os.path.join(folder, f"file_{i}.bin"), "wb") as f:
+            f.write(data)
+
+
+def _timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def bench_walk(args):
+    def legacy(root):
+        with os.scandir(root) as entries:
+            subfolders = [entry.path for entry in entries if entry.is_dir()]
+        return {path: get_folder_size(path) for path in subfolders}
+
+    def single_pass(root):
+        return {path: size for path, size, _ in scan_tree(root).top_level()}
+
+    legacy_time, legacy_sizes = _timed(legacy, args.root)
+    walk_time, walk_sizes = _timed(single_pass, args.root)
+
+    print(f"get_folder_size 逐个文件夹: {legacy_time:.3f}s")
+    print(f"scan_tree 单次遍历:        {walk_time:.3f}s")
+    print(f"加速比: {legacy_time / walk_time:.2f}x")
+    if legacy_sizes != walk_sizes:
+        print("警告: 两种方法的结果不一致")
+
+
+# 比较单线程、线程池和进程池扫描在不同工作者数量下的耗时
+def bench_backends(args):
+    serial_time, serial = _timed(scan_tree, args.root)
+    print(f"{'serial':<12}: {serial_time:.3f}s")
+    for backend in ("thread", "process"):
+        for workers in args.workers:
+            elapsed, table = _timed(scan_tree, args.root, backend=backend, workers=workers)
+            note = "" if table.sizes[0] == serial.sizes[0] else "  (结果不一致!)"
+            label = f"{backend} x{workers}"
+            print(f"{label:<12}: {elapsed:.3f}s  "
+                  f"加速比 {serial_time / elapsed:.2f}x{note}")
+
+
+# 在本地目录上注入延迟，模拟网络共享，比较单线程和异步网络扫描
+def bench_network(args):
+    from network_scan import list_dir, scan_tree_network
+
+    def serial_with_latency(root):
+        stack = [root]
+        while stack:
+            path = stack.pop()
+            try:
+                _, _, children, _, _ = list_dir(path, args.latency)
+            except OSError:
+                continue
+            stack.extend(os.path.join(path, name) for name, _ in children)
+
+    serial_time, _ = _timed(serial_with_latency, args.root)
+    network_time, table = _timed(scan_tree_network, args.root, latency=args.latency)
+    print(f"注入延迟 {args.latency * 1000:.0f}ms/目录，共 {len(table)} 个目录")
+    print(f"逐个目录串行: {serial_time:.3f}s")
+    print(f"异步网络扫描: {network_time:.3f}s  加速比 {serial_time / network_time:.2f}x")
+
+
+# 重复文件查找：无缓存和有缓存两种情况
+def bench_dupes(args):
+    from duplicates import HashCache, find_duplicates
+
+    if args.generated:
+        shutil.rmtree(args.root)
+        os.makedirs(args.root)
+        make_dupe_tree(args.root, args.files, args.dup_ratio)
+    cache = HashCache(":memory:")
+    cold, groups = _timed(find_duplicates, args.root, cache=cache)
+    warm, _ = _timed(find_duplicates, args.root, cache=cache)
+    total = sum(group.reclaimable for group in groups)
+    print(f"{len(groups)} 组重复文件，可释放 {total / 1024 / 1024:.1f} MB")
+    print(f"首次查找: {cold:.3f}s，使用哈希缓存: {warm:.3f}s")
+
+
+def _subfolders(root):
+    with os.scandir(root) as entries:
+        return [entry.path for entry in entries if entry.is_dir(follow_symlinks=False)]
+
+
+# 与图形界面 _scan_folders 相同的无界面扫描：逐个顶层文件夹回报大小并写入结果模型
+def _headless_scan(root, backend):
+    from result_model import ResultModel
+
+    model = ResultModel()
+    subfolders = _subfolders(root)
+    model.reset(subfolders)
+    rows = {path: row for row, path in enumerate(subfolders)}
+
+    def on_subtree_done(path, size, files):
+        row = rows.get(path)
+        if row is not None:
+            model.set_size(row, size, files)
+
+    table = scan_tree(root, on_subtree_done=on_subtree_done, backend=backend, on_progress=lambda *args: None)
+    return table, model
+
+
+# 在子进程中运行的单个测试阶段，返回 (计时的耗时, 处理的项数)；在子进程中运行才能分别得到各阶段的峰值内存
+def run_stage(stage, root, backend):
+    from delete_engine import delete_trees
+    from result_model import ResultModel
+
+    if stage == "noop":
+        return 0.0, 0
+    if stage == "get_folder_size":
+        subfolders = _subfolders(root)
+        elapsed, _ = _timed(lambda: [get_folder_size(path) for path in subfolders])
+        return elapsed, 0
+    if stage == "scan":
+        elapsed, (table, _) = _timed(_headless_scan, root, backend)
+        return elapsed, table.files[0]
+    if stage == "sort":
+        # 与展开到最深一层后排序的规模相同：目录表中的所有目录
+        table, _ = _headless_scan(root, backend)
+        model = ResultModel()
+        model.reset(table.all_paths()[1:])
+        for row in range(len(model)):
+            model.set_size(row, table.sizes[row + 1], table.files[row + 1])
+        elapsed, _ = _timed(lambda: [model.set_sort(key) for key in ("size", "name", "files")])
+        return elapsed, len(model)
+    if stage == "delete":
+        elapsed, result = _timed(delete_trees, _subfolders(root))
+        return elapsed, result.total_entries
+    raise ValueError(f"未知的测试阶段: {stage}")
+
+
+def _stage_command(stage, root, backend):
+    return [sys.executable, os.path.abspath(__file__), "_stage", stage, root, backend]
+
+
+# 在子进程中运行一个阶段，返回 {"elapsed", "count", "peak_rss"}
+def _measure(stage, root, backend):
+    output = subprocess.run(_stage_command(stage, root, backend), capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+# 用 strace -c 统计一个阶段的系统调用总数，没有strace（非Linux）时返回None
+def _count_syscalls(stage, root, backend):
+    if not shutil.which("strace"):
+        return None
+    with tempfile.NamedTemporaryFile(suffix=".strace", delete=False) as f:
+        summary = f.name
+    try:
+        subprocess.run(["strace", "-f", "-c", "-o", summary] + _stage_command(stage, root, backend),
+                       capture_output=True, check=True)
+        with open(summary, encoding="utf-8") as f:
+            for line in f:
+                fields = line.split()
+                if fields and fields[-1] == "total":
+                    return int(fields[3])
+    except (OSError, subprocess.CalledProcessError, ValueError, IndexError):
+        return None
+    finally:
+        os.unlink(summary)
+    return None
+
+
+# 在不同形状的合成目录树上测量各阶段的耗时、每秒处理的项数（文件、排序的行或删除的条目）、
+# 每个文件的系统调用数和峰值内存
+# 每个阶段在单独的子进程中运行；系统调用数减去空进程（解释器启动和导入）的调用数
+def bench_suite(args):
+    shapes = [(None, (f"已有目录 {args.root}", None, 1))] if args.root else [
+        (name, SHAPES[name]) for name in args.shapes]
+    stages = [stage for stage in args.stages if not (args.root and stage == "delete")]  # 不删除已有目录
+    baseline = None if args.no_syscalls else _count_syscalls("noop", tempfile.gettempdir(), "serial")
+
+    print(f"{'形状':<10}{'阶段':<17}{'耗时':>10}{'项/秒':>14}{'调用/文件':>10}{'峰值内存':>12}")
+    for name, (description, params, scale) in shapes:
+        root = args.root
+        files = 0
+        if root is None:
+            root = tempfile.mkdtemp(prefix=f"folder_cleaner_{name}_")
+            files = max(1, int(args.files * scale))
+            make_tree(root, files, **params)
+        try:
+            if not files:
+                files = scan_tree(root).files[0]
+            print(f"# {name or ''} {description}，{files} 个文件")
+            for stage in stages:
+                # 删除之后目录树就不存在了，系统调用数要在删除前统计
+                calls = None
+                if baseline is not None and stage != "delete":
+                    total = _count_syscalls(stage, root, args.backend)
+                    calls = None if total is None else max(0, total - baseline)
+                if stage == "delete" and baseline is not None:
+                    copy = root + "_strace"
+                    shutil.copytree(root, copy)
+                    total = _count_syscalls(stage, copy, args.backend)
+                    shutil.rmtree(copy, ignore_errors=True)
+                    calls = None if total is None else max(0, total - baseline)
+                result = _measure(stage, root, args.backend)
+                elapsed = max(result["elapsed"], 1e-9)
+                per_file = f"{calls / files:.2f}" if calls is not None else "-"
+                rate = (result["count"] or files) / elapsed
+                print(f"{name or '':<10}{stage:<17}{elapsed * 1000:>9.1f}ms{rate:>14,.0f}"
+                      f"{per_file:>10}{result['peak_rss'] / 1024 / 1024:>10.1f}MB")
+        finally:
+            if root != args.root and not args.keep:
+                shutil.rmtree(root, ignore_errors=True)
+
+
+class _EventLoop:
+    """模拟Tk after 调度的单线程事件循环，用于在没有图形界面时测量界面更新的输入延迟"""
+
+    def __init__(self):
+        import heapq
+        import threading
+        self._heapq = heapq
+        self._lock = threading.Lock()
+        self._timers = []
+        self._seq = 0
+
+    def after(self, ms, func):
+        with self._lock:
+            self._seq += 1
+            self._heapq.heappush(self._timers, (time.perf_counter() + ms / 1000, self._seq, func))
+
+    def run(self, done):
+        while not done():
+            with self._lock:
+                due = self._timers[0][0] if self._timers else None
+                if due is not None and due <= time.perf_counter():
+                    func = self._heapq.heappop(self._timers)[2]
+                else:
+                    func = None
+            if func is not None:
+                func()
+            else:
+                time.sleep(0.0005 if due is None else min(0.0005, max(0.0, due - time.perf_counter())))
+
+
+# 界面更新调度：后台线程快速提交大量大小更新时，界面线程上模拟的输入事件（每5ms一次）被推迟了多久
+# 与旧的固定50ms轮询、每次取出全部消息再合并的方式对比
+def bench_ui(args):
+    import queue
+    import threading
+    from result_model import ResultModel
+    from ui_scheduler import UIScheduler
+
+    count = args.updates
+    rows = max(1, count // 10)  # 每行平均收到10次更新（部分结果和最终结果）
+
+    def run(label, make_sink):
+        model = ResultModel()
+        model.reset([f"/bench/folder_{i}" for i in range(rows)])
+        loop = _EventLoop()
+        applied = [0]
+
+        def apply_sizes(updates):
+            for row, (size, files, partial) in updates.items():
+                if partial:
+                    model.set_partial(row, size, files)
+                else:
+                    model.set_size(row, size, files)
+            applied[0] += len(updates)
+
+        post, start_sink = make_sink(loop, apply_sizes)
+        latencies = []
+        finished = threading.Event()
+
+        def input_event(due):
+            latencies.append(time.perf_counter() - due)
+            if not finished.is_set():
+                loop.after(5, lambda due=time.perf_counter() + 0.005: input_event(due))
+
+        def produce():
+            for i in range(count):
+                row = i % rows
+                post(row, i, i, i < count - rows)  # 最后一轮为最终结果
+            finished.set()
+
+        start_sink()
+        loop.after(5, lambda due=time.perf_counter() + 0.005: input_event(due))
+        start = time.perf_counter()
+        producer = threading.Thread(target=produce)
+        producer.start()
+        # 所有更新都已应用到模型后结束
+        loop.run(lambda: finished.is_set() and all(model.sizes[row] >= count - rows for row in range(rows)))
+        elapsed = time.perf_counter() - start
+        producer.join()
+        latencies.sort()
+        print(f"{label:<14}: 完成 {elapsed:.2f}s，输入延迟 p50 {latencies[len(latencies) // 2] * 1000:.1f}ms，"
+              f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.1f}ms，"
+              f"最大 {latencies[-1] * 1000:.1f}ms，应用 {applied[0]} 次行更新")
+
+    def legacy(loop, apply_sizes):
+        ui_queue = queue.Queue()
+
+        def tick():
+            updates = {}
+            for _ in range(10000):
+                try:
+                    row, size, files, partial = ui_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if not partial or row not in updates or updates[row][2]:
+                    updates[row] = (size, files, partial)
+            if updates:
+                apply_sizes(updates)
+            loop.after(50, tick)
+
+        return (lambda row, size, files, partial: ui_queue.put((row, size, files, partial)),
+                lambda: loop.after(50, tick))
+
+    def scheduled(loop, apply_sizes):
+        scheduler = UIScheduler(loop.after, apply_sizes, lambda text: None)
+        return (lambda row, size, files, partial: scheduler.post_size(0, row, size, files, partial),
+                scheduler.start)
+
+    print(f"{count} 次大小更新，{rows} 行")
+    run("固定50ms轮询", legacy)
+    run("自适应调度", scheduled)
+
+
+# 结果模型的内存占用和批量操作耗时，与旧的每行一个列表的存储方式对比
+def bench_model(args):
+    import tracemalloc
+    from result_model import ResultModel
+    from selection_rules import SelectionRule
+
+    count = args.model_rows
+    base = os.path.join("C:\\", "build", "agents", "workspace")
+    names = [f"folder_{i:07d}" for i in range(count)]
+
+    # 旧方式: [路径, 字节数, 格式化的大小, 选择状态]，不含Tk变量本身的开销
+    tracemalloc.start()
+    rows = [[os.path.join(base, name), i * 4096, human_readable_size(i * 4096), False]
+            for i, name in enumerate(names)]
+    legacy = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del rows
+
+    tracemalloc.start()
+    model = ResultModel()
+    model.reset(os.path.join(base, name) for name in names)
+    for row in range(count):
+        model.set_size(row, row * 4096, row % 100)
+    columnar = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"{count} 行: 旧的行列表 {legacy / count:.0f} 字节/行，列式模型 {columnar / count:.0f} 字节/行"
+          f"（{columnar / 1024 / 1024:.1f} MB）")
+
+    rule = SelectionRule("bench", patterns=["*_00*"], min_size=1024 * 1024, older_than_days=90)
+    for label, func in (
+        ("按大小排序", lambda: model.set_sort("size")),
+        ("按名称排序", lambda: model.set_sort("name")),
+        ("选择小于20MB", lambda: model.select_smaller_than(20 * 1024 * 1024)),
+        ("按规则选择", lambda: model.select_rule(rule)),
+        ("全选", lambda: model.set_all(True)),
+        ("取出选中行", model.selected_rows),
+    ):
+        elapsed, _ = _timed(func)
+        print(f"{label:<10}: {elapsed * 1000:.1f}ms")
+
+
+# 快照的保存、载入和比较耗时，使用合成的目录表，不访问磁盘
+def bench_snapshot(args):
+    from scan_engine import DirTable
+    from snapshot import Snapshot, diff_snapshots, save_snapshot
+
+    rng = random.Random(0)
+    table = DirTable(os.path.join(os.sep, "data"))
+    for i in range(1, args.entries):
+        table.add_dir(f"dir_{i % 5000:04d}_{i}", rng.randrange(i // 4, i) if i > 20 else 0)
+        table.own_sizes[i] = rng.randrange(1 << 24)
+    table.finish(False)
+
+    directory = tempfile.mkdtemp(prefix="folder_cleaner_snapshot_")
+    try:
+        old_path = os.path.join(directory, "old.fcsnap")
+        for label, compress in (("压缩", True), ("不压缩", False)):
+            path = os.path.join(directory, f"{compress}.fcsnap")
+            elapsed, _ = _timed(save_snapshot, table, path, compress)
+            load, snapshot = _timed(Snapshot, path)
+            snapshot.close()
+            print(f"{args.entries} 个目录，{label}: 保存 {elapsed:.2f}s，载入 {load * 1000:.0f}ms，"
+                  f"文件 {human_readable_size(os.path.getsize(path))}")
+            if compress:
+                os.replace(path, old_path)
+
+        # 约1%的目录变大，再比较两次快照
+        for i in rng.sample(range(1, args.entries), args.entries // 100):
+            table.own_sizes[i] += rng.randrange(1 << 26)
+        table.finish(False)
+        new_path = save_snapshot(table, os.path.join(directory, "new.fcsnap"))
+        with Snapshot(old_path) as old, Snapshot(new_path) as new:
+            elapsed, diff = _timed(diff_snapshots, old, new)
+        print(f"比较两次快照: {elapsed:.2f}s，增长最多 {human_readable_size(diff.grown[0][2] - diff.grown[0][1])}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+# 一个大目录和一个小目录：依次扫描时小目录要等大目录扫完，共用线程池时小目录很快完成
+def bench_multi(args):
+    from multi_scan import MultiScan, device_limit
+
+    small = tempfile.mkdtemp(prefix="folder_cleaner_small_")
+    try:
+        make_tree(small, max(100, args.files // 1000))
+        start = time.perf_counter()
+        big_table = scan_tree(args.root, backend="thread")
+        small_table = scan_tree(small, backend="thread")
+        sequential = time.perf_counter() - start
+        print(f"依次扫描: 小目录在 {sequential:.3f}s 完成")
+
+        done = {}
+        start = time.perf_counter()
+        multi = MultiScan(on_root_done=lambda table: done.setdefault(table.root, time.perf_counter() - start))
+        multi.add(args.root)
+        multi.add(small)
+        tables = multi.run()
+        total = time.perf_counter() - start
+        same = [table.sizes[0] for table in tables] == [big_table.sizes[0], small_table.sizes[0]]
+        print(f"共用线程池（每个设备 {device_limit(args.root)} 个任务）: 小目录在 {done[small]:.3f}s 完成，"
+              f"全部 {total:.3f}s{'' if same else '  (结果不一致!)'}")
+    finally:
+        shutil.rmtree(small, ignore_errors=True)
+
+
+# 启动预算(ms)：各入口模块在新进程中的导入耗时，以及图形界面从开始导入到窗口显示、全部控件建好的耗时
+STARTUP_BUDGET_MS = {"folder_cleaner": 20, "cli": 60, "gui": 200, "first_frame": 800, "ready": 1200}
+# 第一帧之前不应导入的模块，出现在 sys.modules 中说明有人把按需导入改回了模块级导入
+DEFERRED_MODULES = {
+    "folder_cleaner": ("scan_engine", "multiprocessing", "cli", "gui"),
+    "gui": ("delete_engine", "delete_plan", "duplicates", "multi_scan", "network_scan", "parallel_scan", "scan_profile",
+            "selection_rules", "size_index", "snapshot", "watcher", "sqlite3"),
+}
+
+
+# 在新进程中用 -X importtime 导入一个模块，返回 (累计耗时ms, {模块: 自身耗时ms}, 已载入的模块)
+def _import_profile(module):
+    code = f"import {module}\nimport sys\nprint(' '.join(sys.modules))"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    total = 0.0
+    own = {}
+    for line in result.stderr.splitlines():
+        fields = line.split("|")
+        if not line.startswith("import time:") or len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        name = fields[2].strip()
+        own[name] = int(fields[0].split(":")[1]) / 1000
+        if name == module:
+            total = int(fields[1]) / 1000
+    return total, own, set(result.stdout.split())
+
+
+# 冷启动耗时：各入口模块的导入时间（取多次运行的最小值）、导入最慢的模块、不应提前导入的模块，
+# 有图形界面环境时另外测量窗口显示和全部控件建好的时间；超出 STARTUP_BUDGET_MS 时以退出码1结束
+def bench_startup(args):
+    over = []
+    gui_ok = True
+    _, startup_modules, _ = _import_profile("sys")  # 解释器启动时就会导入的模块，不计入"最慢"
+    for module in ("folder_cleaner", "cli", "gui"):
+        try:
+            runs = [_import_profile(module) for _ in range(args.repeat)]
+        except RuntimeError as e:
+            print(f"{module:<15}: 无法导入（{e}）")
+            gui_ok = gui_ok and module != "gui"
+            continue
+        total, own, loaded = min(runs, key=lambda run: run[0])
+        slowest = sorted(((name, ms) for name, ms in own.items() if name not in startup_modules),
+                         key=lambda item: item[1], reverse=True)[:5]
+        print(f"{module:<15}: {total:7.1f}ms（预算 {STARTUP_BUDGET_MS[module]}ms）  最慢: "
+              + "，".join(f"{name} {ms:.1f}ms" for name, ms in slowest))
+        if total > STARTUP_BUDGET_MS[module]:
+            over.append(module)
+        early = sorted(set(DEFERRED_MODULES.get(module, ())) & loaded)
+        if early:
+            print(f"  提前导入了: {', '.join(early)}")
+            over.append(f"{module} 的按需导入")
+
+    if gui_ok and (os.name == "nt" or os.environ.get("DISPLAY")):
+        from gui import STARTUP_ENV
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "folder_cleaner.py")
+        env = dict(os.environ, **{STARTUP_ENV: "1"})
+        results = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            output = subprocess.run([sys.executable, script], capture_output=True, text=True, env=env, timeout=60)
+            wall = time.perf_counter() - start
+            results.append((wall, json.loads(output.stdout.strip().splitlines()[-1])))
+        wall, stages = min(results, key=lambda result: result[0])
+        print(f"启动到退出 {wall * 1000:.0f}ms，其中 " + "，".join(
+            f"{stage} {seconds * 1000:.0f}ms" for stage, seconds in stages.items()))
+        for stage in ("first_frame", "ready"):
+            if stages[stage] * 1000 > STARTUP_BUDGET_MS[stage]:
+                print(f"  {stage} 超出预算 {STARTUP_BUDGET_MS[stage]}ms")
+                over.append(stage)
+    else:
+        print("没有图形界面环境，跳过窗口显示时间的测量")
+
+    if over:
+        print(f"超出启动预算: {', '.join(over)}")
+        sys.exit(1)
+
+
+# 虚拟化列表的首次绘制时间和滚动帧时间，需要图形界面环境
+def bench_listview(args):
+    import customtkinter as ctk
+    from result_model import ResultModel
+    from virtual_list import VirtualList
+
+    app = ctk.CTk()
+    app.geometry("800x600")
+    model = ResultModel()
+    view = VirtualList(app, model)
+    view.pack(fill="both", expand=True)
+    app.update()
+
+    for rows in args.rows:
+        model.reset([os.path.join("C:\\bench", f"folder_{i:07d}") for i in range(rows)])
+        for row in range(rows):
+            model.set_size(row, row * 4096)
+
+        start = time.perf_counter()
+        view.first = 0
+        view.refresh()
+        app.update()
+        first_paint = time.perf_counter() - start
+
+        frame_times = []
+        for _ in range(200):
+            start = time.perf_counter()
+            view.scroll(1)
+            app.update()
+            frame_times.append(time.perf_counter() - start)
+        frame_times.sort()
+        print(f"{rows:>7} 行: 首次绘制 {first_paint * 1000:.1f}ms, "
+              f"滚动帧时间 平均 {sum(frame_times) / len(frame_times) * 1000:.2f}ms, "
+              f"p95 {frame_times[int(len(frame_times) * 0.95)] * 1000:.2f}ms, "
+              f"控件槽位 {len(view.slots)} 个")
+    app.destroy()
+
+
+BENCHES = {
+    # 名称: (函数, 是否需要合成目录树)
+    "walk": (bench_walk, True),
+    "listview": (bench_listview, False),
+    "backends": (bench_backends, True),
+    "network": (bench_network, True),
+    "dupes": (bench_dupes, True),
+    "model": (bench_model, False),
+    "suite": (bench_suite, False),
+    "ui": (bench_ui, False),
+    "snapshot": (bench_snapshot, False),
+    "startup": (bench_startup, False),
+    "multi": (bench_multi, True),
+}
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "_stage":
+        # bench_suite 内部使用：_stage <阶段> <目录> <扫描方式>
+        stage, root, backend = sys.argv[2:5]
+        elapsed, count = run_stage(stage, root, backend)
+        print(json.dumps({"elapsed": elapsed, "count": count, "peak_rss": peak_rss()}))
+        return
+
+    parser = argparse.ArgumentParser(description="文件夹清理工具性能测试")
+    parser.add_argument("bench", choices=sorted(BENCHES), help="测试项目")
+    parser.add_argument("--root", help="使用已有目录，不生成合成目录树")
+    parser.add_argument("--files", type=int, default=1_000_000, help="合成目录树的文件数")
+    parser.add_argument("--keep", action="store_true", help="保留生成的合成目录树")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 100_000],
+                        help="列表测试的行数")
+    parser.add_argument("--model-rows", type=int, default=1_000_000, help="结果模型测试的行数")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16],
+                        help="并行扫描测试的工作者数量")
+    parser.add_argument("--dup-ratio", type=float, default=0.3, help="重复文件测试中副本所占的比例")
+    parser.add_argument("--latency", type=float, default=0.02, help="网络扫描测试中每个目录注入的延迟(秒)")
+    parser.add_argument("--repeat", type=int, default=5, help="启动测试的重复次数，取最快的一次")
+    parser.add_argument("--entries", type=int, default=1_000_000, help="快照测试的目录数")
+    parser.add_argument("--updates", type=int, default=100_000, help="界面调度测试中提交的大小更新次数")
+    parser.add_argument("--shapes", nargs="+", choices=list(SHAPES), default=list(SHAPES),
+                        help="测试套件使用的目录树形状")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES), help="测试套件的阶段")
+    parser.add_argument("--backend", choices=("serial", "thread", "process", "network"), default="serial",
+                        help="测试套件中扫描使用的方式")
+    parser.add_argument("--no-syscalls", action="store_true", help="不用strace统计系统调用（统计时每个阶段多运行一次）")
+    args = parser.parse_args()
+
+    func, needs_tree = BENCHES[args.bench]
+    generated = None
+    if needs_tree and not args.root:
+        generated = tempfile.mkdtemp(prefix="folder_cleaner_bench_")
+        print(f"正在生成 {args.files} 个文件到 {generated} ...")
+        dir_count = make_tree(generated, args.files)
+        print(f"生成完成，共 {dir_count} 个文件夹")
+        args.root = generated
+    args.generated = generated is not None
+
+    try:
+        func(args)
+    finally:
+        if generated and not args.keep:
+            shutil.rmtree(generated, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
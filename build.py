@@ -1,8 +1,15 @@
 import PyInstaller.__main__
+import argparse
 import os
 import shutil
 
-def build_exe():
+# 图形界面和命令行在用到时才导入的模块，静态分析可能找不到，显式列出
+LAZY_MODULES = [
+    'delete_engine', 'delete_plan', 'duplicates', 'multi_scan', 'network_scan', 'parallel_scan',
+    'scan_engine', 'scan_profile', 'selection_rules', 'size_index', 'snapshot', 'watcher',
+]  # FolderCleaner.spec 也从这里读取，直接用spec打包时不会漏掉
+
+def build_exe(onedir=False):
     # 清理之前的构建文件
     if os.path.exists('build'):
         shutil.rmtree('build')
@@ -13,11 +20,15 @@ def build_exe():
     params = [
         'folder_cleaner.py',  # 主程序文件
         '--name=FolderCleaner',  # 生成的exe名称
-        '--onefile',  # 打包成单个文件
+        # 单文件每次启动都要先解压到临时目录；目录模式直接从安装目录载入，启动更快
+        '--onedir' if onedir else '--onefile',
         '--noconsole',  # 不显示控制台窗口
         '--clean',  # 清理临时文件
         '--add-data=README.md;.',  # 添加README文件
         '--hidden-import=customtkinter',  # 添加必要的隐藏导入
+        '--hidden-import=gui',  # 图形界面模块（按需导入）
+        '--hidden-import=cli',  # 命令行模块（按需导入）
+        '--hidden-import=sqlite3',  # 持久化大小索引
         '--hidden-import=concurrent.futures',  # 添加线程池支持
         '--hidden-import=queue',  # 添加队列支持
         '--hidden-import=subprocess',  # 添加子进程支持
@@ -29,11 +40,18 @@ def build_exe():
         '--hidden-import=tkinter.filedialog',  # 添加文件对话框支持
         '--collect-all=customtkinter',  # 收集所有customtkinter相关文件
     ]
+    params += [f'--hidden-import={module}' for module in LAZY_MODULES]
     
     # 执行打包
     PyInstaller.__main__.run(params)
     
-    print("打包完成！exe文件位于dist目录中。")
+    if onedir:
+        print("打包完成！程序位于dist/FolderCleaner目录中，分发时需要整个目录。")
+    else:
+        print("打包完成！exe文件位于dist目录中。")
 
 if __name__ == '__main__':
-    build_exe() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="打包文件夹清理工具")
+    parser.add_argument('--onedir', action='store_true',
+                        help="打包成目录而不是单个exe，省去每次启动时的解压，启动更快")
+    build_exe(parser.parse_args().onedir)
@@ -0,0 +1,458 @@
+import argparse
+import csv
+import json
+import os
+import sys
+from contextlib import nullcontext
+from itertools import compress
+
+from scan_engine import BACKENDS, scan_tree, parse_size, human_readable_size
+from size_index import open_default_index
+
+# 退出码
+EXIT_OK = 0
+EXIT_PARTIAL = 1  # 有目录无法读取或扫描被中断，结果不完整
+EXIT_USAGE = 2  # 参数错误或根目录不可访问
+EXIT_INTERRUPTED = 130
+
+FIELDS = ("path", "size", "size_readable", "files")
+LINK_FIELDS = FIELDS + ("disk_size", "disk_readable", "freeable", "freeable_readable")
+ROOT_FIELDS = FIELDS + ("root",)  # 同时扫描多个根目录时标明每个文件夹所属的根目录
+TOP_FIELDS = ("type", "path", "size", "size_readable")
+DUPE_FIELDS = ("group", "path", "size", "reclaimable", "reclaimable_readable")
+DELETE_FIELDS = ("path", "status", "size", "freed", "freed_readable", "reason")
+DIFF_FIELDS = ("kind", "path", "old_size", "new_size", "change", "change_readable", "ratio")
+
+
+def _make_writer(fmt, stream, fields=FIELDS):
+    if fmt == "csv":
+        writer = csv.DictWriter(stream, fieldnames=fields)
+        writer.writeheader()
+        return writer.writerow
+
+    def write_json(record):
+        stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return write_json
+
+
+def _record(path, size, files):
+    return {"path": path, "size": size, "size_readable": human_readable_size(size), "files": files}
+
+
+def _size_arg(text):
+    try:
+        return parse_size(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def _load_rule(name, rules_file=None):
+    """按名称读取规则预设，规则文件无效或没有该规则时抛出ValueError"""
+    from selection_rules import load_presets
+    try:
+        presets = load_presets(rules_file)
+    except OSError as e:
+        raise ValueError(str(e)) from e
+    for rule in presets:
+        if rule.name == name:
+            return rule
+    raise ValueError(f"没有名为 {name} 的规则")
+
+
+def _matching(table, indices, rule):
+    """目录表中符合规则的目录编号"""
+    mask = rule.mask([table.names[i] for i in indices], [table.sizes[i] for i in indices],
+                     [table.files[i] for i in indices], [table.newest[i] / 1e9 for i in indices])
+    return list(compress(indices, mask))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="folder_cleaner", description="文件夹清理工具（命令行模式）")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    scan = sub.add_parser("scan", help="扫描目录并输出各子文件夹大小")
+    scan.add_argument("roots", nargs="+", metavar="root",
+                      help="要扫描的目录；指定多个目录时共用一个工作线程池同时扫描，结果合并输出")
+    scan.add_argument("--format", choices=["jsonl", "csv"], default="jsonl", help="输出格式")
+    scan.add_argument("--min-size", type=_size_arg, help="只输出不小于该大小的文件夹，如 20MB")
+    scan.add_argument("--max-size", type=_size_arg, help="只输出不大于该大小的文件夹")
+    scan.add_argument("--sort", choices=["size", "name", "files"],
+                      help="排序字段；不指定时每个文件夹扫描完毕立即输出")
+    scan.add_argument("--reverse", action="store_true", help="降序排序")
+    scan.add_argument("--all", action="store_true", help="输出所有层级的文件夹，而不只是直接子文件夹")
+    scan.add_argument("--rule", help="只输出符合该规则预设的文件夹，规则名见 selection_rules.json")
+    scan.add_argument("--rules-file", help="规则预设文件，默认与大小索引放在同一目录")
+    scan.add_argument("--profile", metavar="PATH",
+                      help="剖析这次扫描：写出cProfile结果(.prof)和各阶段耗时报告(.txt)，PATH为文件或目录")
+    scan.add_argument("--links", action="store_true",
+                      help="硬链接只计算一次，并输出实际占用空间和删除后真正能释放的空间（单线程扫描）")
+    scan.add_argument("--snapshot", action="store_true",
+                      help="扫描完整时保存快照，之后可以用 diff 命令比较两次扫描")
+    scan.add_argument("--snapshot-dir", help="快照目录，默认与大小索引放在同一目录；同一根目录只保留最近的快照")
+    scan.add_argument("--no-index", action="store_true", help="不使用持久化索引，完整重扫")
+    scan.add_argument("--backend", choices=BACKENDS, default="auto",
+                      help="扫描方式：自动、单线程、线程池、进程池（适合多核本地磁盘）或网络共享异步扫描")
+    scan.add_argument("--workers", type=int,
+                      help="线程池/进程池的工作者数量，默认为CPU核数；网络扫描时为最大并发数")
+    scan.add_argument("--per-device", type=int,
+                      help="扫描多个目录时每个设备上同时进行的任务数，默认机械硬盘1、网络共享16、其他4")
+
+    plan = sub.add_parser("plan", help="预演删除：统计将释放的空间、条目数和预计耗时，可导出计划")
+    plan.add_argument("root", help="要扫描的目录")
+    plan.add_argument("--path", action="append", default=[], help="计划删除的文件夹，可重复指定")
+    plan.add_argument("--rule", help="计划删除符合该规则预设的文件夹")
+    plan.add_argument("--rules-file", help="规则预设文件，同 scan")
+    plan.add_argument("--all", action="store_true", help="规则作用于所有层级的文件夹，而不只是直接子文件夹")
+    plan.add_argument("-o", "--output", help="计划文件，默认输出到标准输出")
+    plan.add_argument("--calibrate", action="store_true",
+                      help="在目标目录中创建并删除少量空文件，实测删除速度后再估计耗时")
+    plan.add_argument("--links", action="store_true", help="按硬链接统计实际能释放的空间，同 scan")
+    plan.add_argument("--no-index", action="store_true", help="不使用持久化索引，完整重扫")
+    plan.add_argument("--backend", choices=BACKENDS, default="auto", help="扫描方式，同 scan")
+    plan.add_argument("--workers", type=int, help="工作者数量，同 scan")
+
+    delete = sub.add_parser("delete", help="执行导出的删除计划；不加 --yes 时只检查不删除")
+    delete.add_argument("--plan", required=True, help="plan 命令或图形界面导出的计划文件")
+    delete.add_argument("--yes", action="store_true", help="确认执行删除")
+    delete.add_argument("--force", action="store_true", help="计划之后内容有变化的文件夹也删除")
+    delete.add_argument("--format", choices=["jsonl", "csv"], default="jsonl", help="输出格式")
+    delete.add_argument("--workers", type=int, help="删除文件的线程数")
+
+    diff = sub.add_parser("diff", help="比较两个快照，列出增长最多、增长比例最高、新增和减少的文件夹")
+    diff.add_argument("snapshots", nargs="*", metavar="SNAPSHOT", help="旧快照和新快照文件")
+    diff.add_argument("--root", help="比较该根目录最近的两个快照，代替直接指定快照文件")
+    diff.add_argument("--snapshot-dir", help="快照目录，同 scan")
+    diff.add_argument("-n", type=int, default=20, help="每种排名列出多少项，默认20")
+    diff.add_argument("--depth", type=int, help="只比较到第几层子文件夹，1为根目录的直接子文件夹")
+    diff.add_argument("--format", choices=["text", "jsonl", "csv"], default="text", help="输出格式")
+
+    top = sub.add_parser("top", help="一次遍历找出任意层级中最大的文件和文件夹")
+    top.add_argument("root", help="要扫描的目录")
+    top.add_argument("-n", type=int, default=20, help="各列出多少项，默认20")
+    top.add_argument("--format", choices=["jsonl", "csv"], default="jsonl", help="输出格式")
+    top.add_argument("--backend", choices=BACKENDS, default="auto", help="扫描方式，同 scan")
+    top.add_argument("--workers", type=int, help="工作者数量，同 scan")
+
+    dupes = sub.add_parser("dupes", help="查找重复文件")
+    dupes.add_argument("root", help="要扫描的目录")
+    dupes.add_argument("--min-size", type=_size_arg, default=1, help="忽略小于该大小的文件，默认1字节")
+    dupes.add_argument("--format", choices=["jsonl", "csv"], default="jsonl", help="输出格式")
+    dupes.add_argument("--workers", type=int, help="计算哈希的线程数")
+    dupes.add_argument("--no-cache", action="store_true", help="不使用哈希缓存")
+    return parser
+
+
+def cmd_dupes(args, out):
+    if not os.path.isdir(args.root):
+        print(f"错误: 目录不存在或无法访问: {args.root}", file=sys.stderr)
+        return EXIT_USAGE
+
+    from duplicates import HashCache, find_duplicates
+
+    cache = None if args.no_cache else HashCache()
+    try:
+        groups = find_duplicates(args.root, min_size=args.min_size, cache=cache, workers=args.workers,
+                                 on_stage=lambda text: print(text, file=sys.stderr))
+    finally:
+        if cache is not None:
+            cache.close()
+
+    write = _make_writer(args.format, out, DUPE_FIELDS)
+    for number, group in enumerate(groups, 1):
+        for path in group.paths:
+            write({"group": number, "path": path, "size": group.size, "reclaimable": group.reclaimable,
+                   "reclaimable_readable": human_readable_size(group.reclaimable)})
+    total = sum(group.reclaimable for group in groups)
+    print(f"共 {len(groups)} 组重复文件，可释放 {human_readable_size(total)}", file=sys.stderr)
+    return EXIT_OK
+
+
+def cmd_top(args, out):
+    if not os.path.isdir(args.root):
+        print(f"错误: 目录不存在或无法访问: {args.root}", file=sys.stderr)
+        return EXIT_USAGE
+    if args.n <= 0:
+        print("错误: -n 必须大于0", file=sys.stderr)
+        return EXIT_USAGE
+
+    table = scan_tree(args.root, backend=args.backend, workers=args.workers, top_n=args.n)
+    write = _make_writer(args.format, out, TOP_FIELDS)
+    for kind, items in (("file", table.largest_files.items()), ("dir", table.largest_dirs(args.n))):
+        for path, size in items:
+            write({"type": kind, "path": path, "size": size, "size_readable": human_readable_size(size)})
+
+    if table.errors:
+        print(f"警告: {table.errors} 个目录无法读取，结果不完整", file=sys.stderr)
+        return EXIT_PARTIAL
+    return EXIT_OK
+
+
+def cmd_scan(args, out):
+    for root in args.roots:
+        if not os.path.isdir(root):
+            print(f"错误: 目录不存在或无法访问: {root}", file=sys.stderr)
+            return EXIT_USAGE
+    if len(args.roots) > 1:
+        # 位于其他根目录之中的目录已经包含在那个目录的结果中，单独扫描会重复计算
+        from multi_scan import collapse_roots
+        args.roots, nested = collapse_roots(args.roots)
+        for root in nested:
+            print(f"警告: {root} 与其他目录相同或位于其中，不再单独扫描", file=sys.stderr)
+    multi = len(args.roots) > 1
+    if multi and (args.links or args.profile):
+        print("错误: --links 和 --profile 只能用于单个目录", file=sys.stderr)
+        return EXIT_USAGE
+
+    def wanted(size):
+        if args.min_size is not None and size < args.min_size:
+            return False
+        if args.max_size is not None and size > args.max_size:
+            return False
+        return True
+
+    rule = None
+    if args.rule:
+        try:
+            rule = _load_rule(args.rule, args.rules_file)
+        except ValueError as e:
+            print(f"错误: {e}", file=sys.stderr)
+            return EXIT_USAGE
+
+    write = _make_writer(args.format, out, LINK_FIELDS if args.links else ROOT_FIELDS if multi else FIELDS)
+    # 规则需要整棵子树的最新修改时间，占用空间和可释放空间也要等扫描结束后才能确定
+    streaming = args.sort is None and not args.all and rule is None and not args.links
+
+    def on_subtree_done(path, size, files):
+        if wanted(size):
+            write(_record(path, size, files))
+            out.flush()
+
+    def on_root_subtree_done(root, path, size, files):
+        if wanted(size):
+            write(dict(_record(path, size, files), root=root))
+            out.flush()
+
+    profiler = None
+    if args.profile:
+        from scan_profile import ScanProfiler
+        profiler = ScanProfiler(args.profile)
+    index = None if args.no_index else open_default_index()
+    try:
+        if multi:
+            # 多个根目录轮流使用同一个线程池，每个设备上的并发数有上限
+            from multi_scan import scan_roots
+            tables = scan_roots(args.roots, workers=args.workers, per_device=args.per_device, index=index,
+                                on_subtree_done=on_root_subtree_done if streaming else None)
+        else:
+            with profiler if profiler is not None else nullcontext():
+                tables = [scan_tree(args.roots[0], on_subtree_done=on_subtree_done if streaming else None,
+                                    index=index, backend=args.backend, workers=args.workers, links=args.links)]
+    finally:
+        if index is not None:
+            index.close()
+    if profiler is not None:
+        print(f"剖析结果: {profiler.output}，报告: {profiler.dump(tables[0])}", file=sys.stderr)
+
+    if not streaming:
+        # 所有根目录的结果放在一起过滤和排序
+        rows = []
+        for table in tables:
+            indices = list(range(1, len(table))) if args.all else table.children(0)
+            if rule is not None:
+                indices = _matching(table, indices, rule)
+            paths = table.all_paths() if args.all else None
+            rows += [(paths[i] if paths else table.path(i), table.sizes[i], table.files[i], i, table)
+                     for i in indices]
+        rows = [row for row in rows if wanted(row[1])]
+        if args.sort:
+            key = {
+                "size": lambda row: row[1],
+                "name": lambda row: os.path.basename(row[0]).lower(),
+                "files": lambda row: row[2],
+            }[args.sort]
+            rows.sort(key=key, reverse=args.reverse)
+        for path, size, files, i, table in rows:
+            record = _record(path, size, files)
+            if args.links:
+                record.update(disk_size=table.disk_sizes[i], disk_readable=human_readable_size(table.disk_sizes[i]),
+                              freeable=table.freeable[i], freeable_readable=human_readable_size(table.freeable[i]))
+            if multi:
+                record["root"] = table.root
+            write(record)
+        if args.links:
+            table = tables[0]
+            print(f"{table.extra_links} 个额外的硬链接没有重复计算；整个目录占用 "
+                  f"{human_readable_size(table.disk_sizes[0])}，删除后可释放 "
+                  f"{human_readable_size(table.freeable[0])}", file=sys.stderr)
+
+    if args.snapshot or args.snapshot_dir:
+        from snapshot import save_snapshot
+        for table in tables:
+            if not table.complete:
+                continue
+            try:
+                print(f"快照: {save_snapshot(table, directory=args.snapshot_dir)}", file=sys.stderr)
+            except OSError as e:
+                print(f"警告: 无法保存快照: {e}", file=sys.stderr)
+
+    errors = sum(table.errors for table in tables)
+    if errors:
+        print(f"警告: {errors} 个目录无法读取，结果不完整", file=sys.stderr)
+        return EXIT_PARTIAL
+    return EXIT_OK
+
+
+def cmd_diff(args, out):
+    from snapshot import Snapshot, diff_snapshots, list_snapshots
+
+    if args.root:
+        files = list_snapshots(args.root, args.snapshot_dir)[-2:]
+        if len(files) < 2:
+            print(f"错误: {args.root} 的快照不足两个，先用 scan --snapshot 扫描", file=sys.stderr)
+            return EXIT_USAGE
+    elif len(args.snapshots) == 2:
+        files = args.snapshots
+    else:
+        print("错误: 需要指定两个快照文件，或用 --root 比较最近的两个快照", file=sys.stderr)
+        return EXIT_USAGE
+
+    try:
+        with Snapshot(files[0]) as old, Snapshot(files[1]) as new:
+            diff = diff_snapshots(old, new, top=args.n, max_depth=args.depth)
+    except (OSError, ValueError) as e:
+        print(f"错误: 无法读取快照: {e}", file=sys.stderr)
+        return EXIT_USAGE
+
+    if args.format == "text":
+        out.write("\n".join(diff.lines()) + "\n")
+        return EXIT_OK
+    write = _make_writer(args.format, out, DIFF_FIELDS)
+    for kind, items in (("grown", diff.grown), ("relative", diff.relative), ("added", diff.added),
+                        ("shrunk", diff.shrunk), ("removed", diff.removed)):
+        for path, old_size, new_size in items:
+            change = new_size - old_size
+            write({"kind": kind, "path": path, "old_size": old_size, "new_size": new_size, "change": change,
+                   "change_readable": ("-" if change < 0 else "") + human_readable_size(abs(change)),
+                   "ratio": round(change / old_size, 4) if old_size > 0 else None})
+    return EXIT_OK
+
+
+def cmd_plan(args, out):
+    from delete_plan import build_plan, measure_unlink_rate
+
+    if not os.path.isdir(args.root):
+        print(f"错误: 目录不存在或无法访问: {args.root}", file=sys.stderr)
+        return EXIT_USAGE
+    if not args.path and not args.rule:
+        print("错误: 需要指定 --path 或 --rule", file=sys.stderr)
+        return EXIT_USAGE
+    rule = None
+    if args.rule:
+        try:
+            rule = _load_rule(args.rule, args.rules_file)
+        except ValueError as e:
+            print(f"错误: {e}", file=sys.stderr)
+            return EXIT_USAGE
+
+    index = None if args.no_index else open_default_index()
+    try:
+        table = scan_tree(args.root, index=index, backend=args.backend, workers=args.workers, links=args.links)
+    finally:
+        if index is not None:
+            index.close()
+
+    paths = []
+    for path in args.path:
+        if table.index_of(os.path.abspath(path)) <= 0:
+            print(f"错误: 不在扫描目录中: {path}", file=sys.stderr)
+            return EXIT_USAGE
+        paths.append(os.path.abspath(path))
+    if rule is not None:
+        indices = list(range(1, len(table))) if args.all else table.children(0)
+        paths += [table.path(i) for i in _matching(table, indices, rule)]
+
+    plan = build_plan(args.root, paths, table)
+    if args.calibrate:
+        try:
+            plan.rate, plan.rate_source = measure_unlink_rate(args.root), "measured"
+        except OSError as e:
+            print(f"警告: 无法测量删除速度，使用默认值: {e}", file=sys.stderr)
+    if args.output:
+        plan.save(args.output)
+    else:
+        json.dump(plan.to_dict(), out, ensure_ascii=False, indent=2)
+        out.write("\n")
+    for line in plan.summary():
+        print(line, file=sys.stderr)
+
+    if table.errors:
+        print(f"警告: {table.errors} 个目录无法读取，计划中的大小可能偏小", file=sys.stderr)
+        return EXIT_PARTIAL
+    return EXIT_OK
+
+
+def cmd_delete(args, out):
+    from delete_plan import DeletePlan, replay_plan
+
+    try:
+        plan = DeletePlan.load(args.plan)
+    except (OSError, ValueError) as e:
+        print(f"错误: 无法读取删除计划: {e}", file=sys.stderr)
+        return EXIT_USAGE
+    write = _make_writer(args.format, out, DELETE_FIELDS)
+
+    def record(item, status, freed=0, reason=""):
+        write({"path": item.path, "status": status, "size": item.size, "freed": freed,
+               "freed_readable": human_readable_size(freed), "reason": reason})
+
+    if not args.yes:
+        # 只检查，不删除
+        problems = 0
+        for item in plan.items:
+            problem = item.check()
+            if problem is not None and (problem == "已不存在" or not args.force):
+                problems += 1
+                record(item, "skip", reason=problem)
+            else:
+                record(item, "pending", reason=problem or "")
+        for line in plan.summary():
+            print(line, file=sys.stderr)
+        print("未删除任何内容，加 --yes 执行删除", file=sys.stderr)
+        return EXIT_PARTIAL if problems else EXIT_OK
+
+    def on_progress(freed_bytes, freed_entries, done, total):
+        print(f"\r已删除 {done}/{total}，释放 {human_readable_size(freed_bytes)}，{freed_entries} 个条目",
+              end="", file=sys.stderr)
+
+    result, skipped = replay_plan(plan, force=args.force, max_workers=args.workers, on_progress=on_progress)
+    print(file=sys.stderr)
+    for item in plan.items:
+        if item.path in skipped:
+            record(item, "skip", reason=skipped[item.path])
+        elif item.path in result.deleted:
+            record(item, "deleted", result.freed_bytes[item.path])
+        else:
+            errors = result.failures.get(item.path, [])
+            reason = f"{errors[0][1]} ({errors[0][0]})" if errors else ""
+            record(item, "partial", result.freed_bytes.get(item.path, 0), reason)
+    print(f"成功删除 {len(result.deleted)} 个文件夹，释放 {human_readable_size(result.total_bytes)}，"
+          f"用时 {result.elapsed:.1f} 秒", file=sys.stderr)
+
+    if result.cancelled:
+        return EXIT_INTERRUPTED
+    return EXIT_OK if len(result.deleted) == len(plan.items) else EXIT_PARTIAL
+
+
+def main(argv=None, out=None):
+    args = build_parser().parse_args(argv)
+    out = out or sys.stdout
+    try:
+        commands = {"scan": cmd_scan, "top": cmd_top, "dupes": cmd_dupes, "plan": cmd_plan, "delete": cmd_delete,
+                    "diff": cmd_diff}
+        return commands[args.command](args, out)
+    except KeyboardInterrupt:
+        return EXIT_INTERRUPTED
+    except BrokenPipeError:
+        # 输出被管道截断（如 | head），不视为错误
+        sys.stdout = open(os.devnull, "w")
+        return EXIT_OK
@@ -0,0 +1,184 @@
+import concurrent.futures
+import os
+import stat
+import threading
+import time
+
+BATCH_SIZE = 256  # 每个任务删除的文件数
+
+
+class DeleteResult:
+    """删除结果，按选中的文件夹记录释放的空间和失败原因"""
+
+    def __init__(self, roots):
+        self.roots = list(roots)
+        self.freed_bytes = {root: 0 for root in self.roots}
+        self.freed_entries = {root: 0 for root in self.roots}
+        self.failures = {}  # 选中的文件夹 -> [(路径, 原因)]
+        self.deleted = []  # 完整删除的文件夹
+        self.cancelled = False
+        self.elapsed = 0.0  # 删除耗时（秒），用于估计以后的删除时间
+        self._lock = threading.Lock()
+
+    def add_freed(self, root, size, entries):
+        with self._lock:
+            self.freed_bytes[root] += size
+            self.freed_entries[root] += entries
+
+    def add_failure(self, root, path, error):
+        reason = error.strerror if isinstance(error, OSError) and error.strerror else str(error)
+        with self._lock:
+            self.failures.setdefault(root, []).append((path, reason))
+
+    @property
+    def total_bytes(self):
+        return sum(self.freed_bytes.values())
+
+    @property
+    def total_entries(self):
+        return sum(self.freed_entries.values())
+
+
+def _retry_writable(func, path):
+    # Windows下只读文件无法删除，去掉只读属性后重试
+    try:
+        return func(path)
+    except PermissionError:
+        if os.name != "nt":
+            raise
+        os.chmod(path, stat.S_IWRITE)
+        return func(path)
+
+
+def _remove_link(path):
+    # Windows下指向目录的符号链接和目录联接需要用rmdir删除
+    try:
+        os.unlink(path)
+    except (IsADirectoryError, PermissionError):
+        if os.name != "nt":
+            raise
+        os.rmdir(path)
+
+
+def _is_junction(entry):
+    # Windows下目录联接等重解析点的 is_symlink() 为False，is_dir(follow_symlinks=False) 却为True；
+    # 进入其中会删除联接指向的、选中范围之外的文件，只能删除联接本身。entry 为DirEntry或路径
+    if os.name != "nt":
+        return False
+    try:
+        st = entry.stat(follow_symlinks=False) if isinstance(entry, os.DirEntry) else os.lstat(entry)
+    except OSError:
+        return False
+    return bool(st.st_file_attributes & stat.FILE_ATTRIBUTE_REPARSE_POINT)
+
+
+def _unlink_batch(result, root, batch, should_stop):
+    size = 0
+    count = 0
+    for path, file_size, is_link in batch:
+        if should_stop():
+            break
+        try:
+            _retry_writable(_remove_link if is_link else os.unlink, path)
+            size += file_size
+            count += 1
+        except OSError as e:
+            result.add_failure(root, path, e)
+    result.add_freed(root, size, count)
+
+
+# 并行删除多个文件夹：在调用线程中遍历目录树，把文件分批交给线程池删除，
+# 每棵树的文件全部删除后再自底向上删除空目录
+# on_progress(已释放字节, 已删除条目, 已完成文件夹数, 总数) 最多每0.1秒调用一次
+# should_stop() 返回True时取消尚未开始的任务，已删除的内容无法恢复
+def delete_trees(paths, max_workers=None, on_progress=None, should_stop=None):
+    result = DeleteResult(paths)
+    start = time.monotonic()
+    should_stop = should_stop or (lambda: False)
+    max_workers = max_workers or min(16, (os.cpu_count() or 2) * 2)
+    last_report = 0.0
+    done_trees = 0
+
+    def report(force=False):
+        nonlocal last_report
+        now = time.monotonic()
+        if on_progress is not None and (force or now - last_report >= 0.1):
+            last_report = now
+            on_progress(result.total_bytes, result.total_entries, done_trees, len(result.roots))
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = []  # [(选中的文件夹, 需要删除的目录列表, 文件批次的futures)]
+
+        for root in result.roots:
+            if should_stop():
+                break
+            if os.path.islink(root) or _is_junction(root):
+                batch = [(root, 0, True)]
+                pending.append((root, [], [executor.submit(_unlink_batch, result, root, batch, should_stop)]))
+                continue
+
+            dirs = [root]
+            futures = []
+            batch = []
+            stack = [root]
+            while stack and not should_stop():
+                current = stack.pop()
+                try:
+                    with os.scandir(current) as entries:
+                        for entry in entries:
+                            try:
+                                if entry.is_dir(follow_symlinks=False) and not _is_junction(entry):
+                                    dirs.append(entry.path)
+                                    stack.append(entry.path)
+                                    continue
+                                # 符号链接和目录联接只删除链接本身
+                                is_link = entry.is_symlink() or entry.is_dir(follow_symlinks=False)
+                                size = 0 if is_link else entry.stat(follow_symlinks=False).st_size
+                                batch.append((entry.path, size, is_link))
+                            except OSError as e:
+                                result.add_failure(root, entry.path, e)
+                                continue
+                            if len(batch) >= BATCH_SIZE:
+                                futures.append(executor.submit(_unlink_batch, result, root, batch, should_stop))
+                                batch = []
+                except OSError as e:
+                    result.add_failure(root, current, e)
+                report()
+            if batch:
+                futures.append(executor.submit(_unlink_batch, result, root, batch, should_stop))
+            pending.append((root, dirs, futures))
+
+        for root, dirs, futures in pending:
+            for future in futures:
+                if should_stop():
+                    future.cancel()
+                    continue
+                while True:
+                    try:
+                        future.result(timeout=0.1)
+                        break
+                    except concurrent.futures.TimeoutError:
+                        report()
+
+            if should_stop():
+                result.add_failure(root, root, "已取消")
+                continue
+
+            # 子目录总是在父目录之后被发现，倒序删除即可保证目录已经清空
+            removed = 0
+            for path in reversed(dirs):
+                try:
+                    _retry_writable(os.rmdir, path)
+                    removed += 1
+                except OSError as e:
+                    result.add_failure(root, path, e)
+            result.add_freed(root, 0, removed)
+            if root not in result.failures:
+                result.deleted.append(root)
+            done_trees += 1
+            report()
+
+    result.cancelled = should_stop()
+    result.elapsed = time.monotonic() - start
+    report(force=True)
+    return result
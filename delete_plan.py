@@ -0,0 +1,318 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from scan_engine import human_readable_size, is_network_path
+from size_index import default_index_path
+
+PLAN_VERSION = 1
+# 没有实测数据时的删除速度（条目/秒），网络共享上每次unlink都是一次往返
+DEFAULT_RATES = {"local": 5000.0, "network": 300.0}
+MIN_SAMPLE_ENTRIES = 200  # 条目太少的删除不用于更新速度
+RATE_SMOOTHING = 0.5  # 新测得的速度所占的权重
+
+
+# 删除速度记录的默认位置，与大小索引放在同一目录
+def default_rates_path():
+    return os.path.join(os.path.dirname(default_index_path()), "delete_rates.json")
+
+
+# 路径所在的卷（挂载点、盘符或网络共享根目录），删除速度按卷记录
+def volume_of(path):
+    path = os.path.abspath(path)
+    while not os.path.ismount(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return os.path.normcase(path)
+
+
+def format_duration(seconds):
+    if seconds < 1:
+        return "不到1秒"
+    if seconds < 60:
+        return f"{seconds:.0f}秒"
+    if seconds < 3600:
+        return f"{seconds / 60:.1f}分钟"
+    return f"{seconds / 3600:.1f}小时"
+
+
+class RateStore:
+    """按卷记录实测的删除速度（条目/秒），每次删除后平滑更新"""
+
+    def __init__(self, path=None):
+        self.path = path or default_rates_path()
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self.rates = {key: float(value) for key, value in json.load(f).items()}
+        except (OSError, ValueError, TypeError, AttributeError):
+            self.rates = {}  # 文件不存在或已损坏时从默认值开始
+
+    def get(self, path):
+        """返回 (速度, 来源)，来源为 "measured" 或 "default" """
+        volume = volume_of(path)
+        rate = self.rates.get(volume)
+        if rate:
+            return rate, "measured"
+        return DEFAULT_RATES["network" if is_network_path(path) else "local"], "default"
+
+    def record(self, path, entries, seconds):
+        if entries < MIN_SAMPLE_ENTRIES or seconds <= 0:
+            return
+        volume = volume_of(path)
+        measured = entries / seconds
+        old = self.rates.get(volume)
+        self.rates[volume] = measured if old is None else old + (measured - old) * RATE_SMOOTHING
+
+    def save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(self.rates, f, ensure_ascii=False, indent=2)
+        except OSError:
+            pass  # 速度记录只用于估计，写不进去不影响删除
+
+
+# 在目标卷上创建并删除count个空文件，测得单线程的删除速度（条目/秒）
+def measure_unlink_rate(directory, count=500):
+    probe = tempfile.mkdtemp(prefix=".folder_cleaner_probe_", dir=directory)
+    try:
+        paths = [os.path.join(probe, f"{i:05d}") for i in range(count)]
+        for path in paths:
+            with open(path, "wb"):
+                pass
+        start = time.perf_counter()
+        for path in paths:
+            os.unlink(path)
+        elapsed = time.perf_counter() - start
+    finally:
+        shutil.rmtree(probe, ignore_errors=True)
+    return count / max(elapsed, 1e-6)
+
+
+class PlanItem:
+    """计划删除的一个文件夹；size/files 为-1表示扫描时大小未知"""
+
+    __slots__ = ("path", "size", "files", "dirs", "mtime", "freeable")
+
+    def __init__(self, path, size, files, dirs, mtime, freeable=-1):
+        self.path = path
+        self.size = size
+        self.files = files
+        self.dirs = dirs  # 子树中的目录数，包括文件夹本身
+        self.mtime = mtime  # 扫描时文件夹自身的修改时间(纳秒)，0表示未知
+        self.freeable = freeable  # 考虑其他位置的硬链接后实际能释放的磁盘空间，-1表示没有统计
+
+    @property
+    def entries(self):
+        return max(0, self.files) + self.dirs
+
+    def to_dict(self):
+        return {"path": self.path, "size": self.size, "files": self.files, "dirs": self.dirs, "mtime": self.mtime,
+                "freeable": self.freeable}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(str(data["path"]), int(data["size"]), int(data["files"]), int(data.get("dirs", 1)),
+                   int(data.get("mtime", 0)), int(data.get("freeable", -1)))
+
+    def check(self):
+        """重放前检查文件夹是否仍是计划时的样子，返回问题描述，没有问题时返回None
+
+        只比较文件夹自身的修改时间，能发现直接子项的增删，发现不了深层文件的变化。
+        """
+        try:
+            st = os.stat(self.path, follow_symlinks=False)
+        except FileNotFoundError:
+            return "已不存在"
+        except OSError as e:
+            return e.strerror or str(e)
+        if self.mtime and st.st_mtime_ns != self.mtime:
+            return "计划之后内容有变化"
+        return None
+
+
+class DeletePlan:
+    """删除前的预演：实际会释放的空间、要删除的条目数和预计耗时
+
+    被另一个选中文件夹包含的选择不会重复计算，也不会单独删除，记录在 nested 中。
+    计划可以导出为JSON，之后由 `folder_cleaner delete --plan` 在无界面环境中执行。
+    """
+
+    __slots__ = ("root", "created", "items", "nested", "rate", "rate_source", "shared_freeable")
+
+    def __init__(self, root, items, nested=(), rate=DEFAULT_RATES["local"], rate_source="default", created=None,
+                 shared_freeable=0):
+        self.root = root
+        # 所有链接都在计划中、但分散在几个文件夹里的文件，只有一起删除时才能释放
+        self.shared_freeable = shared_freeable
+        self.created = time.time() if created is None else created
+        self.items = list(items)
+        self.nested = list(nested)  # [(被包含的路径, 包含它的选中路径)]
+        self.rate = rate
+        self.rate_source = rate_source
+
+    @property
+    def paths(self):
+        return [item.path for item in self.items]
+
+    @property
+    def total_bytes(self):
+        return sum(item.size for item in self.items if item.size > 0)
+
+    @property
+    def total_files(self):
+        return sum(item.files for item in self.items if item.files > 0)
+
+    @property
+    def total_entries(self):
+        return sum(item.entries for item in self.items)
+
+    @property
+    def total_freeable(self):
+        """实际能释放的磁盘空间，有文件夹没有按硬链接统计时返回-1"""
+        if not self.items or any(item.freeable < 0 for item in self.items):
+            return -1
+        return sum(item.freeable for item in self.items) + self.shared_freeable
+
+    @property
+    def unknown(self):
+        return sum(1 for item in self.items if item.size < 0)
+
+    @property
+    def estimated_seconds(self):
+        return self.total_entries / self.rate if self.rate > 0 else 0.0
+
+    def summary(self):
+        verb = "文件共" if self.total_freeable >= 0 else "释放"
+        lines = [
+            f"删除 {len(self.items)} 个文件夹，{verb} {human_readable_size(self.total_bytes)}",
+            f"共 {self.total_entries} 个条目（{self.total_files} 个文件，"
+            f"{self.total_entries - self.total_files} 个目录）",
+            f"预计耗时 {format_duration(self.estimated_seconds)}"
+            f"（{'实测' if self.rate_source == 'measured' else '默认'}速度 {self.rate:.0f} 条目/秒）",
+        ]
+        if self.total_freeable >= 0:
+            lines.append(f"考虑其他位置的硬链接后，实际释放 {human_readable_size(self.total_freeable)} 磁盘空间")
+        if self.unknown:
+            lines.append(f"{self.unknown} 个文件夹尚未扫描完成，大小未计入")
+        if self.nested:
+            lines.append(f"{len(self.nested)} 个选中项包含在其他选中的文件夹中，不重复计算")
+        return lines
+
+    def to_dict(self):
+        return {
+            "version": PLAN_VERSION,
+            "root": self.root,
+            "created": self.created,
+            "rate": self.rate,
+            "rate_source": self.rate_source,
+            "total_bytes": self.total_bytes,
+            "total_freeable": self.total_freeable,
+            "shared_freeable": self.shared_freeable,
+            "total_entries": self.total_entries,
+            "estimated_seconds": round(self.estimated_seconds, 1),
+            "items": [item.to_dict() for item in self.items],
+            "nested": [{"path": path, "inside": parent} for path, parent in self.nested],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if not isinstance(data, dict) or data.get("version") != PLAN_VERSION:
+            raise ValueError("不支持的删除计划版本")
+        try:
+            items = [PlanItem.from_dict(item) for item in data["items"]]
+            nested = [(item["path"], item["inside"]) for item in data.get("nested", [])]
+            return cls(data.get("root", ""), items, nested, float(data.get("rate", DEFAULT_RATES["local"])),
+                       data.get("rate_source", "default"), data.get("created"),
+                       int(data.get("shared_freeable", 0)))
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"删除计划格式错误: {e}") from e
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"删除计划格式错误: {path}: {e}") from e
+        return cls.from_dict(data)
+
+
+def _subtree_dirs(table, idx):
+    count = 0
+    stack = [idx]
+    while stack:
+        current = stack.pop()
+        count += 1
+        stack.extend(table.children(current))
+    return count
+
+
+# 由选中的文件夹生成删除计划，不访问磁盘
+# table 为扫描得到的目录表；不在目录表中的路径用 fallback(路径) -> (大小, 文件数) 估计
+def build_plan(root, paths, table=None, fallback=None, rates=None):
+    keys = {os.path.normcase(os.path.abspath(path)): path for path in paths}
+    kept = set()
+    items = []
+    nested = []
+    indices = []
+    # 由短到长处理，祖先总是先于它包含的选择被放进计划
+    for key in sorted(keys, key=len):
+        path = keys[key]
+        ancestor = os.path.dirname(key)
+        while ancestor not in kept and os.path.dirname(ancestor) != ancestor:
+            ancestor = os.path.dirname(ancestor)
+        if ancestor in kept:
+            nested.append((path, keys[ancestor]))
+            continue
+        kept.add(key)
+
+        idx = table.index_of(path) if table is not None and table.sizes is not None else -1
+        if idx > 0:
+            indices.append(idx)
+            freeable = table.freeable[idx] if table.freeable is not None else -1
+            items.append(PlanItem(path, table.sizes[idx], table.files[idx], _subtree_dirs(table, idx),
+                                  table.mtimes[idx], freeable))
+        else:
+            size, files = fallback(path) if fallback is not None else (-1, -1)
+            items.append(PlanItem(path, size, files, 1, 0))
+
+    shared = table.links.freeable_across(indices) if table is not None and table.links is not None else 0
+    rate, source = (rates or RateStore()).get(root or (items[0].path if items else os.curdir))
+    return DeletePlan(root, items, nested, rate, source, shared_freeable=shared)
+
+
+# 在无界面环境中执行导出的计划：逐项检查后交给 delete_trees 删除，并记录实测速度
+# 返回 (DeleteResult, 跳过的文件夹 {路径: 原因})；force为True时不检查计划之后的变化
+def replay_plan(plan, force=False, max_workers=None, on_progress=None, should_stop=None, rates=None):
+    from delete_engine import delete_trees
+
+    skipped = {}
+    paths = []
+    for item in plan.items:
+        problem = item.check()
+        if problem == "已不存在" or (problem is not None and not force):
+            skipped[item.path] = problem
+        else:
+            paths.append(item.path)
+    result = delete_trees(paths, max_workers=max_workers, on_progress=on_progress, should_stop=should_stop)
+    record_delete_rate(plan.root or (paths[0] if paths else ""), result, rates)
+    return result, skipped
+
+
+# 用一次实际删除的条目数和耗时更新该卷的删除速度
+def record_delete_rate(path, result, rates=None):
+    if not path:
+        return
+    store = rates or RateStore()
+    store.record(path, result.total_entries, result.elapsed)
+    if rates is None:
+        store.save()
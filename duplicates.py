@@ -0,0 +1,196 @@
+import concurrent.futures
+import hashlib
+import os
+import sqlite3
+
+from scan_engine import scan_tree
+from size_index import default_index_path
+
+EDGE_SIZE = 64 * 1024  # 部分哈希读取文件开头和结尾各64KB
+BUFFER_SIZE = 1024 * 1024  # 完整哈希时每次读取1MB
+
+
+# 默认的哈希缓存位置，与大小索引放在同一目录
+def default_cache_path():
+    return os.path.join(os.path.dirname(default_index_path()), "hash_cache.sqlite3")
+
+
+class HashCache:
+    """按 (路径, 大小, 修改时间) 缓存文件哈希，文件变化后自动失效"""
+
+    def __init__(self, path=None):
+        self.path = path or default_cache_path()
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.conn = sqlite3.connect(self.path, timeout=30)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS hashes (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime INTEGER NOT NULL,
+                partial BLOB,
+                full BLOB
+            )
+        """)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def get(self, path, size, mtime):
+        """返回 (部分哈希, 完整哈希)，没有缓存或已失效时返回 (None, None)"""
+        row = self.conn.execute(
+            "SELECT partial, full FROM hashes WHERE path = ? AND size = ? AND mtime = ?",
+            (path, size, mtime),
+        ).fetchone()
+        return row if row is not None else (None, None)
+
+    def put_many(self, rows):
+        """rows: [(路径, 大小, 修改时间, 部分哈希, 完整哈希)]"""
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?)", rows)
+
+
+class DuplicateGroup:
+    """内容完全相同的一组文件，保留一份即可释放其余的空间"""
+
+    __slots__ = ("size", "paths")
+
+    def __init__(self, size, paths):
+        self.size = size
+        self.paths = paths
+
+    @property
+    def reclaimable(self):
+        return self.size * (len(self.paths) - 1)
+
+
+def partial_hash(path, size):
+    """文件开头和结尾各64KB的哈希，不超过128KB的文件即为完整哈希"""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        digest.update(f.read(EDGE_SIZE))
+        if size > 2 * EDGE_SIZE:
+            f.seek(size - EDGE_SIZE)
+            digest.update(f.read(EDGE_SIZE))
+        elif size > EDGE_SIZE:
+            digest.update(f.read())
+    return digest.digest()
+
+
+def full_hash(path, size=0):
+    # 复用同一块缓冲区读取，哈希计算会释放GIL，适合在线程池中并行
+    digest = hashlib.blake2b(digest_size=20)
+    buffer = bytearray(BUFFER_SIZE)
+    view = memoryview(buffer)
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            digest.update(view[:n])
+    return digest.digest()
+
+
+def _hash_stage(candidates, func, cache_column, cache, workers, should_stop):
+    """对候选文件并行计算哈希，已缓存的直接使用，返回 {(大小, 哈希): [路径]}"""
+    groups = {}
+    todo = []
+    for path, size, mtime, cached in candidates:
+        value = cached[cache_column]
+        if value is not None:
+            groups.setdefault((size, value), []).append(path)
+        else:
+            todo.append((path, size, mtime, cached))
+
+    computed = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(func, path, size): (path, size, mtime, cached)
+            for path, size, mtime, cached in todo
+        }
+        for future in concurrent.futures.as_completed(futures):
+            if should_stop is not None and should_stop():
+                for pending in futures:
+                    pending.cancel()
+                break
+            path, size, mtime, cached = futures[future]
+            try:
+                value = future.result()
+            except OSError:
+                continue
+            groups.setdefault((size, value), []).append(path)
+            computed.append((path, size, mtime, cached, value))
+
+    if cache is not None and computed:
+        if cache_column == 0:
+            rows = [(path, size, mtime, value, cached[1]) for path, size, mtime, cached, value in computed]
+        else:
+            rows = [(path, size, mtime, cached[0], value) for path, size, mtime, cached, value in computed]
+        cache.put_many(rows)
+    return groups
+
+
+# 查找重复文件：先按大小分组，再对大小相同的文件计算首尾64KB的部分哈希，
+# 最后只对部分哈希仍然相同的文件计算完整哈希。硬链接指向同一个inode，只计一次。
+# 返回按可释放空间降序排列的 DuplicateGroup 列表
+def find_duplicates(root, min_size=1, cache=None, workers=None, should_stop=None, on_stage=None):
+    workers = workers or min(16, (os.cpu_count() or 2) * 2)
+    by_size = {}
+    seen_inodes = set()
+
+    def on_file(path, st):
+        if st.st_size < min_size:
+            return
+        if st.st_ino:
+            key = (st.st_dev, st.st_ino)
+            if key in seen_inodes:
+                return
+            seen_inodes.add(key)
+        by_size.setdefault(st.st_size, []).append((path, st.st_mtime_ns))
+
+    if on_stage is not None:
+        on_stage("扫描文件")
+    scan_tree(root, on_file=on_file, should_stop=should_stop)
+    seen_inodes.clear()
+
+    def candidates(groups):
+        for size, files in groups:
+            for path, mtime in files:
+                cached = cache.get(path, size, mtime) if cache is not None else (None, None)
+                yield path, size, mtime, cached
+
+    # 第一阶段：大小相同的文件才可能重复
+    same_size = [(size, files) for size, files in by_size.items() if len(files) > 1]
+    mtimes = {path: mtime for _, files in same_size for path, mtime in files}
+    by_size.clear()
+
+    if on_stage is not None:
+        on_stage(f"计算部分哈希，{sum(len(files) for _, files in same_size)} 个候选文件")
+    partial_groups = _hash_stage(list(candidates(same_size)), partial_hash, 0, cache, workers, should_stop)
+
+    results = []
+    survivors = []
+    for (size, _), paths in partial_groups.items():
+        if len(paths) < 2:
+            continue
+        if size <= 2 * EDGE_SIZE:
+            # 部分哈希已经覆盖整个文件
+            results.append(DuplicateGroup(size, sorted(paths)))
+        else:
+            survivors.append((size, [(path, mtimes[path]) for path in paths]))
+
+    if on_stage is not None:
+        on_stage(f"计算完整哈希，{sum(len(files) for _, files in survivors)} 个候选文件")
+    full_groups = _hash_stage(list(candidates(survivors)), full_hash, 1, cache, workers, should_stop)
+    for (size, _), paths in full_groups.items():
+        if len(paths) > 1:
+            results.append(DuplicateGroup(size, sorted(paths)))
+
+    results.sort(key=lambda group: group.reclaimable, reverse=True)
+    return results
@@ -0,0 +1,1199 @@
+import time
+
+_IMPORT_STARTED = time.perf_counter()  # 启动测试从这里开始计时
+
+import json
+import os
+import threading
+import re
+from contextlib import nullcontext
+
+import customtkinter as ctk
+from tkinter import filedialog, messagebox
+
+from result_model import ResultModel
+from scan_engine import CancelToken, scan_tree, human_readable_size
+from ui_scheduler import UIScheduler
+from virtual_list import VirtualList
+
+_IMPORTS_DONE = time.perf_counter()
+# 第一帧只需要以上模块；删除、重复文件、快照、规则、索引、监视等模块在用到时才导入
+
+# 设置该环境变量后，界面完全建好时输出各阶段耗时（JSON）并退出，用于启动测试
+STARTUP_ENV = "FOLDER_CLEANER_STARTUP"
+QUEUE_RETRY_MS = 100  # 加入队列时上一批扫描正在收尾，隔这么久再检查一次
+
+# 设置主题
+ctk.set_appearance_mode("System")  # 系统主题
+ctk.set_default_color_theme("blue")  # 蓝色主题
+
+# 排序字段和显示名称
+SORT_LABELS = {"size": "大小", "name": "名称", "files": "文件数", "mtime": "修改时间"}
+
+
+class ScanSession:
+    """一次扫描或重复文件查找。UI调度器按代号丢弃过期会话的更新，取消令牌由扫描循环内部检查"""
+
+    def __init__(self, app, generation):
+        self.app = app
+        self.generation = generation
+        self.token = CancelToken()
+
+    def post(self, func, *args, **kwargs):
+        self.app.scheduler.post(self.generation, func, *args, **kwargs)
+
+    def status(self, text):
+        self.app.scheduler.post_status(self.generation, text)
+
+    def size(self, row, size_bytes, file_count, partial=False):
+        self.app.scheduler.post_size(self.generation, row, size_bytes, file_count, partial)
+
+
+class FolderCleanerApp(ctk.CTk):
+    def __init__(self):
+        super().__init__()
+        
+        # 配置窗口
+        self.title("文件夹清理工具")
+        self.geometry("800x600")
+        self.minsize(600, 400)
+        
+        # 数据成员
+        self.scan_thread = None
+        self.session = None  # 当前的扫描会话
+        self.generation = 0
+        self.delete_thread = None
+        self.stop_delete = False
+        self.model = ResultModel()  # 扫描结果和选择状态
+        self.default_min_size = 20 * 1024 * 1024  # 默认20MB
+        self.top_n = 50  # 最大文件/文件夹列表的项数
+        self.largest_files = []  # [(路径, 大小)]
+        self.largest_dirs = []
+        self.table = None  # 最近一次完整扫描的目录表，展开子文件夹时不再访问磁盘
+        self.watcher = None  # 监视模式下最近一次扫描的 TreeWatcher，随会话取消而停止
+        self.tables = {}  # 多根目录扫描中已完成的根目录 -> 目录表
+        self.multi_scan = None  # 正在进行的多根目录扫描，可以继续加入根目录
+        self.level = 0  # 当前显示的是目录表中哪个目录的子文件夹
+        self.removed_dirs = set()  # 已被删除的目录编号
+        self.presets = []  # 规则选择的预设，创建规则选择区时载入
+        # 启动各阶段距开始导入gui模块的耗时（秒）：导入完成、第一帧控件建好、窗口显示、全部控件建好
+        self.startup = {"import": _IMPORTS_DONE - _IMPORT_STARTED}
+        self._secondary_built = False
+        
+        # 先创建第一帧需要的路径输入和列表，窗口显示之后再创建其余控件
+        self._create_widgets()
+        self.startup["widgets"] = time.perf_counter() - _IMPORT_STARTED
+        self.after_idle(self._create_secondary_widgets)
+        
+        # 后台线程的界面更新：按行合并，每次处理限时，空闲时休眠
+        self.scheduler = UIScheduler(self.after, self._apply_size_updates,
+                                     lambda text: self.status_label.configure(text=text))
+        self.scheduler.start()
+        
+    def _create_widgets(self):
+        # 主框架
+        self.grid_rowconfigure(0, weight=0)  # 顶部路径输入区
+        self.grid_rowconfigure(1, weight=1)  # 文件夹列表区
+        self.grid_rowconfigure(2, weight=0)  # 底部按钮区
+        self.grid_rowconfigure(3, weight=0)  # 规则选择区
+        self.grid_columnconfigure(0, weight=1)
+        
+        # 顶部区域 - 路径选择
+        top_frame = ctk.CTkFrame(self)
+        top_frame.grid(row=0, column=0, padx=10, pady=(10, 0), sticky="ew")
+        top_frame.grid_columnconfigure(0, weight=0)
+        top_frame.grid_columnconfigure(1, weight=1)
+        top_frame.grid_columnconfigure(2, weight=0)
+        
+        path_label = ctk.CTkLabel(top_frame, text="路径:")
+        path_label.grid(row=0, column=0, padx=5, pady=10)
+        
+        # 多个根目录用路径分隔符（Windows为 ; ）隔开，共用一个线程池同时扫描
+        self.path_entry = ctk.CTkEntry(top_frame, placeholder_text=f"多个目录用 {os.pathsep} 分隔")
+        self.path_entry.grid(row=0, column=1, padx=5, pady=10, sticky="ew")
+        
+        browse_button = ctk.CTkButton(top_frame, text="浏览...", command=self._browse_folder)
+        browse_button.grid(row=0, column=2, padx=5, pady=10)
+        
+        scan_button = ctk.CTkButton(top_frame, text="扫描", command=self._start_scan)
+        scan_button.grid(row=0, column=3, padx=5, pady=10)
+        
+        # 多根目录扫描进行中时加入队列，不取消正在进行的扫描
+        queue_button = ctk.CTkButton(top_frame, text="加入队列", width=80, command=self._queue_scan)
+        queue_button.grid(row=0, column=4, padx=5, pady=10)
+        
+        # 状态标签
+        self.status_label = ctk.CTkLabel(top_frame, text="就绪")
+        self.status_label.grid(row=1, column=0, columnspan=5, padx=5, pady=(0, 5), sticky="w")
+        
+        # 中间区域 - 文件夹列表
+        self.folder_frame = ctk.CTkFrame(self)
+        self.folder_frame.grid(row=1, column=0, padx=10, pady=10, sticky="nsew")
+        self.folder_frame.grid_rowconfigure(2, weight=1)
+        self.folder_frame.grid_columnconfigure(0, weight=1)
+        
+        # 当前层级的路径导航，点击任意一级返回该层
+        self.breadcrumb_frame = ctk.CTkFrame(self.folder_frame, fg_color="transparent")
+        self.breadcrumb_frame.grid(row=0, column=0, sticky="ew", padx=5, pady=(5, 0))
+        
+        # 列表标题
+        header_frame = ctk.CTkFrame(self.folder_frame)
+        header_frame.grid(row=1, column=0, sticky="ew", padx=5, pady=5)
+        header_frame.grid_columnconfigure(0, weight=10)
+        header_frame.grid_columnconfigure(1, weight=2)
+        
+        filter_frame = ctk.CTkFrame(header_frame, fg_color="transparent")
+        filter_frame.grid(row=0, column=0, sticky="ew")
+        filter_frame.grid_columnconfigure(1, weight=1)
+        
+        folder_header = ctk.CTkLabel(filter_frame, text="文件夹")
+        folder_header.grid(row=0, column=0, sticky="w", padx=(25, 5))
+        
+        # 按名称实时过滤
+        self.filter_entry = ctk.CTkEntry(filter_frame, placeholder_text="过滤名称...")
+        self.filter_entry.grid(row=0, column=1, sticky="ew", padx=5)
+        self.filter_entry.bind("<KeyRelease>", lambda e: self._apply_filter())
+        
+        self.filter_regex = ctk.BooleanVar(value=False)
+        regex_checkbox = ctk.CTkCheckBox(filter_frame, text="正则", variable=self.filter_regex,
+                                         width=20, command=self._apply_filter)
+        regex_checkbox.grid(row=0, column=2, padx=5)
+        
+        size_header_frame = ctk.CTkFrame(header_frame)
+        size_header_frame.grid(row=0, column=1, sticky="e")
+        
+        size_header = ctk.CTkLabel(size_header_frame, text="排序")
+        size_header.pack(side="left", padx=5)
+        
+        self.sort_key = "size"
+        sort_key_menu = ctk.CTkOptionMenu(size_header_frame, values=list(SORT_LABELS.values()),
+                                          width=90, command=self._change_sort_key)
+        sort_key_menu.set(SORT_LABELS[self.sort_key])
+        sort_key_menu.pack(side="left", padx=(0, 5))
+        
+        self.sort_asc = True
+        sort_button = ctk.CTkButton(size_header_frame, text="↑", width=20, 
+                                   command=self._toggle_sort)
+        sort_button.pack(side="left")
+        self.sort_button = sort_button
+        
+        # 虚拟化列表，控件数量只取决于可见行数
+        self.result_list = VirtualList(self.folder_frame, self.model, on_open=self._open_folder,
+                                       on_drill=self._drill_down, fg_color="transparent")
+        self.result_list.grid(row=2, column=0, sticky="nsew", padx=5, pady=(0, 5))
+    
+    def _create_secondary_widgets(self):
+        """操作按钮和规则选择区，在窗口第一次显示之后创建；重复调用时直接返回"""
+        if self._secondary_built:
+            return
+        self._secondary_built = True
+        self.startup["first_frame"] = time.perf_counter() - _IMPORT_STARTED
+        from selection_rules import BUILTIN_PRESETS, SelectionRule, load_presets
+        
+        preset_error = None
+        try:
+            self.presets = load_presets()  # 规则选择的预设
+        except (OSError, ValueError) as e:
+            self.presets = [SelectionRule.from_dict(item) for item in BUILTIN_PRESETS]
+            preset_error = str(e)
+        
+        # 底部区域 - 操作按钮
+        bottom_frame = ctk.CTkFrame(self)
+        bottom_frame.grid(row=2, column=0, padx=10, pady=10, sticky="ew")
+        
+        select_small_button = ctk.CTkButton(
+            bottom_frame, text=f"选择小于20MB的文件夹", 
+            command=self._select_small_folders
+        )
+        select_small_button.pack(side="left", padx=5, pady=10)
+        
+        delete_button = ctk.CTkButton(
+            bottom_frame, text="删除选中", fg_color="darkred",
+            command=self._delete_selected
+        )
+        delete_button.pack(side="right", padx=5, pady=10)
+        
+        plan_button = ctk.CTkButton(
+            bottom_frame, text="删除计划", width=80,
+            command=self._show_delete_plan
+        )
+        plan_button.pack(side="right", padx=5, pady=10)
+        
+        select_all_button = ctk.CTkButton(
+            bottom_frame, text="全选", 
+            command=self._select_all
+        )
+        select_all_button.pack(side="right", padx=5, pady=10)
+        
+        deselect_all_button = ctk.CTkButton(
+            bottom_frame, text="取消全选", 
+            command=self._deselect_all
+        )
+        deselect_all_button.pack(side="right", padx=5, pady=10)
+        
+        stop_button = ctk.CTkButton(
+            bottom_frame, text="停止", width=60,
+            command=self._stop_current
+        )
+        stop_button.pack(side="left", padx=5, pady=10)
+        
+        # 统计最大文件需要列出所有文件，开启后不再复用索引缓存
+        self.track_largest = ctk.BooleanVar(value=False)
+        track_checkbox = ctk.CTkCheckBox(bottom_frame, text="统计最大文件", variable=self.track_largest)
+        track_checkbox.pack(side="left", padx=5, pady=10)
+        
+        # 硬链接只计算一次，并显示删除后实际能释放的空间；需要单线程完整扫描
+        self.count_links = ctk.BooleanVar(value=False)
+        links_checkbox = ctk.CTkCheckBox(bottom_frame, text="硬链接去重", variable=self.count_links)
+        links_checkbox.pack(side="left", padx=5, pady=10)
+        
+        # 扫描完成后继续监视文件系统变化，增量更新大小
+        self.watch_changes = ctk.BooleanVar(value=False)
+        watch_checkbox = ctk.CTkCheckBox(bottom_frame, text="监视变化", variable=self.watch_changes)
+        watch_checkbox.pack(side="left", padx=5, pady=10)
+        
+        largest_button = ctk.CTkButton(
+            bottom_frame, text="最大项", width=60,
+            command=self._show_largest
+        )
+        largest_button.pack(side="left", padx=5, pady=10)
+        
+        dupes_button = ctk.CTkButton(
+            bottom_frame, text="重复文件", width=80,
+            command=self._start_find_duplicates
+        )
+        dupes_button.pack(side="left", padx=5, pady=10)
+        
+        # 扫描完整时保存快照，"增长"比较同一目录最近的两次快照
+        self.keep_snapshots = ctk.BooleanVar(value=False)
+        snapshot_checkbox = ctk.CTkCheckBox(bottom_frame, text="保存快照", variable=self.keep_snapshots)
+        snapshot_checkbox.pack(side="left", padx=5, pady=10)
+        
+        growth_button = ctk.CTkButton(
+            bottom_frame, text="增长", width=60,
+            command=self._start_show_growth
+        )
+        growth_button.pack(side="left", padx=5, pady=10)
+        
+        # 按规则批量选择：大小范围、多久未修改、名称模式、文件数
+        rule_frame = ctk.CTkFrame(self)
+        rule_frame.grid(row=3, column=0, padx=10, pady=(0, 10), sticky="ew")
+        
+        rule_label = ctk.CTkLabel(rule_frame, text="规则:")
+        rule_label.pack(side="left", padx=5, pady=10)
+        
+        self.preset_menu = ctk.CTkOptionMenu(rule_frame, values=[rule.name for rule in self.presets],
+                                             width=200)
+        self.preset_menu.pack(side="left", padx=5, pady=10)
+        if self.presets:
+            self.preset_menu.set(self.presets[0].name)
+        
+        apply_rule_button = ctk.CTkButton(rule_frame, text="按规则选择", command=self._apply_preset)
+        apply_rule_button.pack(side="left", padx=5, pady=10)
+        
+        edit_rule_button = ctk.CTkButton(rule_frame, text="编辑规则...", width=90,
+                                         command=self._edit_rule)
+        edit_rule_button.pack(side="left", padx=5, pady=10)
+        
+        if preset_error:
+            self.status_label.configure(text=f"规则文件无效，使用内置预设: {preset_error}")
+        self.startup["ready"] = time.perf_counter() - _IMPORT_STARTED
+    
+    def _add_to_ui_queue(self, func, *args, **kwargs):
+        """提交界面更新，不属于任何扫描会话，总是会执行"""
+        self.scheduler.post(None, func, *args, **kwargs)
+    
+    def _update_status(self, text):
+        """更新状态标签，只显示最新的一条"""
+        self.scheduler.post_status(None, text)
+    
+    def _browse_folder(self):
+        folder_path = filedialog.askdirectory()
+        if folder_path:
+            self.path_entry.delete(0, "end")
+            self.path_entry.insert(0, folder_path)
+    
+    def _new_session(self):
+        """取消当前会话并开始新会话，旧会话的线程会在内层循环中很快退出，其消息不再显示"""
+        if self.session is not None:
+            self.session.token.cancel()
+        self.generation += 1
+        self.scheduler.generation = self.generation
+        self.session = ScanSession(self, self.generation)
+        return self.session
+    
+    def _busy(self):
+        return any(
+            thread is not None and thread.is_alive()
+            for thread in (self.scan_thread, self.delete_thread)
+        )
+    
+    def _entry_paths(self):
+        # 路径输入框中的各个目录，多个目录用路径分隔符隔开
+        return [path.strip() for path in self.path_entry.get().split(os.pathsep) if path.strip()]
+    
+    def _entry_roots(self):
+        """路径输入框中的根目录；有目录不存在时提示并返回None"""
+        roots = self._entry_paths()
+        if not roots:
+            messagebox.showerror("错误", "请输入有效路径")
+            return None
+        missing = [path for path in roots if not os.path.exists(path)]
+        if missing:
+            messagebox.showerror("错误", "路径不存在: " + "，".join(missing))
+            return None
+        return roots
+    
+    def _entry_root(self, action, must_exist=True):
+        """只支持单个目录的操作使用的根目录；输入了多个目录或路径无效时提示并返回None"""
+        roots = self._entry_paths()
+        if len(roots) > 1:
+            messagebox.showinfo("提示", f"{action}只能针对单个目录，请在路径框中只保留一个目录")
+            return None
+        if not roots or (must_exist and not os.path.isdir(roots[0])):
+            messagebox.showerror("错误", "请输入有效路径")
+            return None
+        return roots[0]
+    
+    def _clear_results(self):
+        self.model.reset([])
+        self.result_list.refresh()
+        self.table = None
+        self.tables = {}
+        self.multi_scan = None
+        self.level = 0
+        self.removed_dirs = set()
+        self._update_breadcrumb()
+    
+    def _start_scan(self):
+        # 扫描选项在第二批控件中，窗口刚显示就点击扫描时先把它们建好
+        self._create_secondary_widgets()
+        if self.delete_thread and self.delete_thread.is_alive():
+            messagebox.showinfo("提示", "请等待删除完成")
+            return
+        
+        # 清除之前的结果
+        self._clear_results()
+        
+        # 获取输入路径
+        roots = self._entry_roots()
+        if roots is None:
+            return
+        if len(roots) > 1:
+            self._start_multi_scan(roots)
+            return
+        folder_path = roots[0]
+        
+        # 取消之前的扫描，不需要等待它的线程结束
+        session = self._new_session()
+        session.status("正在扫描...")
+        self.scan_thread = threading.Thread(target=self._scan_folders, args=(folder_path, session))
+        self.scan_thread.daemon = True
+        self.scan_thread.start()
+    
+    def _scan_folders(self, folder_path, session):
+        from scan_profile import ScanProfiler, profile_dir
+        from size_index import open_default_index
+        try:
+            # 获取所有子文件夹
+            subfolders = []
+            session.status("正在获取子文件夹...")
+            
+            try:
+                # 使用os.scandir而不是os.walk来提高性能
+                with os.scandir(folder_path) as entries:
+                    subfolders = []
+                    mtimes = []
+                    for entry in entries:
+                        if entry.is_dir():
+                            subfolders.append(entry.path)
+                            try:
+                                mtimes.append(entry.stat().st_mtime)
+                            except OSError:
+                                mtimes.append(0.0)
+            except PermissionError:
+                session.post(messagebox.showerror, "错误", f"无法访问文件夹: {folder_path}")
+                session.status("扫描失败")
+                return
+                
+            if not subfolders:
+                session.post(messagebox.showinfo, "提示", "未找到子文件夹")
+                session.status("未找到子文件夹")
+                return
+                
+            session.status(f"找到 {len(subfolders)} 个子文件夹，准备扫描...")
+            
+            # 批量创建UI元素
+            session.post(self._create_folder_rows, subfolders, mtimes)
+            
+            # 单次遍历整棵目录树，每个顶层子文件夹扫描完毕时回报大小
+            session.status("正在计算文件夹大小...")
+            completed = 0
+            total = len(subfolders)
+            row_index = {subfolder: i for i, subfolder in enumerate(subfolders)}
+            reported = set()
+            
+            # 完成的结果交给UI调度器，同一文件夹的多次更新在提交时合并
+            def on_subtree_done(path, size_bytes, file_count):
+                nonlocal completed
+                idx = row_index.get(path)
+                if idx is None:
+                    return
+                reported.add(idx)
+                completed += 1
+                session.size(idx, size_bytes, file_count)
+            
+            # 按固定间隔显示仍在扫描的文件夹的部分大小和整体扫描速度
+            def on_progress(partials, files, bytes_done, elapsed):
+                for path, (size_bytes, file_count) in partials.items():
+                    if path in row_index:
+                        session.size(row_index[path], size_bytes, file_count, partial=True)
+                elapsed = max(elapsed, 1e-6)
+                session.status(
+                    f"已完成 {completed}/{total}，{files} 个文件，"
+                    f"{files / elapsed:,.0f} 文件/秒，{human_readable_size(bytes_done / elapsed)}/秒"
+                )
+            
+            # 设置了 FOLDER_CLEANER_PROFILE 环境变量时剖析这次扫描
+            profiler = ScanProfiler(profile_dir()) if profile_dir() else None
+            # 使用持久化索引，未变化的目录直接复用上次的结果
+            index = open_default_index()
+            try:
+                # 网络共享自动使用异步扫描，并发数随延迟自适应
+                with profiler if profiler is not None else nullcontext():
+                    table = scan_tree(folder_path, on_subtree_done=on_subtree_done,
+                                      should_stop=session.token, index=index, backend="auto",
+                                      top_n=self.top_n if self.track_largest.get() else 0,
+                                      on_progress=on_progress, links=self.count_links.get())
+            finally:
+                if index is not None:
+                    index.close()
+            if profiler is not None:
+                profiler.dump(table)
+            
+            # 符号链接等未被遍历到的文件夹标记为未完成
+            incomplete = [
+                (i, "已取消" if session.token.cancelled else "无法计算")
+                for i in range(total) if i not in reported
+            ]
+            if incomplete:
+                session.post(self._mark_incomplete, incomplete)
+            
+            # 更新最终状态
+            if session.token.cancelled:
+                session.status(f"扫描已中止，完成 {completed}/{total}")
+            else:
+                if table.freeable is not None:
+                    session.status(f"扫描完成，共 {total} 个文件夹，占用磁盘 {human_readable_size(table.disk_sizes[0])}，"
+                                   f"{table.extra_links} 个硬链接未重复计算")
+                else:
+                    session.status(f"扫描完成，共 {total} 个文件夹")
+                session.post(self._sort_folders)
+                largest_files = table.largest_files.items() if table.largest_files is not None else []
+                session.post(self._set_largest, largest_files, table.largest_dirs(self.top_n))
+                session.post(self._set_table, table)
+                if self.keep_snapshots.get():
+                    try:
+                        from snapshot import save_snapshot
+                        save_snapshot(table)
+                    except OSError as e:
+                        session.status(f"扫描完成，共 {total} 个文件夹，快照保存失败: {e}")
+                if self.watch_changes.get():
+                    # 监视在会话取消（重新扫描或停止）时结束
+                    from watcher import TreeWatcher
+                    watcher = TreeWatcher(
+                        table, should_stop=session.token,
+                        on_change=lambda totals, added, removed, deltas: session.post(
+                            self._apply_watch_changes, totals, added, removed, deltas),
+                    ).start()
+                    self.watcher = watcher
+                    mode = "inotify" if watcher.backend == "inotify" else "轮询"
+                    session.status(f"扫描完成，共 {total} 个文件夹，正在监视变化（{mode}）")
+            
+        except Exception as e:
+            session.post(messagebox.showerror, "错误", f"扫描过程中出错: {str(e)}")
+            session.status("扫描出错")
+    
+    def _queue_scan(self):
+        """把输入的根目录加入正在进行的多根目录扫描；没有这样的扫描时开始一个新的"""
+        self._create_secondary_widgets()
+        roots = self._entry_roots()
+        if roots is None:
+            return
+        multi = self.multi_scan
+        if multi is not None and self.scan_thread is not None and self.scan_thread.is_alive():
+            rejected = []
+            for root in roots:
+                try:
+                    if not multi.add(root):
+                        rejected.append(root)
+                except ValueError as e:
+                    # 包含正在扫描的目录，同时扫描会重复计算
+                    messagebox.showinfo("提示", str(e))
+                    return
+            if not rejected:
+                self.status_label.configure(text=f"已加入队列: {'，'.join(roots)}")
+                return
+            # 扫描刚结束、线程正在收尾：不取消它的会话，等最终结果都显示出来再扫描剩下的目录
+            self.status_label.configure(text="上一批目录正在收尾，完成后开始扫描新加入的目录")
+            self._queue_after_finish(multi, rejected)
+            return
+        if self._busy():
+            messagebox.showinfo("提示", "请等待当前扫描或删除完成，或停止后再加入队列")
+            return
+        self._append_scan(roots)
+    
+    def _queue_after_finish(self, multi, roots):
+        if self.multi_scan is not multi:
+            return  # 期间开始了其他扫描
+        if self._busy() or self.scheduler.pending():
+            self.after(QUEUE_RETRY_MS, self._queue_after_finish, multi, roots)
+            return
+        self._append_scan(roots)
+    
+    def _append_scan(self, roots):
+        if self.multi_scan is None:
+            self._clear_results()
+        else:
+            # 上一次多根目录扫描已经结束：新的根目录接在已有结果之后；与已扫描的目录相同、
+            # 位于其中或包含它们的目录会重复计算，跳过
+            from multi_scan import overlaps
+            roots = [root for root in roots if not any(overlaps(root, done) for done in self.tables)]
+            if not roots:
+                self.status_label.configure(text="这些目录与已扫描的目录重叠，先点击\"扫描\"清除结果再扫描")
+                return
+        self._start_multi_scan(roots, first_row=len(self.model))
+    
+    def _start_multi_scan(self, roots, first_row=0):
+        from multi_scan import MultiScan, collapse_roots
+        
+        # 位于其他根目录之中的目录已经包含在那个目录的结果中
+        roots, nested = collapse_roots(roots)
+        session = self._new_session()
+        session.status(f"正在扫描 {len(roots)} 个目录..."
+                       + (f"（{len(nested)} 个目录位于其他目录中，不再单独扫描）" if nested else ""))
+        multi = MultiScan(should_stop=session.token, top_n=self.top_n if self.track_largest.get() else 0)
+        for root in roots:
+            multi.add(root)
+        self.multi_scan = multi
+        self.scan_thread = threading.Thread(target=self._scan_roots, args=(multi, session, first_row))
+        self.scan_thread.daemon = True
+        self.scan_thread.start()
+    
+    def _scan_roots(self, multi, session, first_row):
+        """多个根目录共用一个线程池扫描，所有根目录的顶层子文件夹合并到同一个列表中"""
+        from scan_engine import ScanProgress
+        from size_index import open_default_index
+        rows = {}  # 顶层子文件夹路径 -> 行号，行在扫描线程中按加入顺序编号，接在 first_row 之后
+        reported = set()
+        roots_done = 0
+        
+        def on_root_start(table):
+            children = table.children(0)
+            paths = [table.path(child) for child in children]
+            for path in paths:
+                rows[path] = first_row + len(rows)
+            session.post(self._add_root_rows, paths, [table.mtimes[child] / 1e9 for child in children], table.root)
+        
+        def on_subtree_done(root, path, size_bytes, file_count):
+            row = rows.get(path)
+            if row is not None:
+                reported.add(row)
+                session.size(row, size_bytes, file_count)
+        
+        def on_progress(partials, files, bytes_done, elapsed):
+            for path, (size_bytes, file_count) in partials.items():
+                if path in rows:
+                    session.size(rows[path], size_bytes, file_count, partial=True)
+            elapsed = max(elapsed, 1e-6)
+            session.status(
+                f"已完成 {roots_done}/{len(multi.tables)} 个目录，{files} 个文件，"
+                f"{files / elapsed:,.0f} 文件/秒，{human_readable_size(bytes_done / elapsed)}/秒"
+            )
+        
+        def on_root_done(table):
+            nonlocal roots_done
+            roots_done += 1
+            if table.complete and self.keep_snapshots.get():
+                try:
+                    from snapshot import save_snapshot
+                    save_snapshot(table)
+                except OSError:
+                    pass
+            session.post(self._set_root_table, table)
+        
+        multi.index = open_default_index()
+        multi.on_root_start = on_root_start
+        multi.on_subtree_done = on_subtree_done
+        multi.on_root_done = on_root_done
+        multi.progress = ScanProgress(on_progress)
+        try:
+            tables = multi.run()
+        except Exception as e:
+            session.post(messagebox.showerror, "错误", f"扫描过程中出错: {str(e)}")
+            session.status("扫描出错")
+            return
+        finally:
+            if multi.index is not None:
+                multi.index.close()
+        
+        incomplete = [(row, "已取消" if session.token.cancelled else "无法计算")
+                      for row in rows.values() if row not in reported]
+        if incomplete:
+            session.post(self._mark_incomplete, incomplete)
+        if session.token.cancelled:
+            session.status(f"扫描已中止，完成 {roots_done}/{len(tables)} 个目录")
+        else:
+            errors = sum(1 for table in tables if table.errors)
+            session.status(f"扫描完成，共 {len(tables)} 个目录，{len(rows)} 个文件夹"
+                           + (f"，{errors} 个目录有无法读取的内容" if errors else ""))
+            session.post(self._sort_folders)
+            if any(table.largest_files is not None for table in tables):
+                from scan_engine import TopN
+                largest = TopN(self.top_n)
+                for table in tables:
+                    if table.largest_files is not None:
+                        largest.merge(table.largest_files.heap)
+                dirs = sorted((item for table in tables for item in table.largest_dirs(self.top_n)),
+                              key=lambda item: item[1], reverse=True)[:self.top_n]
+                session.post(self._set_largest, largest.items(), dirs)
+    
+    def _add_root_rows(self, paths, mtimes, root):
+        self.model.extend(paths, mtimes, root)
+        self.result_list.refresh()
+    
+    def _set_root_table(self, table):
+        """多根目录扫描中一个根目录完成：记录目录表，子树最新修改时间用于按规则选择"""
+        self.tables[table.root] = table
+        for child in table.children(0):
+            row = self.model.find(table.path(child))
+            if row >= 0:
+                self.model.newest[row] = table.newest[child] / 1e9
+    
+    def _create_folder_rows(self, subfolders, mtimes):
+        """载入新的文件夹列表，只有可见行会创建控件"""
+        self.model.reset(subfolders, mtimes)
+        self.result_list.first = 0
+        self.result_list.refresh()
+    
+    def _apply_size_updates(self, updates):
+        rows = []
+        for idx, (size_bytes, file_count, partial) in updates.items():
+            if idx >= len(self.model):
+                continue
+            if partial:
+                self.model.set_partial(idx, size_bytes, file_count)
+            else:
+                self.model.set_size(idx, size_bytes, file_count)
+            rows.append(idx)
+        self.result_list.refresh_rows(rows)
+    
+    def _set_table(self, table):
+        self.table = table
+        self.level = 0
+        self._update_breadcrumb()
+        # 子树最新修改时间在扫描时已经汇总，按"多久未修改"选择时直接使用
+        for child in table.children(0):
+            row = self.model.find(table.path(child))
+            if row >= 0:
+                self.model.newest[row] = table.newest[child] / 1e9
+                if table.freeable is not None:
+                    self.model.freeable[row] = table.freeable[child]
+        if table.freeable is not None:
+            self.result_list.refresh()
+    
+    def _drill_down(self, folder_path):
+        """展开一个文件夹，数据来自扫描时建立的目录表"""
+        if self.tables and self.table is None:
+            self.status_label.configure(text="同时扫描多个目录时不支持展开子文件夹")
+            return
+        if self.table is None or self._busy():
+            self.status_label.configure(text="扫描完成后可以展开子文件夹")
+            return
+        idx = self.table.index_of(folder_path)
+        if idx < 0:
+            return
+        if not any(child not in self.removed_dirs for child in self.table.children(idx)):
+            self.status_label.configure(text=f"{os.path.basename(folder_path)} 没有子文件夹")
+            return
+        self._show_level(idx)
+    
+    def _show_level(self, idx):
+        table = self.table
+        children = [child for child in table.children(idx) if child not in self.removed_dirs]
+        self.level = idx
+        self.model.reset([table.path(child) for child in children],
+                         [table.mtimes[child] / 1e9 for child in children])
+        for row, child in enumerate(children):
+            self.model.set_size(row, table.sizes[child], table.files[child])
+            self.model.newest[row] = table.newest[child] / 1e9
+            if table.freeable is not None:
+                self.model.freeable[row] = table.freeable[child]
+        self.result_list.first = 0
+        self._sort_folders()
+        self.result_list.refresh()
+        self._update_breadcrumb()
+        self.status_label.configure(
+            text=f"{table.path(idx)}：{len(children)} 个子文件夹，共 {human_readable_size(table.sizes[idx])}"
+        )
+    
+    def _update_breadcrumb(self):
+        for widget in self.breadcrumb_frame.winfo_children():
+            widget.destroy()
+        if self.table is None:
+            return
+        chain = []
+        idx = self.level
+        while idx >= 0:
+            chain.append(idx)
+            idx = self.table.parents[idx]
+        for position, idx in enumerate(reversed(chain)):
+            if position:
+                ctk.CTkLabel(self.breadcrumb_frame, text="›").pack(side="left")
+            text = self.table.root if idx == 0 else self.table.names[idx]
+            ctk.CTkButton(self.breadcrumb_frame, text=text, width=20, height=24, fg_color="transparent",
+                          text_color=("gray10", "gray90"),
+                          command=lambda i=idx: self._show_level(i)).pack(side="left", padx=2)
+    
+    def _apply_watch_changes(self, totals, added, removed, deltas):
+        """监视到文件系统变化后直接更新受影响的行"""
+        updates = {}
+        for path, (size_bytes, file_count) in totals.items():
+            row = self.model.find(path)
+            if row >= 0:
+                updates[row] = (size_bytes, file_count, False)
+        if updates:
+            self._apply_size_updates(updates)
+        gone = [(row, "已删除") for row in map(self.model.find, removed) if row >= 0]
+        if gone:
+            self._mark_incomplete(gone)
+        if self.table is not None:
+            # 把各目录的变化累加到目录表中它和所有上级目录，展开任意一层都显示最新的大小；
+            # 新出现的目录不在表中，记到表中最近的上级
+            # 已删除的文件夹在删除完成时已经从汇总中减去，监视到的同一变化不再重复计入
+            table = self.table
+            touched = table.apply_deltas(deltas, skip=self.removed_dirs)
+            if self.level > 0:
+                # 当前显示的是下层文件夹，各行的大小直接取自目录表
+                updates = {}
+                for idx in touched:
+                    if table.parents[idx] == self.level:
+                        row = self.model.find(table.path(idx))
+                        if row >= 0:
+                            updates[row] = (table.sizes[idx], table.files[idx], False)
+                if updates:
+                    self._apply_size_updates(updates)
+        if added:
+            self.status_label.configure(text=f"新增 {len(added)} 个文件夹，重新扫描后显示")
+    
+    def _mark_incomplete(self, incomplete_items):
+        """标记未完成的项目"""
+        rows = []
+        for idx, status in incomplete_items:
+            if idx < len(self.model):
+                self.model.set_status(idx, status)
+                rows.append(idx)
+        self.result_list.refresh_rows(rows)
+    
+    def _toggle_sort(self):
+        self.sort_asc = not self.sort_asc
+        self.sort_button.configure(text="↑" if self.sort_asc else "↓")
+        self._sort_folders()
+    
+    def _change_sort_key(self, label):
+        self.sort_key = next(key for key, text in SORT_LABELS.items() if text == label)
+        self._sort_folders()
+    
+    def _sort_folders(self):
+        if not len(self.model):
+            return
+        
+        # 使用预先计算的排列，只调整显示顺序，列表只更新内容变化的可见行
+        self.model.set_sort(self.sort_key, reverse=not self.sort_asc)
+        self.result_list.refresh()
+    
+    def _apply_filter(self):
+        try:
+            self.model.set_filter(self.filter_entry.get().strip(), regex=self.filter_regex.get())
+        except re.error:
+            return  # 正则表达式尚未输入完整
+        self.result_list.refresh()
+    
+    def _select_small_folders(self):
+        self.model.select_smaller_than(self.default_min_size)  # 小于20MB
+        self.result_list.refresh()
+    
+    def _current_preset(self):
+        name = self.preset_menu.get()
+        return next((rule for rule in self.presets if rule.name == name), None)
+    
+    def _apply_preset(self):
+        rule = self._current_preset()
+        if rule is not None:
+            self._apply_rule(rule)
+    
+    def _apply_rule(self, rule):
+        if rule.older_than_days is not None and self.table is None and not self.tables:
+            messagebox.showinfo("提示", "按修改时间选择需要先完成一次扫描")
+            return
+        self.model.select_rule(rule)
+        self.result_list.refresh()
+        self.status_label.configure(text=f"规则 {rule.name or '(未命名)'} 选中 {self.model.selected_count()} 个文件夹")
+    
+    def _edit_rule(self):
+        """编辑规则：可以直接应用，也可以保存为预设"""
+        from selection_rules import SelectionRule, save_presets
+        rule = self._current_preset() or SelectionRule()
+        window = ctk.CTkToplevel(self)
+        window.title("编辑规则")
+        window.geometry("420x420")
+        window.grid_columnconfigure(1, weight=1)
+        
+        def number_text(value):
+            return "" if value is None else f"{value:g}"
+        
+        fields = [
+            ("name", "名称", rule.name),
+            ("patterns", "名称模式（逗号分隔）", ", ".join(rule.patterns)),
+            ("min_size", "最小大小（如 100MB）", "" if rule.min_size is None else human_readable_size(rule.min_size).replace(" ", "")),
+            ("max_size", "最大大小（不含）", "" if rule.max_size is None else human_readable_size(rule.max_size).replace(" ", "")),
+            ("older_than_days", "至少多少天未修改", number_text(rule.older_than_days)),
+            ("min_files", "最少文件数", number_text(rule.min_files)),
+            ("max_files", "最多文件数", number_text(rule.max_files)),
+        ]
+        entries = {}
+        for row, (key, label, value) in enumerate(fields):
+            ctk.CTkLabel(window, text=label).grid(row=row, column=0, padx=10, pady=5, sticky="w")
+            entry = ctk.CTkEntry(window)
+            entry.grid(row=row, column=1, padx=10, pady=5, sticky="ew")
+            entry.insert(0, value)
+            entries[key] = entry
+        regex_var = ctk.BooleanVar(value=rule.regex)
+        ctk.CTkCheckBox(window, text="名称模式为正则表达式", variable=regex_var).grid(
+            row=len(fields), column=0, columnspan=2, padx=10, pady=5, sticky="w")
+        
+        def build():
+            values = {key: entry.get().strip() for key, entry in entries.items()}
+            data = {"name": values["name"], "regex": regex_var.get(),
+                    "patterns": [p.strip() for p in values["patterns"].split(",") if p.strip()]}
+            for key in ("min_size", "max_size", "older_than_days", "min_files", "max_files"):
+                if values[key]:
+                    data[key] = values[key]
+            try:
+                return SelectionRule.from_dict(data)
+            except ValueError as e:
+                messagebox.showerror("错误", str(e), parent=window)
+                return None
+        
+        def apply():
+            new_rule = build()
+            if new_rule is not None:
+                self._apply_rule(new_rule)
+        
+        def save():
+            new_rule = build()
+            if new_rule is None:
+                return
+            if not new_rule.name:
+                messagebox.showerror("错误", "请输入规则名称", parent=window)
+                return
+            presets = [preset for preset in self.presets if preset.name != new_rule.name]
+            presets.append(new_rule)
+            try:
+                save_presets(presets)
+            except OSError as e:
+                messagebox.showerror("错误", f"无法保存规则: {e}", parent=window)
+                return
+            self.presets = presets
+            self.preset_menu.configure(values=[preset.name for preset in presets])
+            self.preset_menu.set(new_rule.name)
+            window.destroy()
+        
+        button_frame = ctk.CTkFrame(window, fg_color="transparent")
+        button_frame.grid(row=len(fields) + 1, column=0, columnspan=2, pady=10)
+        ctk.CTkButton(button_frame, text="应用", width=80, command=apply).pack(side="left", padx=5)
+        ctk.CTkButton(button_frame, text="保存为预设", width=100, command=save).pack(side="left", padx=5)
+    
+    def _select_all(self):
+        self.model.set_all(True)
+        self.result_list.refresh()
+    
+    def _deselect_all(self):
+        self.model.set_all(False)
+        self.result_list.refresh()
+    
+    def _build_delete_plan(self):
+        """由选中的行生成删除计划，大小和条目数来自扫描结果，不访问磁盘"""
+        from delete_plan import build_plan
+        rows = self.model.selected_rows()
+        if not rows:
+            return None
+        sizes = {self.model.path(row): (self.model.sizes[row], self.model.files[row]) for row in rows}
+        if self.table is not None:
+            root = self.table.root
+        else:
+            # 多根目录扫描时按第一个选中行所属的根目录估计删除速度
+            root = self.model.root_of(rows[0]) or next(iter(self._entry_paths()), "")
+        return build_plan(root, list(sizes), self.table, fallback=sizes.get)
+    
+    def _show_delete_plan(self):
+        """预演删除：显示将释放的空间、条目数和预计耗时，可以导出给命令行在其他时间执行"""
+        plan = self._build_delete_plan()
+        if plan is None:
+            messagebox.showinfo("提示", "未选择任何文件夹")
+            return
+        
+        lines = plan.summary() + [""]
+        lines += [f"{human_readable_size(item.size) if item.size >= 0 else '未知':>12}  {item.entries:>9} 个条目  "
+                  f"{item.path}" for item in sorted(plan.items, key=lambda item: item.size, reverse=True)]
+        if plan.nested:
+            lines += ["", "包含在其他选中文件夹中的选择:"]
+            lines += [f"    {path}  （在 {parent} 中）" for path, parent in plan.nested]
+        
+        def export():
+            path = filedialog.asksaveasfilename(parent=window, defaultextension=".json",
+                                                filetypes=[("删除计划", "*.json")],
+                                                initialfile="delete_plan.json")
+            if not path:
+                return
+            try:
+                plan.save(path)
+            except OSError as e:
+                messagebox.showerror("错误", f"无法保存删除计划: {e}", parent=window)
+                return
+            messagebox.showinfo("提示", f"已导出，可以用以下命令执行:\n"
+                                f"folder_cleaner delete --plan \"{path}\" --yes", parent=window)
+        
+        window = self._show_text_window("删除计划", lines)
+        ctk.CTkButton(window, text="导出计划...", command=export).pack(pady=(0, 10))
+    
+    def _delete_selected(self):
+        plan = self._build_delete_plan()
+        
+        if plan is None:
+            messagebox.showinfo("提示", "未选择任何文件夹")
+            return
+        
+        if self._busy():
+            messagebox.showinfo("提示", "请等待当前扫描或删除完成")
+            return
+        
+        confirm = messagebox.askyesno(
+            "确认删除", 
+            "\n".join(plan.summary()) + "\n\n此操作不可恢复！确定要删除吗？"
+        )
+        
+        if not confirm:
+            return
+        
+        # 在后台线程中并行删除，进度通过UI队列显示；包含在其他选中文件夹中的选择不再单独删除
+        self.stop_delete = False
+        self.delete_thread = threading.Thread(target=self._delete_folders, args=(plan.paths, plan.root))
+        self.delete_thread.daemon = True
+        self.delete_thread.start()
+    
+    def _delete_folders(self, folders, root):
+        from delete_engine import delete_trees
+        from delete_plan import record_delete_rate
+        
+        def on_progress(freed_bytes, freed_entries, done, total):
+            self._update_status(
+                f"正在删除 {done}/{total}，已释放 {human_readable_size(freed_bytes)}，"
+                f"{freed_entries} 个条目"
+            )
+        
+        try:
+            result = delete_trees(folders, on_progress=on_progress,
+                                  should_stop=lambda: self.stop_delete)
+        except Exception as e:
+            self._add_to_ui_queue(messagebox.showerror, "错误", f"删除过程中出错: {str(e)}")
+            self._update_status("删除出错")
+            return
+        # 记录这个卷上实测的删除速度，下次预估更准确
+        record_delete_rate(root, result)
+        self._add_to_ui_queue(self._finish_delete, result)
+    
+    def _finish_delete(self, result):
+        """删除完成后直接更新受影响的行，不重新扫描"""
+        from delete_plan import format_duration
+        removed = []
+        changed = []
+        for root in result.roots:
+            if self.table is not None:
+                # 目录表中同步减去已删除的部分，返回上一级时大小仍然正确
+                idx = self.table.index_of(root)
+                if idx > 0 and root in result.deleted:
+                    self.table.discount(idx, self.table.sizes[idx], self.table.files[idx])
+                    self.removed_dirs.add(idx)
+                elif idx > 0 and not (self.watcher is not None and self.watcher.running):
+                    # 部分删除，减去已释放的部分；监视模式下由监视器按实际删除的内容更新目录表，不在这里重复减去
+                    self.table.discount(idx, result.freed_bytes[root], result.freed_entries[root])
+            row = self.model.find(root)
+            if row < 0:
+                continue
+            if root in result.deleted:
+                removed.append(row)
+            elif result.freed_bytes[root] and self.model.sizes[row] >= 0:
+                # 部分删除：从原大小中减去已释放的部分
+                self.model.set_size(
+                    row,
+                    max(0, self.model.sizes[row] - result.freed_bytes[root]),
+                    max(0, self.model.files[row] - result.freed_entries[root]),
+                )
+                changed.append(row)
+        if removed:
+            self.model.remove_rows(removed)
+            self.result_list.refresh()
+        elif changed:
+            self.result_list.refresh_rows(changed)
+        
+        status = "删除已取消" if result.cancelled else "删除完成"
+        self.status_label.configure(
+            text=f"{status}，释放 {human_readable_size(result.total_bytes)}，{result.total_entries} 个条目，"
+                 f"用时 {format_duration(result.elapsed)}"
+        )
+        
+        message = f"成功删除 {len(result.deleted)} 个文件夹, 失败 {len(result.failures)} 个"
+        if result.failures:
+            details = []
+            for root, errors in list(result.failures.items())[:5]:
+                path, reason = errors[0]
+                more = f" 等 {len(errors)} 处" if len(errors) > 1 else ""
+                details.append(f"{os.path.basename(root)}: {reason} ({path}){more}")
+            message += "\n\n" + "\n".join(details)
+        messagebox.showinfo("删除结果", message)
+    
+    def _set_largest(self, largest_files, largest_dirs):
+        self.largest_files = largest_files
+        self.largest_dirs = largest_dirs
+    
+    def _show_largest(self):
+        """在新窗口中显示任意层级中最大的文件和文件夹"""
+        if not self.largest_dirs:
+            messagebox.showinfo("提示", "请先完成一次扫描")
+            return
+        
+        lines = [f"最大的 {len(self.largest_dirs)} 个文件夹:"]
+        lines += [f"{human_readable_size(size):>12}  {path}" for path, size in self.largest_dirs]
+        if self.largest_files:
+            lines += ["", f"最大的 {len(self.largest_files)} 个文件:"]
+            lines += [f"{human_readable_size(size):>12}  {path}" for path, size in self.largest_files]
+        else:
+            lines += ["", "勾选\"统计最大文件\"后重新扫描可以列出最大的文件"]
+        self._show_text_window("最大的文件和文件夹", lines)
+    
+    def _start_show_growth(self):
+        from snapshot import list_snapshots
+        # 目录本身已经不存在时仍然可以比较它以前的快照
+        folder_path = self._entry_root("查看增长", must_exist=False)
+        if folder_path is None:
+            return
+        if len(list_snapshots(folder_path)) < 2:
+            messagebox.showinfo("提示", "该目录的快照不足两个，勾选\"保存快照\"后再扫描")
+            return
+        # 大目录的比较需要几秒，在后台线程中进行
+        thread = threading.Thread(target=self._show_growth, args=(folder_path,))
+        thread.daemon = True
+        thread.start()
+    
+    def _show_growth(self, folder_path):
+        """比较最近的两次快照，显示增长最多的文件夹"""
+        from snapshot import Snapshot, diff_snapshots, list_snapshots
+        self._update_status("正在比较最近的两次快照...")
+        try:
+            old_path, new_path = list_snapshots(folder_path)[-2:]
+            with Snapshot(old_path) as old, Snapshot(new_path) as new:
+                lines = diff_snapshots(old, new, top=self.top_n).lines()
+        except (OSError, ValueError) as e:
+            self._add_to_ui_queue(messagebox.showerror, "错误", f"无法比较快照: {e}")
+            self._update_status("比较快照失败")
+            return
+        self._add_to_ui_queue(self._show_text_window, "与上次扫描相比", lines)
+        self._update_status("快照比较完成")
+    
+    def _show_text_window(self, title, lines):
+        """在新窗口中显示只读文本"""
+        window = ctk.CTkToplevel(self)
+        window.title(title)
+        window.geometry("700x500")
+        textbox = ctk.CTkTextbox(window, wrap="none")
+        textbox.pack(fill="both", expand=True, padx=10, pady=10)
+        textbox.insert("1.0", "\n".join(lines))
+        textbox.configure(state="disabled")
+        return window
+    
+    def _start_find_duplicates(self):
+        folder_path = self._entry_root("查找重复文件")
+        if folder_path is None:
+            return
+        if self._busy():
+            messagebox.showinfo("提示", "请等待当前扫描或删除完成")
+            return
+        
+        session = self._new_session()
+        self.scan_thread = threading.Thread(target=self._find_duplicates, args=(folder_path, session))
+        self.scan_thread.daemon = True
+        self.scan_thread.start()
+    
+    def _find_duplicates(self, folder_path, session):
+        import sqlite3
+        from duplicates import HashCache, find_duplicates
+        cache = None
+        try:
+            try:
+                cache = HashCache()
+            except (OSError, sqlite3.Error):
+                cache = None  # 缓存不可用时仍然可以查找，只是无法复用上次的哈希
+            groups = find_duplicates(folder_path, cache=cache, should_stop=session.token,
+                                     on_stage=lambda text: session.status(f"查找重复文件: {text}"))
+        except Exception as e:
+            session.post(messagebox.showerror, "错误", f"查找重复文件时出错: {str(e)}")
+            session.status("查找重复文件出错")
+            return
+        finally:
+            if cache is not None:
+                cache.close()
+        
+        total = sum(group.reclaimable for group in groups)
+        session.status(f"找到 {len(groups)} 组重复文件，可释放 {human_readable_size(total)}")
+        lines = [f"共 {len(groups)} 组重复文件，可释放 {human_readable_size(total)}"]
+        for group in groups:
+            lines.append("")
+            lines.append(f"可释放 {human_readable_size(group.reclaimable)}"
+                         f"（{len(group.paths)} 个文件，每个 {human_readable_size(group.size)}）")
+            lines += [f"    {path}" for path in group.paths]
+        session.post(self._show_text_window, "重复文件", lines)
+    
+    def _stop_current(self):
+        """停止正在进行的扫描或删除"""
+        if self.session is not None:
+            self.session.token.cancel()
+        self.stop_delete = True
+    
+    def _open_folder(self, folder_path):
+        """打开资源管理器显示指定文件夹"""
+        try:
+            # 使用Windows资源管理器打开文件夹
+            if os.path.exists(folder_path):
+                os.startfile(folder_path)
+            else:
+                messagebox.showerror("错误", f"文件夹不存在: {folder_path}")
+        except Exception as e:
+            messagebox.showerror("错误", f"无法打开文件夹: {str(e)}")
+
+
+def run():
+    # 减少CTk的动画效果以提高流畅度
+    ctk.deactivate_automatic_dpi_awareness()  # 禁用DPI自动调整
+    
+    app = FolderCleanerApp()
+    if os.environ.get(STARTUP_ENV):
+        # 启动测试：第二批控件建好、再处理完一轮事件后输出耗时并退出
+        def report():
+            if "ready" not in app.startup:
+                app.after(1, report)
+                return
+            print(json.dumps(app.startup), flush=True)
+            app.destroy()
+        app.after_idle(lambda: app.after(1, report))
+    app.mainloop()
@@ -0,0 +1,269 @@
+import concurrent.futures
+import os
+import threading
+import time
+from collections import deque
+
+from parallel_scan import CHUNK_BUDGET, ChunkMerger, scan_chunk
+from scan_engine import PROGRESS_INTERVAL, DirTable, ScanProgress, TopN, is_network_path
+
+PER_DEVICE_LIMIT = 4  # 同一设备上同时进行的任务数（SSD等）
+ROTATIONAL_LIMIT = 1  # 机械硬盘同时只有一个任务，多个根目录在同一块盘上时不会来回寻道
+NETWORK_LIMIT = 16  # 网络共享的瓶颈是往返延迟，可以有更多任务同时等待
+WAIT_TIMEOUT = 0.2  # 调度循环等待任务完成的最长时间(秒)，期间加入的根目录最多延迟这么久开始
+
+
+# 路径所在的设备，同一设备上的根目录共用并发限额；无法访问时按路径本身区分
+def device_of(path):
+    try:
+        return os.stat(path).st_dev
+    except OSError:
+        return os.path.normcase(os.path.abspath(path))
+
+
+# Linux下由 /sys/dev/block 判断设备是否为机械硬盘，分区的信息在其所属磁盘的目录中
+def _is_rotational(device):
+    if not isinstance(device, int) or not os.path.isdir("/sys/dev/block"):
+        return False
+    base = f"/sys/dev/block/{os.major(device)}:{os.minor(device)}"
+    for queue in (os.path.join(base, "queue"), os.path.join(base, "..", "queue")):
+        try:
+            with open(os.path.join(queue, "rotational"), encoding="ascii") as f:
+                return f.read().strip() == "1"
+        except OSError:
+            continue
+    return False
+
+
+# 一个设备上同时进行的任务数：网络共享、机械硬盘、其他设备分别使用不同的默认值
+def device_limit(path, device=None):
+    if is_network_path(path):
+        return NETWORK_LIMIT
+    if _is_rotational(device_of(path) if device is None else device):
+        return ROTATIONAL_LIMIT
+    return PER_DEVICE_LIMIT
+
+
+# 判断根目录是否重叠时使用的路径：解析符号链接，经不同路径到达的同一目录也能识别
+def _root_key(path):
+    return os.path.normcase(os.path.realpath(path))
+
+
+def _contains(outer, inner):
+    return inner == outer or inner.startswith(outer.rstrip(os.sep) + os.sep)
+
+
+# 两个根目录相同或其中一个位于另一个之中；重叠的根目录同时扫描时同一棵子树会被计入两次
+def overlaps(a, b):
+    a, b = _root_key(a), _root_key(b)
+    return _contains(a, b) or _contains(b, a)
+
+
+# 去掉与其他根目录相同或位于其中的根目录，返回 (保留的根目录, 去掉的根目录)，都保持原顺序
+def collapse_roots(roots):
+    keys = [_root_key(root) for root in roots]
+    kept = []
+    dropped = []
+    for i, root in enumerate(roots):
+        covered = any(
+            j != i and _contains(other, keys[i]) and (other != keys[i] or j < i)
+            for j, other in enumerate(keys)
+        )
+        (dropped if covered else kept).append(root)
+    return kept, dropped
+
+
+class _RootScan:
+    """一个根目录的扫描状态：目录表、待派发的任务和正在进行的任务数"""
+
+    __slots__ = ("root", "table", "merger", "pending", "running", "device", "limit", "busy")
+
+    def __init__(self, root, device, limit, top_n, progress):
+        self.root = root
+        self.table = DirTable(root)
+        self.table.largest_files = TopN(top_n) if top_n else None
+        self.merger = ChunkMerger(self.table, progress)
+        self.pending = deque([(0, root)])  # 第一个任务列出根目录本身
+        self.merger.started(0)  # 任务进入队列时就计入，顶层子文件夹不会在剩余部分派发之前被当作完成
+        self.running = 0
+        self.device = device
+        self.limit = limit
+        self.busy = 0.0  # 已完成的任务累计占用的时间(秒)，用于在根目录之间公平分配
+
+
+class MultiScan:
+    """多个根目录共用一个线程池的扫描，扫描过程中还可以继续加入根目录
+
+    任务优先派发给正在进行的任务最少、累计占用时间最短的根目录，大根目录不会让后加入的小根目录
+    一直等待；每个设备同时进行的
+    任务数有上限，同一设备上的根目录共用这个限额。per_device 为None时按设备类型选择
+    （见 device_limit），否则所有设备使用同一个上限。
+    每个根目录的结果与 scan_tree(backend="thread") 相同，完整扫描后写回索引。
+
+    回调都在调用 run() 的线程中执行：
+    on_root_start(目录表) 在根目录的直接子文件夹列出后调用，
+    on_subtree_done(根目录, 路径, 大小, 文件数) 在一个顶层子文件夹扫描完毕时调用，
+    on_root_done(目录表) 在一个根目录扫描完成、已经汇总后调用，
+    on_progress 与 scan_tree 相同，部分大小包括所有根目录中仍在扫描的顶层子文件夹。
+    """
+
+    def __init__(self, workers=None, per_device=None, should_stop=None, index=None, top_n=0, budget=CHUNK_BUDGET,
+                 on_root_start=None, on_subtree_done=None, on_root_done=None, on_progress=None,
+                 progress_interval=PROGRESS_INTERVAL):
+        self.workers = workers or min(32, (os.cpu_count() or 2) * 4)
+        self.per_device = per_device
+        self.should_stop = should_stop or (lambda: False)
+        self.index = index
+        self.top_n = top_n
+        self.budget = budget
+        self.on_root_start = on_root_start
+        self.on_subtree_done = on_subtree_done
+        self.on_root_done = on_root_done
+        self.progress = ScanProgress(on_progress, progress_interval) if on_progress is not None else None
+        self.tables = []  # 按加入顺序排列的目录表
+        self._lock = threading.Lock()
+        self._queued = deque()
+        self._keys = set()
+        self._closed = False
+        self._active = deque()  # 正在扫描的 _RootScan，最近派发过的排在后面
+        self._device_running = {}  # 设备 -> 正在进行的任务数
+
+    def add(self, root):
+        """加入一个根目录，可以在其他线程中、扫描进行时调用
+
+        与已加入的根目录相同或位于其中的根目录被忽略；包含尚未开始扫描的根目录时取代它们，
+        包含已经开始扫描的根目录时抛出ValueError，否则同一棵子树会被计入两次。
+        run() 已经结束时返回False，调用方需要开始新的扫描。
+        """
+        key = _root_key(root)
+        with self._lock:
+            if self._closed:
+                return False
+            if any(_contains(other, key) for other in self._keys):
+                return True
+            inner = {other for other in self._keys if _contains(key, other)}
+            if inner:
+                queued = {_root_key(path): path for path in self._queued}
+                started = inner - queued.keys()
+                if started:
+                    raise ValueError(f"{root} 包含正在扫描的目录，请等这次扫描结束后再扫描")
+                for other in inner:
+                    self._queued.remove(queued[other])
+                self._keys -= inner
+            self._keys.add(key)
+            self._queued.append(root)
+        return True
+
+    def _start_queued(self):
+        while True:
+            with self._lock:
+                if not self._queued:
+                    return
+                root = self._queued.popleft()
+            device = device_of(root)
+            limit = self.per_device or device_limit(root, device)
+            state = _RootScan(root, device, limit, self.top_n, self.progress)
+            # 从已有根目录中最少的占用时间开始计，新根目录可以优先但不会长时间独占
+            state.busy = min((other.busy for other in self._active), default=0.0)
+            self.tables.append(state.table)
+            self._active.append(state)
+            try:
+                state.table.mtimes[0] = os.stat(root).st_mtime_ns
+            except OSError:
+                # 根目录无法访问：结果不完整，也不写回索引，但仍然通知调用方
+                state.table.errors += 1
+                self._finish_root(state, True, report=True)
+
+    def _dispatch(self, executor, running):
+        # 每次派发给正在进行的任务最少、其次累计占用时间最短的根目录，不超出其设备限额，
+        # 直到线程池占满或没有可派发的任务；同样少时按顺序轮流
+        while len(running) < self.workers:
+            state = None
+            for candidate in self._active:
+                if (candidate.pending and self._device_running.get(candidate.device, 0) < candidate.limit
+                        and (state is None or (candidate.running, candidate.busy) < (state.running, state.busy))):
+                    state = candidate
+            if state is None:
+                return
+            self._active.remove(state)
+            self._active.append(state)
+            g, path = state.pending.popleft()
+            # 第一个任务只列出根目录，各顶层子文件夹成为单独的任务，与 scan_tree_parallel 相同
+            budget = 1 if g == 0 else self.budget
+            future = executor.submit(scan_chunk, path, budget, self.top_n, self.should_stop)
+            running[future] = (state, g, path, time.monotonic())
+            state.running += 1
+            self._device_running[state.device] = self._device_running.get(state.device, 0) + 1
+
+    def _complete(self, state, g, path, future):
+        table = state.table
+        try:
+            leftover = state.merger.merge(g, path, future.result())
+        except Exception:
+            table.errors += 1
+            leftover = []
+        state.pending.extend(leftover)
+        for child, _ in leftover:
+            state.merger.started(child)
+        state.running -= 1
+        self._device_running[state.device] -= 1
+        subtree = state.merger.finished(g)
+        if subtree is not None and self.on_subtree_done is not None:
+            self.on_subtree_done(state.root, *subtree)
+        if g == 0 and self.on_root_start is not None:
+            self.on_root_start(table)
+        if not state.pending and not state.running:
+            self._finish_root(state, False)
+
+    def _finish_root(self, state, stopped, report=None):
+        state.table.finish(stopped, self.index)
+        self._active.remove(state)
+        if (not stopped if report is None else report) and self.on_root_done is not None:
+            self.on_root_done(state.table)
+
+    def run(self):
+        """扫描所有已加入和扫描过程中加入的根目录，返回按加入顺序排列的目录表
+
+        取消时未完成的目录表 complete 为False。
+        """
+        stopped = False
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers) as executor:
+            running = {}
+            while True:
+                if self.should_stop():
+                    stopped = True
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    break
+                self._start_queued()
+                self._dispatch(executor, running)
+                if not running:
+                    with self._lock:
+                        if not self._queued:
+                            self._closed = True
+                            break
+                    continue
+                done, _ = concurrent.futures.wait(running, timeout=WAIT_TIMEOUT,
+                                                  return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    state, g, path, started = running.pop(future)
+                    state.busy += time.monotonic() - started
+                    self._complete(state, g, path, future)
+                if self.progress is not None and self.progress.due():
+                    partials = {}
+                    for state in self._active:
+                        partials.update(state.merger.partials())
+                    self.progress.report(partials)
+
+        with self._lock:
+            self._closed = True
+        for state in list(self._active):
+            self._finish_root(state, stopped)
+        return self.tables
+
+
+# 一次扫描多个根目录，返回按参数顺序排列的目录表；参数与 MultiScan 相同
+def scan_roots(roots, **kwargs):
+    scan = MultiScan(**kwargs)
+    for root in roots:
+        scan.add(root)
+    return scan.run()
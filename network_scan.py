@@ -0,0 +1,277 @@
+import asyncio
+import concurrent.futures
+import errno
+import os
+import threading
+import time
+from array import array
+
+from scan_engine import CANCEL_CHECK_MASK, DirTable, TopN
+
+
+# 网络共享上的暂时性错误，与超时一样退避后重试；其他错误（如EACCES、ENOENT）立即放弃
+TRANSIENT_ERRNOS = frozenset(getattr(errno, name) for name in (
+    "ETIMEDOUT", "ECONNRESET", "ECONNABORTED", "EAGAIN", "EBUSY", "EIO", "EHOSTUNREACH", "ENETUNREACH", "ENETRESET",
+) if hasattr(errno, name))
+# Windows下SMB的暂时性错误码：ERROR_UNEXP_NET_ERR、ERROR_NETWORK_BUSY、ERROR_NETNAME_DELETED、ERROR_SEM_TIMEOUT
+TRANSIENT_WINERRORS = frozenset((59, 54, 64, 121))
+
+
+def _is_transient(error):
+    return error.errno in TRANSIENT_ERRNOS or getattr(error, "winerror", None) in TRANSIENT_WINERRORS
+
+
+class _IoPool:
+    """网络扫描专用的I/O线程池
+
+    超时只是放弃等待，已经在线程中运行的 os.scandir 会一直占着线程；共享挂起时这样的线程会占满
+    线程池，即使AIMD已经降低并发，扫描也会一直很慢。当前线程池中被放弃的调用达到线程数的一半时
+    换一个新的线程池，旧线程在调用返回后自行退出。所有线程池中挂起的调用总数达到 max_hung 后
+    不再更换，新的请求在队列中等到超时，线程数不会无限增长。
+    """
+
+    def __init__(self, workers, max_hung):
+        self.workers = workers
+        self.max_hung = max_hung
+        self.hung = 0  # 超时后仍未返回的调用数，所有线程池合计
+        self.replaced = 0
+        self._abandoned = 0  # 当前线程池中超时后仍未返回的调用数
+        self._lock = threading.Lock()
+        self.executor = self._new_executor()
+
+    def _new_executor(self):
+        return concurrent.futures.ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="net-scan")
+
+    async def run(self, timeout, func, *args):
+        executor = self.executor
+        future = executor.submit(func, *args)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            # 还在队列中的调用已随等待一起取消；已经开始运行的无法取消，只能放弃
+            if not future.cancelled():
+                self._abandon(executor, future)
+            raise
+
+    def _abandon(self, executor, future):
+        with self._lock:
+            self.hung += 1
+            if executor is self.executor:
+                self._abandoned += 1
+            replace = (executor is self.executor and self._abandoned * 2 >= self.workers
+                       and self.hung < self.max_hung)
+            if replace:
+                self.executor = self._new_executor()
+                self._abandoned = 0
+                self.replaced += 1
+        future.add_done_callback(lambda _: self._returned(executor))
+        if replace:
+            executor.shutdown(wait=False)
+
+    def _returned(self, executor):
+        # 在工作线程中调用：挂起的调用终于返回
+        with self._lock:
+            self.hung -= 1
+            if executor is self.executor:
+                self._abandoned -= 1
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class AimdLimiter:
+    """按观测到的请求延迟调整并发数：延迟正常时加性增加，超时或延迟突增时乘性减半"""
+
+    def __init__(self, initial=4, minimum=1, maximum=64, spike=3.0):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.spike = spike  # 延迟超过基线的倍数视为拥塞
+        self.baseline = None  # 观测到的较低延迟，指数平滑
+
+    def on_success(self, latency):
+        if self.baseline is None or latency < self.baseline:
+            self.baseline = latency
+        else:
+            self.baseline += (latency - self.baseline) * 0.05
+        if latency > self.baseline * self.spike and latency > 0.05:
+            self.on_congestion()
+        else:
+            # 每完成约一轮并发请求，并发数加一
+            self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+
+    def on_congestion(self):
+        self.limit = max(self.minimum, self.limit / 2)
+
+    @property
+    def allowed(self):
+        return int(self.limit)
+
+
+# 在I/O线程中列出一个目录，返回
+# (自身大小, 文件数, [(子目录名, 修改时间)], [(文件大小, 路径)], 文件中最新的修改时间)
+# 第四项是该目录中最大的top_n个文件；should_stop 返回True时提前结束，结果会被丢弃
+def list_dir(path, latency=0.0, top_n=0, should_stop=None):
+    if latency:
+        time.sleep(latency)  # 测试时模拟网络延迟
+    size = 0
+    count = 0
+    children = []
+    largest = TopN(top_n) if top_n else None
+    latest = 0
+    seen = 0
+    with os.scandir(path) as entries:
+        for entry in entries:
+            seen += 1
+            if should_stop is not None and not seen & CANCEL_CHECK_MASK and should_stop():
+                break
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    children.append((entry.name, entry.stat(follow_symlinks=False).st_mtime_ns))
+                elif entry.is_file(follow_symlinks=False):
+                    st = entry.stat(follow_symlinks=False)
+                    file_size = st.st_size
+                    size += file_size
+                    count += 1
+                    if st.st_mtime_ns > latest:
+                        latest = st.st_mtime_ns
+                    if largest is not None:
+                        largest.push(file_size, entry.path)
+            except OSError:
+                continue
+    return size, count, children, largest.heap if largest is not None else [], latest
+
+
+# 目录未变化时只stat已知的子目录，不重新列出文件
+def stat_children(path, names, latency=0.0):
+    if latency:
+        time.sleep(latency)
+    children = []
+    for name in names:
+        try:
+            children.append((name, os.stat(os.path.join(path, name), follow_symlinks=False).st_mtime_ns))
+        except OSError:
+            continue
+    return children
+
+
+# 面向网络共享（UNC路径、映射驱动器、NFS/SMB挂载）的扫描，结果与 scan_tree 相同。
+# 使用asyncio保持大量目录列表请求同时进行，并发数由AIMD根据延迟自动调整；
+# 每个目录单独计时，超时或连接重置等暂时性错误后重试，多次失败或权限不足等错误只计入errors，不会中止整个扫描。
+# latency 为测试用的注入延迟（秒），可以在本地目录上模拟高延迟的网络共享。
+# progress 为 ScanProgress 时，按时间间隔汇报各顶层子文件夹的部分大小。
+def scan_tree_network(root, on_subtree_done=None, should_stop=None, index=None,
+                      max_concurrency=64, timeout=10.0, retries=2, latency=0.0, top_n=0, progress=None):
+    return asyncio.run(_scan_async(root, on_subtree_done, should_stop, index,
+                                   max_concurrency, timeout, retries, latency, top_n, progress))
+
+
+async def _scan_async(root, on_subtree_done, should_stop, index,
+                      max_concurrency, timeout, retries, latency, top_n, progress):
+    # 专用的I/O线程池，避免占用默认线程池；挂起的请求不会阻塞扫描结束
+    pool = _IoPool(max_concurrency, max_hung=4 * max_concurrency)
+    limiter = AimdLimiter(maximum=max_concurrency)
+    table = DirTable(root)
+    largest = table.largest_files = TopN(top_n) if top_n else None
+    tops = array("q", [-1])
+    top_sizes = {}
+    top_files = {}
+    top_pending = {}
+    prefix = len(root)
+    stopped = False
+
+    try:
+        table.mtimes[0] = os.stat(root).st_mtime_ns
+    except OSError:
+        index = None
+    if index is not None:
+        start = time.perf_counter()
+        index.load(root)
+        table.timings["index_load"] = time.perf_counter() - start
+    save_index = index
+    if largest is not None:
+        index = None  # 缓存中没有单个文件的信息
+
+    async def fetch(idx, path):
+        """带超时和重试地读取一个目录，返回 (编号, 路径, 结果或None, 是否来自缓存)"""
+        cached = None
+        if index is not None:
+            cached = index.lookup(path[prefix:].lstrip("\\/"), table.mtimes[idx])
+        for attempt in range(retries + 1):
+            start = time.monotonic()
+            try:
+                if cached is not None:
+                    children = await pool.run(timeout, stat_children, path, cached[2], latency)
+                    result = (cached[0], cached[1], children, [], cached[3])
+                else:
+                    result = await pool.run(timeout, list_dir, path, latency, top_n, should_stop)
+                limiter.on_success(time.monotonic() - start)
+                return idx, path, result, cached is not None
+            except asyncio.TimeoutError:
+                limiter.on_congestion()
+            except OSError as e:
+                if not _is_transient(e):
+                    break
+                limiter.on_congestion()  # 连接重置、服务器繁忙等同样说明并发过高
+            await asyncio.sleep(min(2.0, 0.1 * 2 ** attempt))
+        return idx, path, None, False
+
+    pending = [(0, root)]
+    in_flight = set()
+
+    def finish(idx):
+        top = tops[idx]
+        if top <= 0:
+            return
+        top_pending[top] -= 1
+        if top_pending[top] == 0 and on_subtree_done is not None:
+            on_subtree_done(table.path(top), top_sizes.get(top, 0), top_files.get(top, 0))
+
+    try:
+        while pending or in_flight:
+            if should_stop is not None and should_stop():
+                stopped = True
+                break
+            while pending and len(in_flight) < limiter.allowed:
+                in_flight.add(asyncio.ensure_future(fetch(*pending.pop())))
+            done, in_flight = await asyncio.wait(in_flight, timeout=0.2,
+                                                 return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                idx, path, result, reused = task.result()
+                if result is None:
+                    table.errors += 1
+                    finish(idx)
+                    continue
+                size, count, children, files, latest = result
+                if largest is not None:
+                    largest.merge(files)
+                table.own_sizes[idx] = size
+                table.own_files[idx] = count
+                if latest > table.own_newest[idx]:
+                    table.own_newest[idx] = latest
+                table.reused += reused
+                top = tops[idx]
+                if top > 0:
+                    top_sizes[top] = top_sizes.get(top, 0) + size
+                    top_files[top] = top_files.get(top, 0) + count
+                if progress is not None:
+                    progress.add(size, count)
+                for name, mtime in children:
+                    child = table.add_dir(name, idx, mtime)
+                    child_top = child if idx == 0 else top
+                    tops.append(child_top)
+                    top_pending[child_top] = top_pending.get(child_top, 0) + 1
+                    pending.append((child, os.path.join(path, name)))
+                finish(idx)
+            if progress is not None and progress.due():
+                progress.report({table.path(top): (top_sizes.get(top, 0), top_files.get(top, 0))
+                                 for top, count in top_pending.items() if count and top > 0})
+    finally:
+        for task in in_flight:
+            task.cancel()
+        pool.shutdown()
+
+    if should_stop is not None and should_stop():
+        stopped = True  # 最后一批目录可能在列出过程中被取消
+    table.finish(stopped, save_index)
+    return table
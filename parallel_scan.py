@@ -0,0 +1,208 @@
+import concurrent.futures
+import os
+from array import array
+
+from scan_engine import CANCEL_CHECK_MASK, DirTable, TopN
+
+CHUNK_BUDGET = 20_000  # 每个任务最多处理的目录项数，超出部分拆成新任务
+
+
+# 在工作进程/线程中执行：从path开始深度优先遍历，处理的目录项超过budget后停止，
+# 尚未列出的子目录作为剩余部分返回，由调度方拆成新任务交给空闲的工作者。
+# 返回值全部是bytes/str，跨进程传输时不需要序列化大量Python对象：
+# (自身大小, 文件数, 修改时间, 局部父目录编号, 以\0分隔的目录名, 是否已列出, 无法读取的目录数,
+#  最大的top_n个文件, 直接包含的文件中最新的修改时间)
+# should_stop 只在线程池中传入（进程之间无法共享），取消时提前返回，结果会被丢弃
+def scan_chunk(path, budget, top_n=0, should_stop=None):
+    names = []
+    paths = [path]
+    parents = array("q", [-1])
+    sizes = array("q", [0])
+    files = array("q", [0])
+    mtimes = array("q", [0])
+    newest = array("q", [0])
+    visited = bytearray(1)
+    errors = 0
+    seen = 0
+    largest = TopN(top_n) if top_n else None
+
+    stack = [0]
+    while stack and seen < budget:
+        idx = stack.pop()
+        visited[idx] = 1
+        size = 0
+        count = 0
+        latest = 0
+        try:
+            with os.scandir(paths[idx]) as entries:
+                for entry in entries:
+                    seen += 1
+                    if should_stop is not None and not seen & CANCEL_CHECK_MASK and should_stop():
+                        stack.clear()
+                        break
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            mtimes.append(entry.stat(follow_symlinks=False).st_mtime_ns)
+                            names.append(entry.name)
+                            paths.append(entry.path)
+                            parents.append(idx)
+                            sizes.append(0)
+                            files.append(0)
+                            newest.append(0)
+                            visited.append(0)
+                            stack.append(len(paths) - 1)
+                        elif entry.is_file(follow_symlinks=False):
+                            st = entry.stat(follow_symlinks=False)
+                            file_size = st.st_size
+                            size += file_size
+                            count += 1
+                            if st.st_mtime_ns > latest:
+                                latest = st.st_mtime_ns
+                            if largest is not None:
+                                largest.push(file_size, entry.path)
+                    except OSError:
+                        continue
+        except OSError:
+            errors += 1
+        sizes[idx] = size
+        files[idx] = count
+        newest[idx] = latest
+
+    return (sizes.tobytes(), files.tobytes(), mtimes.tobytes(), parents.tobytes(),
+            "\0".join(names), bytes(visited), errors, largest.heap if largest is not None else [],
+            newest.tobytes())
+
+
+class ChunkMerger:
+    """把 scan_chunk 的结果合并到目录表，并按顶层子文件夹累计已完成的大小和尚未完成的任务数
+
+    scan_tree_parallel 和多根目录扫描（multi_scan）共用。派发任务时调用 started，
+    任务合并完成、剩余部分也已派发之后调用 finished。
+    """
+
+    __slots__ = ("table", "progress", "tops", "top_sizes", "top_files", "top_pending")
+
+    def __init__(self, table, progress=None):
+        self.table = table
+        self.progress = progress
+        self.tops = array("q", [-1])  # 每个目录所属的顶层子文件夹编号
+        self.top_sizes = {}
+        self.top_files = {}
+        self.top_pending = {}  # 顶层子文件夹 -> 尚未完成的任务数
+
+    def started(self, g):
+        top = self.tops[g]
+        self.top_pending[top] = self.top_pending.get(top, 0) + 1
+
+    def finished(self, g):
+        """从目录g开始的任务已结束；它所属的顶层子文件夹全部完成时返回 (路径, 大小, 文件数)，否则返回None"""
+        top = self.tops[g]
+        self.top_pending[top] -= 1
+        if self.top_pending[top] == 0 and top > 0:
+            return self.table.path(top), self.top_sizes.get(top, 0), self.top_files.get(top, 0)
+        return None
+
+    def partials(self):
+        """仍在扫描中的顶层子文件夹 {路径: (已统计大小, 已统计文件数)}"""
+        return {self.table.path(top): (self.top_sizes.get(top, 0), self.top_files.get(top, 0))
+                for top, count in self.top_pending.items() if count and top > 0}
+
+    def merge(self, base, base_path, chunk):
+        """把一个任务的结果合并到目录表，返回需要继续扫描的 (全局编号, 路径)"""
+        sizes, files, mtimes, parents, names, visited, errors, largest, newest = chunk
+        table = self.table
+        tops = self.tops
+        if table.largest_files is not None:
+            table.largest_files.merge(largest)
+        sizes = array("q", sizes)
+        files = array("q", files)
+        mtimes = array("q", mtimes)
+        newest = array("q", newest)
+        parents = array("q", parents)
+        names = names.split("\0") if names else []
+        table.errors += errors
+
+        local = [base]
+        local_paths = [base_path]
+        leftover = []
+        for j in range(1, len(parents)):
+            parent = local[parents[j]]
+            g = table.add_dir(names[j - 1], parent, mtimes[j])
+            local.append(g)
+            local_paths.append(os.path.join(local_paths[parents[j]], names[j - 1]))
+            tops.append(g if parent == 0 else tops[parent])
+            if not visited[j]:
+                leftover.append((g, local_paths[j]))
+        for j, g in enumerate(local):
+            if visited[j]:
+                table.own_sizes[g] = sizes[j]
+                table.own_files[g] = files[j]
+                if newest[j] > table.own_newest[g]:
+                    table.own_newest[g] = newest[j]
+                top = tops[g]
+                if top > 0:
+                    self.top_sizes[top] = self.top_sizes.get(top, 0) + sizes[j]
+                    self.top_files[top] = self.top_files.get(top, 0) + files[j]
+                if self.progress is not None:
+                    self.progress.add(sizes[j], files[j])
+        return leftover
+
+
+# 并行扫描，结果与 scan_tree 相同。按子目录把整棵树拆成任务，大的子树在处理过程中
+# 不断拆出新任务，一个巨大的子文件夹不会让其他工作者空闲。
+# backend 为 "thread" 或 "process"；Python层面的元数据汇总受GIL限制时使用进程池。
+# 传入SizeIndex时只在完整扫描后写回索引，并行模式不读取缓存。
+# progress 为 ScanProgress 时，在调度循环中按时间间隔汇报各顶层子文件夹的部分大小。
+def scan_tree_parallel(root, backend="process", workers=None, on_subtree_done=None,
+                       should_stop=None, index=None, budget=CHUNK_BUDGET, top_n=0, progress=None):
+    workers = workers or os.cpu_count() or 2
+    table = DirTable(root)
+    table.largest_files = TopN(top_n) if top_n else None
+    try:
+        table.mtimes[0] = os.stat(root).st_mtime_ns
+    except OSError:
+        index = None
+    merger = ChunkMerger(table, progress)
+    stopped = False
+
+    # 根目录在调度方直接列出，每个顶层子文件夹成为第一批任务
+    tasks = merger.merge(0, root, scan_chunk(root, 1, top_n))
+
+    pool_class = (concurrent.futures.ProcessPoolExecutor if backend == "process"
+                  else concurrent.futures.ThreadPoolExecutor)
+    # 线程池中的任务在遍历过程中检查取消标志；进程池的任务最多处理budget项后自然结束
+    chunk_stop = should_stop if backend != "process" else None
+    with pool_class(max_workers=workers) as executor:
+        running = {}
+
+        def submit(g, path):
+            merger.started(g)
+            running[executor.submit(scan_chunk, path, budget, top_n, chunk_stop)] = (g, path)
+
+        for g, path in tasks:
+            submit(g, path)
+
+        while running:
+            done, _ = concurrent.futures.wait(running, timeout=0.2,
+                                              return_when=concurrent.futures.FIRST_COMPLETED)
+            if should_stop is not None and should_stop():
+                stopped = True
+                executor.shutdown(wait=False, cancel_futures=True)
+                break
+            for future in done:
+                g, path = running.pop(future)
+                try:
+                    leftover = merger.merge(g, path, future.result())
+                except Exception:
+                    table.errors += 1
+                    leftover = []
+                for child, path in leftover:
+                    submit(child, path)
+                subtree = merger.finished(g)
+                if subtree is not None and on_subtree_done is not None:
+                    on_subtree_done(*subtree)
+            if progress is not None and progress.due():
+                progress.report(merger.partials())
+
+    table.finish(stopped, index)
+    return table
@@ -0,0 +1,252 @@
+import os
+import re
+from array import array
+from itertools import compress
+
+from scan_engine import human_readable_size
+
+PENDING = -1  # 大小尚未扫描完成
+
+SORT_KEYS = ("size", "name", "files", "mtime")
+
+
+class ResultModel:
+    """列式存储的扫描结果，每列一个数组，选择状态也保存在模型中
+
+    路径拆成父目录编号和名称两列，同一目录下的行共用一个父目录字符串；
+    大小只在行可见时才格式化。行号是扫描时的原始顺序，显示顺序由 order 决定：
+    按排序键预先计算好的升序排列（缓存到数据变化为止），再经过名称过滤。
+    同时扫描多个根目录时，每行还记录所属根目录的编号，各根目录的行一起排序、过滤和选择。
+    """
+
+    __slots__ = ("roots", "root_ids", "dirs", "dir_ids", "names", "sizes", "files", "mtimes", "newest", "freeable", "selected", "status",
+                 "partial", "order", "sort_key", "sort_reverse", "_filter", "_perms", "_folded",
+                 "_dir_index", "_rows")
+
+    def __init__(self):
+        self.sort_key = "size"
+        self.sort_reverse = False
+        self._filter = None
+        self.reset([])
+
+    def __len__(self):
+        return len(self.names)
+
+    def reset(self, paths, mtimes=None, root=""):
+        self.roots = []  # 根目录编号 -> 根目录路径
+        self.root_ids = array("I")
+        self.dirs = []  # 父目录编号 -> 父目录路径
+        self._dir_index = {}
+        self.dir_ids = array("I")
+        self.names = []
+        self.sizes = array("q")
+        self.files = array("q")
+        self.mtimes = array("d")
+        self.newest = array("d")  # 整棵子树中最新的修改时间（秒），0表示未知
+        self.freeable = array("q")  # 考虑硬链接后删除能释放的空间，只在硬链接统计模式下有值
+        self.selected = bytearray()  # 每行一个字节的选择标志，批量操作一次生成整列
+        self.status = {}  # 行号 -> 特殊状态文字，如"已取消"
+        self.partial = set()  # 仍在扫描中、大小为部分统计结果的行
+        self._perms = {}  # 排序键 -> 升序排列的行号
+        self._folded = None
+        self._rows = None
+        self.extend(paths, mtimes, root)
+
+    def extend(self, paths, mtimes=None, root=""):
+        """在末尾加入属于root的若干行，返回第一行的行号；已有的行号不变"""
+        first = len(self.names)
+        split = os.path.split
+        for path in paths:
+            parent, name = split(path)
+            dir_id = self._dir_index.get(parent)
+            if dir_id is None:
+                dir_id = self._dir_index[parent] = len(self.dirs)
+                self.dirs.append(parent)
+            self.dir_ids.append(dir_id)
+            self.names.append(name)
+        count = len(self.names) - first
+        if count and root not in self.roots:
+            self.roots.append(root)
+        root_id = self.roots.index(root) if count else 0
+        self.root_ids.extend(array("I", [root_id]) * count)
+        self.sizes.extend(array("q", [PENDING]) * count)
+        self.files.extend(array("q", [PENDING]) * count)
+        self.mtimes.extend(array("d", mtimes) if mtimes is not None else array("d", [0.0]) * count)
+        self.newest.extend(array("d", [0.0]) * count)
+        self.freeable.extend(array("q", [PENDING]) * count)
+        self.selected.extend(bytearray(count))
+        self._perms = {}
+        self._folded = None
+        self._rows = None
+        self._rebuild_order()
+        return first
+
+    def root_of(self, row):
+        return self.roots[self.root_ids[row]]
+
+    def path(self, row):
+        return os.path.join(self.dirs[self.dir_ids[row]], self.names[row])
+
+    def find(self, path):
+        """由完整路径找到行号，不存在时返回-1"""
+        parent, name = os.path.split(path)
+        dir_id = self._dir_index.get(parent)
+        if dir_id is None:
+            return -1
+        if self._rows is None:
+            # 同一目录下名称唯一，按 (父目录编号, 名称) 建立索引，不需要拼出完整路径
+            self._rows = {(self.dir_ids[row], name): row for row, name in enumerate(self.names)}
+        return self._rows.get((dir_id, name), -1)
+
+    def set_size(self, row, size_bytes, file_count=PENDING):
+        self.sizes[row] = size_bytes
+        self.files[row] = file_count
+        self.freeable[row] = PENDING  # 大小变化后原来的可释放空间不再准确
+        self.status.pop(row, None)
+        self.partial.discard(row)
+        self._perms.pop("size", None)
+        self._perms.pop("files", None)
+
+    def set_partial(self, row, size_bytes, file_count):
+        """扫描过程中不断增长的部分大小"""
+        self.set_size(row, size_bytes, file_count)
+        self.partial.add(row)
+
+    def set_status(self, row, text):
+        # 大小保持为 PENDING：已取消或无法计算的行不是真正的0字节，不能被按大小选中
+        self.sizes[row] = PENDING
+        self.status[row] = text
+        self.partial.discard(row)
+        self._perms.pop("size", None)
+
+    def name(self, row):
+        """显示用的名称，有多个根目录时附上所属根目录的名称"""
+        if len(self.roots) > 1:
+            root = self.roots[self.root_ids[row]]
+            return f"{self.names[row]}  [{os.path.basename(root.rstrip(os.sep)) or root}]"
+        return self.names[row]
+
+    def size_text(self, row):
+        """只在行可见时才格式化大小"""
+        text = self.status.get(row)
+        if text is not None:
+            return text
+        size = self.sizes[row]
+        if size == PENDING:
+            return "扫描中..."
+        if row in self.partial:
+            return human_readable_size(size) + "..."
+        freeable = self.freeable[row]
+        if freeable >= 0 and freeable != size:
+            return f"{human_readable_size(size)}（可释放 {human_readable_size(freeable)}）"
+        return human_readable_size(size)
+
+    def _permutation(self, key):
+        perm = self._perms.get(key)
+        if perm is None:
+            if key == "name":
+                if self._folded is None:
+                    self._folded = [name.casefold() for name in self.names]
+                column = self._folded
+            else:
+                column = {"size": self.sizes, "files": self.files, "mtime": self.mtimes}[key]
+            # 排列保存为整数数组，每行8字节，而不是每行一个int对象
+            perm = array("q", sorted(range(len(self.names)), key=column.__getitem__))
+            self._perms[key] = perm
+        return perm
+
+    def _rebuild_order(self):
+        perm = self._permutation(self.sort_key)
+        if self.sort_reverse:
+            perm = perm[::-1]
+        if self._filter is not None:
+            match = self._filter
+            names = self.names
+            perm = array("q", [row for row in perm if match(names[row])])
+        self.order = perm
+
+    def set_sort(self, key, reverse=False):
+        if key not in SORT_KEYS:
+            raise ValueError(f"不支持的排序字段: {key}")
+        self.sort_key = key
+        self.sort_reverse = reverse
+        self._rebuild_order()
+
+    def set_filter(self, text, regex=False):
+        """按文件夹名过滤，普通模式为不区分大小写的子串匹配；正则无效时抛出re.error"""
+        if not text:
+            self._filter = None
+        elif regex:
+            self._filter = re.compile(text, re.IGNORECASE).search
+        else:
+            needle = text.casefold()
+            self._filter = lambda name: needle in name.casefold()
+        self._rebuild_order()
+
+    def remove_rows(self, rows):
+        """删除若干行，其余各列保持原有顺序，行号随之重新编号"""
+        keep_mask = bytearray([1]) * len(self.names)
+        for row in rows:
+            keep_mask[row] = 0
+        keep = list(compress(range(len(self.names)), keep_mask))
+        renumber = {old: new for new, old in enumerate(keep)}
+        self.root_ids = array("I", compress(self.root_ids, keep_mask))
+        self.dir_ids = array("I", compress(self.dir_ids, keep_mask))
+        self.names = list(compress(self.names, keep_mask))
+        self.sizes = array("q", compress(self.sizes, keep_mask))
+        self.files = array("q", compress(self.files, keep_mask))
+        self.mtimes = array("d", compress(self.mtimes, keep_mask))
+        self.newest = array("d", compress(self.newest, keep_mask))
+        self.freeable = array("q", compress(self.freeable, keep_mask))
+        self.selected = bytearray(compress(self.selected, keep_mask))
+        self.status = {renumber[row]: text for row, text in self.status.items() if row in renumber}
+        self.partial = {renumber[row] for row in self.partial if row in renumber}
+        self._perms = {}
+        self._folded = None
+        self._rows = None
+        self._rebuild_order()
+
+    def toggle(self, row):
+        self.selected[row] ^= 1
+
+    def select_where(self, predicate):
+        """对当前显示的行按条件设置选择状态"""
+        for row in self.order:
+            self.selected[row] = 1 if predicate(row) else 0
+
+    def select_smaller_than(self, limit):
+        """选中当前显示的、大小小于limit的行，其余显示的行取消选择；尚未扫描完成的行不选中"""
+        if len(self.order) == len(self.names):
+            # 对整列一次性比较，不逐行调用Python函数；按无符号数比较，PENDING 成为最大值
+            self.selected = bytearray(map(limit.__gt__, array("Q", self.sizes.tobytes())))
+        else:
+            sizes = self.sizes
+            for row in self.order:
+                self.selected[row] = 0 <= sizes[row] < limit
+
+    def select_mask(self, mask):
+        """按每行一个0/1字节的掩码设置当前显示的行的选择状态"""
+        if len(self.order) == len(self.names):
+            self.selected = bytearray(mask)
+        else:
+            for row in self.order:
+                self.selected[row] = mask[row]
+
+    def select_rule(self, rule, now=None):
+        """用 SelectionRule 对所有行一次求值，再应用到当前显示的行"""
+        self.select_mask(rule.mask(self.names, self.sizes, self.files, self.newest, now))
+
+    def set_all(self, value):
+        """选择或取消当前显示的所有行"""
+        flag = 1 if value else 0
+        if len(self.order) == len(self.names):
+            self.selected = bytearray([flag]) * len(self.names)
+        else:
+            for row in self.order:
+                self.selected[row] = flag
+
+    def selected_rows(self):
+        return list(compress(range(len(self.selected)), self.selected))
+
+    def selected_count(self):
+        return len(self.selected) - self.selected.count(0)
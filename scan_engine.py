@@ -0,0 +1,631 @@
+import heapq
+import os
+import sys
+import time
+from array import array
+
+
+# 获取网络路径的函数
+def is_network_path(path):
+    if path.startswith('\\\\'):
+        return True
+    if path.startswith('//'):
+        return True
+    if os.name == 'nt' and ':' in path and len(path) >= 2:
+        import ctypes  # 只在Windows下需要，不在启动时导入
+        drive = path[0].upper()
+        drive_type = ctypes.windll.kernel32.GetDriveTypeW(drive + ":\\")
+        return drive_type == 4  # DRIVE_REMOTE
+    if os.name == 'posix':
+        return _mount_fstype(path) in NETWORK_FSTYPES
+    return False
+
+NETWORK_FSTYPES = {"nfs", "nfs4", "cifs", "smb3", "smbfs", "fuse.sshfs", "9p", "afs", "ceph", "glusterfs"}
+
+# Linux下根据/proc/self/mounts找到路径所在挂载点的文件系统类型
+def _mount_fstype(path):
+    try:
+        with open("/proc/self/mounts", encoding="utf-8") as f:
+            mounts = [line.split()[1:3] for line in f]
+    except OSError:
+        return None
+    path = os.path.realpath(path)
+    best, fstype = "", None
+    for mount_point, mount_type in mounts:
+        mount_point = mount_point.replace("\\040", " ")
+        if (path == mount_point or path.startswith(mount_point.rstrip("/") + "/")) and len(mount_point) > len(best):
+            best, fstype = mount_point, mount_type
+    return fstype
+
+# 使用Windows命令获取文件夹大小
+def get_folder_size(folder_path):
+    import re
+    import subprocess
+    try:
+        # 使用Windows dir命令获取文件夹大小
+        # 使用/a参数显示所有文件（包括隐藏文件）
+        # 使用/s参数包含所有子目录
+        command = f'dir /a /s "{folder_path}" | findstr "个文件"'
+        result = subprocess.run(command, capture_output=True, text=True, encoding='gbk', shell=True, timeout=10)
+        
+        if result.returncode == 0:
+            # 解析输出找到文件大小总和
+            output = result.stdout.strip()
+            # 匹配类似 "2 个文件 3,456,789 字节" 的行
+            matches = re.findall(r'(\d+)\s+个文件\s+([\d,]+)\s+字节', output)
+            if matches:
+                # 取最后一个匹配（总计行）
+                total_size = int(matches[-1][1].replace(',', ''))
+                return total_size
+    except Exception:
+        pass
+    
+    # 如果命令行方法失败，使用快速扫描方法
+    try:
+        total_size = 0
+        with os.scandir(folder_path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file(follow_symlinks=False):
+                        total_size += entry.stat().st_size
+                    elif entry.is_dir(follow_symlinks=False):
+                        total_size += get_folder_size(entry.path)
+                except (PermissionError, OSError):
+                    continue
+        return total_size
+    except Exception:
+        return 0
+
+# 转换文件大小为人类可读格式
+def human_readable_size(size_bytes):
+    if size_bytes == 0:
+        return "0 B"
+    size_name = ("B", "KB", "MB", "GB", "TB")
+    i = 0
+    while size_bytes >= 1024 and i < len(size_name) - 1:
+        size_bytes /= 1024
+        i += 1
+    return f"{size_bytes:.2f} {size_name[i]}"
+
+# 将人类可读格式转回字节大小，用于排序
+def size_to_bytes(size_str):
+    if not size_str or size_str == "扫描中...":
+        return 0
+    parts = size_str.split()
+    if len(parts) != 2:
+        return 0
+    try:
+        size_val = float(parts[0])
+        unit = parts[1]
+        units = {"B": 1, "KB": 1024, "MB": 1024**2, "GB": 1024**3, "TB": 1024**4}
+        return size_val * units.get(unit, 0)
+    except ValueError:
+        return 0
+
+# 解析命令行中的大小参数，如 "20MB"、"1.5G"、"4096"
+def parse_size(text):
+    import re
+    match = re.fullmatch(r'\s*([\d.]+)\s*([KMGT]?)I?B?\s*', text.upper())
+    if not match:
+        raise ValueError(f"无效的大小: {text}")
+    units = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+    return int(float(match.group(1)) * units[match.group(2)])
+
+
+class TopN:
+    """容量固定的最小堆，遍历过程中只保留最大的n项，内存占用与树的大小无关"""
+
+    __slots__ = ("n", "heap")
+
+    def __init__(self, n):
+        self.n = n
+        self.heap = []  # [(大小, 路径)]，堆顶是当前保留的最小项
+
+    def push(self, size, path):
+        if len(self.heap) < self.n:
+            heapq.heappush(self.heap, (size, path))
+        elif size > self.heap[0][0]:
+            heapq.heapreplace(self.heap, (size, path))
+
+    def merge(self, items):
+        for size, path in items:
+            self.push(size, path)
+
+    def items(self):
+        """按大小降序返回 [(路径, 大小)]"""
+        return [(path, size) for size, path in sorted(self.heap, reverse=True)]
+
+
+PROGRESS_INTERVAL = 0.5  # 扫描进度的汇报间隔（秒）
+CANCEL_CHECK_MASK = 1023  # 遍历目录内容时每1024项检查一次是否取消
+
+
+class CancelToken:
+    """取消标志，可以直接作为 should_stop 传入；扫描在单个目录的内容循环中也会检查它"""
+
+    __slots__ = ("cancelled",)
+
+    def __init__(self):
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def __call__(self):
+        return self.cancelled
+
+
+def _never():
+    return False
+
+
+class ScanProgress:
+    """按固定时间间隔汇报扫描进度，回调次数只取决于扫描时长，与目录数量无关
+
+    回调参数为 (进行中的顶层子文件夹 {路径: (已统计大小, 已统计文件数)},
+    累计文件数, 累计字节数, 已用时间)
+    """
+
+    __slots__ = ("callback", "interval", "files", "bytes", "start", "_next")
+
+    def __init__(self, callback, interval=PROGRESS_INTERVAL):
+        self.callback = callback
+        self.interval = interval
+        self.files = 0
+        self.bytes = 0
+        self.start = time.monotonic()
+        self._next = self.start + interval
+
+    def add(self, size, count):
+        self.bytes += size
+        self.files += count
+
+    def due(self):
+        return time.monotonic() >= self._next
+
+    def report(self, partials):
+        now = time.monotonic()
+        self._next = now + self.interval
+        self.callback(partials, self.files, self.bytes, now - self.start)
+
+
+class LinkTracker:
+    """硬链接和稀疏文件统计，用于 scan_tree(links=True)
+
+    只有链接数大于1的文件才需要记录，(st_dev, st_ino) 合成一个整数作为键，
+    其余信息保存在整数数组中，不为每个inode创建元组或对象。同一个inode只在第一次遇到时
+    计入大小；占用空间按 st_blocks 计算，稀疏文件只计实际分配的部分。
+    一个inode的所有链接都在扫描范围内找到后，它的占用空间计入这些链接所在目录的最近公共祖先：
+    删除该目录（或更上层的目录）才会真正释放这部分空间。每个链接所在的目录也记录下来
+    （每个链接16字节），用于计算同时删除多个文件夹时能释放的空间。
+    """
+
+    __slots__ = ("table", "slots", "disk", "remaining", "lca", "extra_links", "link_slots", "link_dirs")
+
+    def __init__(self, table):
+        self.table = table
+        self.slots = {}  # (设备号 << 64) | inode号 -> 下面各数组中的位置
+        self.disk = array("q")  # 占用空间
+        self.remaining = array("q")  # 尚未遇到的链接数
+        self.lca = array("q")  # 已遇到的所有链接所在目录的最近公共祖先
+        self.extra_links = 0  # 没有重复计入大小的额外链接数
+        self.link_slots = array("q")  # 每个链接一项：所属inode的位置和所在目录
+        self.link_dirs = array("q")
+
+    def add(self, idx, st):
+        """记录目录idx中的一个文件，返回 (计入的大小, 占用空间, 删除idx即可释放的空间)"""
+        blocks = getattr(st, "st_blocks", None)
+        # Windows没有st_blocks，只能使用表观大小
+        disk = blocks * 512 if blocks is not None else st.st_size
+        if st.st_nlink <= 1:
+            return st.st_size, disk, disk
+        key = (st.st_dev << 64) | st.st_ino
+        slot = self.slots.get(key)
+        if slot is None:
+            slot = self.slots[key] = len(self.disk)
+            self.disk.append(disk)
+            self.remaining.append(st.st_nlink - 1)
+            self.lca.append(idx)
+            self.link_slots.append(slot)
+            self.link_dirs.append(idx)
+            return st.st_size, disk, 0
+        self.extra_links += 1
+        self.link_slots.append(slot)
+        self.link_dirs.append(idx)
+        lca = self.lca[slot] = self._common_ancestor(self.lca[slot], idx)
+        self.remaining[slot] -= 1
+        if self.remaining[slot] == 0:
+            # 所有链接都在扫描范围内，删除它们的公共祖先即可释放
+            self.table.own_freeable[lca] += self.disk[slot]
+        return 0, 0, 0
+
+    def freeable_across(self, indices):
+        """同时删除几个互不包含的目录时，除各自的 freeable 之外还能释放的空间：
+        所有链接都在这些目录中、但分散在不止一个目录里的文件"""
+        parents = self.table.parents
+        selected = set(indices)
+        inside = bytearray(len(parents))  # 目录是否在某个选中目录的子树中
+        for i in range(1, len(parents)):
+            inside[i] = 1 if i in selected else inside[parents[i]]
+        leaked = bytearray(len(self.disk))  # 有链接在选中范围之外的inode
+        for slot, idx in zip(self.link_slots, self.link_dirs):
+            if not inside[idx]:
+                leaked[slot] = 1
+        total = 0
+        for slot in range(len(self.disk)):
+            # 公共祖先在某个选中目录中的，已经计入该目录的 freeable
+            if not self.remaining[slot] and not leaked[slot] and not inside[self.lca[slot]]:
+                total += self.disk[slot]
+        return total
+
+    def _common_ancestor(self, a, b):
+        parents = self.table.parents
+        ancestors = set()
+        while a >= 0:
+            ancestors.add(a)
+            a = parents[a]
+        while b not in ancestors:
+            b = parents[b]
+        return b
+
+
+class DirTable:
+    """一次遍历得到的目录表，下标即目录编号，父目录编号总是小于子目录编号
+
+    每个目录只保存驻留（intern）过的名称和父目录编号，完整路径按需拼出；
+    node_modules、__pycache__ 这类重复的名称在内存中只有一份。
+    """
+
+    __slots__ = ("root", "names", "parents", "own_sizes", "own_files", "mtimes", "own_newest",
+                 "sizes", "files", "newest", "complete", "reused", "errors", "largest_files",
+                 "own_disk", "own_freeable", "disk_sizes", "freeable", "extra_links", "links",
+                 "timings", "_started", "_child_start", "_child_list")
+
+    def __init__(self, root):
+        self.root = root
+        self.names = [""]
+        self.parents = array("q", [-1])
+        self.own_sizes = array("q", [0])  # 目录自身直接包含的文件大小
+        self.own_files = array("q", [0])
+        self.mtimes = array("q", [0])  # 目录自身的修改时间(纳秒)
+        self.own_newest = array("q", [0])  # 目录自身及其直接包含的文件中最新的修改时间(纳秒)
+        self.sizes = None  # 汇总到每个目录的子树总大小
+        self.files = None
+        self.newest = None  # 整棵子树中最新的修改时间，用于按"多久没有变化"选择
+        self.complete = False
+        self.reused = 0  # 直接使用索引缓存、没有重新列出内容的目录数
+        self.errors = 0  # 无法读取的目录数
+        self.largest_files = None  # 请求了top_n时为TopN，保存最大的文件
+        # 以下只在硬链接统计模式（links=True）下存在，否则为None
+        self.own_disk = None  # 目录自身直接包含的文件实际占用的磁盘空间(st_blocks)
+        self.own_freeable = None  # 删除该目录时才能释放、且不属于任何子目录的空间
+        self.disk_sizes = None  # 汇总后的占用空间
+        self.freeable = None  # 汇总后删除该目录实际能释放的空间，其他位置仍有链接的文件不计入
+        self.extra_links = 0  # 指向已计入的inode的额外硬链接数
+        self.links = None  # LinkTracker
+        self.timings = {}  # 各阶段耗时（秒）：index_load、walk、rollup、index_save，用于性能剖析
+        self._started = time.perf_counter()
+        self._child_start = None  # 子目录索引：编号i的子目录是 _child_list[start[i]:start[i+1]]
+        self._child_list = None
+
+    def __len__(self):
+        return len(self.names)
+
+    def add_dir(self, name, parent, mtime=0):
+        self.names.append(sys.intern(name))
+        self.parents.append(parent)
+        self.own_sizes.append(0)
+        self.own_files.append(0)
+        self.mtimes.append(mtime)
+        self.own_newest.append(mtime)
+        if self.own_disk is not None:
+            self.own_disk.append(0)
+            self.own_freeable.append(0)
+        self._child_start = None
+        return len(self.names) - 1
+
+    def path(self, idx):
+        parts = []
+        parents = self.parents
+        while idx > 0:
+            parts.append(self.names[idx])
+            idx = parents[idx]
+        return os.path.join(self.root, *reversed(parts))
+
+    def all_paths(self):
+        """按编号顺序返回所有目录的完整路径，用于需要遍历整张表的场合"""
+        paths = [self.root]
+        names = self.names
+        parents = self.parents
+        for i in range(1, len(names)):
+            paths.append(os.path.join(paths[parents[i]], names[i]))
+        return paths
+
+    def rollup(self):
+        """把每个目录的大小和文件数自底向上累加到所有祖先，最新修改时间取最大值"""
+        sizes = array("q", self.own_sizes)
+        files = array("q", self.own_files)
+        newest = array("q", self.own_newest)
+        parents = self.parents
+        for i in range(len(parents) - 1, 0, -1):
+            parent = parents[i]
+            sizes[parent] += sizes[i]
+            files[parent] += files[i]
+            if newest[i] > newest[parent]:
+                newest[parent] = newest[i]
+        self.sizes = sizes
+        self.files = files
+        self.newest = newest
+        if self.own_disk is not None:
+            disk = array("q", self.own_disk)
+            freeable = array("q", self.own_freeable)
+            for i in range(len(parents) - 1, 0, -1):
+                disk[parents[i]] += disk[i]
+                freeable[parents[i]] += freeable[i]
+            self.disk_sizes = disk
+            self.freeable = freeable
+
+    def finish(self, stopped, index=None):
+        """遍历结束：汇总各目录的大小，扫描完整时写回索引，并记录各阶段耗时"""
+        timings = self.timings
+        now = time.perf_counter()
+        timings["walk"] = now - self._started - timings.get("index_load", 0.0)
+        self.rollup()
+        timings["rollup"] = time.perf_counter() - now
+        self.complete = not stopped
+        if index is not None and self.complete:
+            now = time.perf_counter()
+            index.save(self)
+            timings["index_save"] = time.perf_counter() - now
+
+    def _build_children(self):
+        # 按父目录计数排序，两个数组即可表示所有目录的子目录列表
+        parents = self.parents
+        count = len(parents)
+        start = array("q", [0]) * (count + 1)
+        for i in range(1, count):
+            start[parents[i] + 1] += 1
+        for i in range(count):
+            start[i + 1] += start[i]
+        fill = array("q", start)
+        child_list = array("q", [0]) * max(0, count - 1)
+        for i in range(1, count):
+            parent = parents[i]
+            child_list[fill[parent]] = i
+            fill[parent] += 1
+        self._child_start = start
+        self._child_list = child_list
+
+    def children(self, idx):
+        if self._child_start is None:
+            self._build_children()
+        return self._child_list[self._child_start[idx]:self._child_start[idx + 1]].tolist()
+
+    def index_of(self, path):
+        """由完整路径找到目录编号，沿子目录逐级查找名称，找不到时返回-1"""
+        rel = os.path.relpath(path, self.root)
+        if rel == os.curdir:
+            return 0
+        idx = 0
+        for name in rel.split(os.sep):
+            idx = next((child for child in self.children(idx) if self.names[child] == name), -1)
+            if idx < 0:
+                break
+        return idx
+
+    def discount(self, idx, size, files):
+        """从一个目录及其所有祖先的汇总中减去已删除的部分"""
+        while idx >= 0:
+            self.sizes[idx] = max(0, self.sizes[idx] - size)
+            self.files[idx] = max(0, self.files[idx] - files)
+            idx = self.parents[idx]
+
+    def apply_deltas(self, deltas, skip=()):
+        """把 {路径: (大小差值, 文件数差值)} 累加到该目录（不在表中时为表中最近的上级）及其所有祖先，
+        返回改变了的目录编号；位于 skip 中目录之下的变化被忽略（如已经从汇总中减去的已删除目录）"""
+        touched = set()
+        for path, (size_delta, files_delta) in deltas.items():
+            idx = self.index_of(path)
+            while idx < 0 and path != self.root:
+                path = os.path.dirname(path)
+                idx = self.index_of(path)
+            chain = []
+            while idx >= 0:
+                if idx in skip:
+                    break
+                chain.append(idx)
+                idx = self.parents[idx]
+            else:
+                for idx in chain:
+                    self.sizes[idx] = max(0, self.sizes[idx] + size_delta)
+                    self.files[idx] = max(0, self.files[idx] + files_delta)
+                touched.update(chain)
+        return touched
+
+    def largest_dirs(self, n):
+        """任意层级中最大的n个目录 [(路径, 大小)]，不包括根目录本身"""
+        sizes = self.sizes
+        rows = heapq.nlargest(n, range(1, len(sizes)), key=sizes.__getitem__)
+        return [(self.path(i), sizes[i]) for i in rows]
+
+    def top_level(self):
+        """返回根目录直接子文件夹的 (路径, 大小, 文件数) 列表"""
+        return [(self.path(i), self.sizes[i], self.files[i]) for i in self.children(0)]
+
+
+# 用显式栈迭代遍历整棵目录树，只遍历一次就能得到每一级文件夹的大小
+# on_subtree_done(路径, 大小, 文件数) 在每个顶层子文件夹扫描完毕时回调
+# should_stop() 返回True时中止遍历，此时结果的complete为False；包含大量文件的目录
+# 在列出内容的过程中也会定期检查，取消不必等到当前目录处理完
+# 传入SizeIndex时，修改时间没有变化的目录直接使用缓存，不再列出其中的文件，
+# 只对子文件夹做一次stat检查它们是否变化；完整扫描结束后结果写回索引
+# top_n 大于0时在同一次遍历中记录最大的top_n个文件（table.largest_files），
+# 这需要列出每个文件，因此不会复用索引缓存，但扫描结果仍会写回索引
+# on_file(路径, stat结果) 对每个普通文件调用，同样不复用缓存，只支持单线程扫描
+# links 为True时按 (st_dev, st_ino) 去重硬链接，并统计实际占用空间和删除后真正能释放的空间
+# （见 LinkTracker）；同样只支持单线程扫描，不复用索引缓存，去重后的大小也不写回索引
+# on_progress 每隔 progress_interval 秒以 ScanProgress 的参数回调一次，
+# 用于在大文件夹扫描完成之前显示不断增长的部分大小和扫描速度
+# backend 为 "thread" 或 "process" 时使用 parallel_scan 中的并行扫描，
+# "network" 使用 network_scan 中的异步扫描，"auto" 在网络路径上自动选择 "network"
+BACKENDS = ("auto", "serial", "thread", "process", "network")
+
+def scan_tree(root, on_subtree_done=None, should_stop=None, index=None, backend="serial", workers=None,
+              top_n=0, on_file=None, on_progress=None, progress_interval=PROGRESS_INTERVAL, links=False):
+    progress = ScanProgress(on_progress, progress_interval) if on_progress is not None else None
+    if on_file is not None or links:
+        backend = "serial"
+    if backend == "auto":
+        backend = "network" if is_network_path(root) else "serial"
+    if backend == "network":
+        from network_scan import scan_tree_network
+        return scan_tree_network(root, on_subtree_done=on_subtree_done, should_stop=should_stop,
+                                 index=index, max_concurrency=workers or 64, top_n=top_n,
+                                 progress=progress)
+    if backend != "serial":
+        from parallel_scan import scan_tree_parallel
+        return scan_tree_parallel(root, backend=backend, workers=workers,
+                                  on_subtree_done=on_subtree_done, should_stop=should_stop,
+                                  index=index, top_n=top_n, progress=progress)
+    if should_stop is None:
+        should_stop = _never
+    table = DirTable(root)
+    largest = table.largest_files = TopN(top_n) if top_n else None
+    own_sizes = table.own_sizes
+    own_files = table.own_files
+    own_newest = table.own_newest
+    mtimes = table.mtimes
+    prefix = len(root)
+    try:
+        mtimes[0] = os.stat(root).st_mtime_ns
+    except OSError:
+        index = None
+    if index is not None:
+        start = time.perf_counter()
+        index.load(root)
+        table.timings["index_load"] = time.perf_counter() - start
+    save_index = index
+    if largest is not None or on_file is not None:
+        index = None  # 缓存中没有单个文件的信息
+    tracker = None
+    if links:
+        index = save_index = None
+        table.own_disk = array("q", [0])
+        table.own_freeable = array("q", [0])
+        tracker = LinkTracker(table)
+    tops = array("q", [-1])  # 每个目录所属的顶层子文件夹编号
+
+    # 深度优先：一个顶层子文件夹的整棵子树会连续处理完再处理下一个
+    # 栈中同时保存路径，目录表本身只记录名称
+    stack = [(0, root)]
+    current_top = -1
+    top_size = 0
+    top_files = 0
+    stopped = False
+
+    while stack:
+        if should_stop():
+            stopped = True
+            break
+
+        idx, path = stack.pop()
+        top = tops[idx]
+        if top != current_top:
+            if current_top > 0 and on_subtree_done is not None:
+                on_subtree_done(table.path(current_top), top_size, top_files)
+            current_top = top
+            top_size = 0
+            top_files = 0
+
+        if index is not None:
+            cached = index.lookup(path[prefix:].lstrip("\\/"), mtimes[idx])
+            if cached is not None:
+                size, count, names, newest = cached
+                for name in names:
+                    child_path = os.path.join(path, name)
+                    try:
+                        child_mtime = os.stat(child_path, follow_symlinks=False).st_mtime_ns
+                    except OSError:
+                        continue
+                    child = table.add_dir(name, idx, child_mtime)
+                    tops.append(child if idx == 0 else top)
+                    stack.append((child, child_path))
+                own_sizes[idx] = size
+                own_files[idx] = count
+                own_newest[idx] = newest
+                top_size += size
+                top_files += count
+                table.reused += 1
+                if progress is not None:
+                    progress.add(size, count)
+                    if progress.due():
+                        progress.report({table.path(top): (top_size, top_files)} if top > 0 else {})
+                continue
+
+        size = 0
+        count = 0
+        disk = 0
+        freeable = 0
+        newest = mtimes[idx]
+        seen = 0
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    seen += 1
+                    if not seen & CANCEL_CHECK_MASK and should_stop():
+                        stopped = True
+                        break
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            mtime = entry.stat(follow_symlinks=False).st_mtime_ns
+                            child = table.add_dir(entry.name, idx, mtime)
+                            tops.append(child if idx == 0 else top)
+                            stack.append((child, entry.path))
+                        elif entry.is_file(follow_symlinks=False):
+                            # 复用DirEntry缓存的stat信息，Windows下不需要额外的系统调用
+                            st = entry.stat(follow_symlinks=False)
+                            if tracker is not None:
+                                if not st.st_nlink:
+                                    # Windows下DirEntry的stat结果没有inode和链接数
+                                    st = os.stat(entry.path, follow_symlinks=False)
+                                file_size, file_disk, file_freeable = tracker.add(idx, st)
+                                disk += file_disk
+                                freeable += file_freeable
+                            else:
+                                file_size = st.st_size
+                            size += file_size
+                            count += 1
+                            if st.st_mtime_ns > newest:
+                                newest = st.st_mtime_ns
+                            if largest is not None:
+                                largest.push(st.st_size, entry.path)
+                            if on_file is not None:
+                                on_file(entry.path, st)
+                    except OSError:
+                        continue
+        except OSError:
+            table.errors += 1
+
+        if stopped:
+            break
+        own_sizes[idx] = size
+        own_files[idx] = count
+        own_newest[idx] = newest
+        if tracker is not None:
+            table.own_disk[idx] = disk
+            table.own_freeable[idx] += freeable  # 子目录中的硬链接可能已经把空间计入这里
+        top_size += size
+        top_files += count
+        if progress is not None:
+            progress.add(size, count)
+            if progress.due():
+                progress.report({table.path(top): (top_size, top_files)} if top > 0 else {})
+
+    if tracker is not None:
+        table.extra_links = tracker.extra_links
+        table.links = tracker
+    if not stopped and current_top > 0 and on_subtree_done is not None:
+        on_subtree_done(table.path(current_top), top_size, top_files)
+
+    table.finish(stopped, save_index)
+    return table
@@ -0,0 +1,153 @@
+import fnmatch
+import json
+import os
+import re
+import time
+
+from scan_engine import parse_size
+from size_index import default_index_path
+
+DAY = 86400
+
+# 内置预设，配置文件不存在时使用
+BUILTIN_PRESETS = [
+    {"name": "小于20MB", "max_size": "20MB"},
+    {"name": "构建缓存", "patterns": ["node_modules", "__pycache__", ".pytest_cache", ".mypy_cache", ".tox"]},
+    {"name": "临时文件夹", "patterns": ["tmp", "temp", "*.tmp", "*.cache"]},
+    {"name": "90天未修改且大于100MB", "min_size": "100MB", "older_than_days": 90},
+]
+
+
+# 规则预设文件的默认位置，与大小索引放在同一目录
+def default_presets_path():
+    return os.path.join(os.path.dirname(default_index_path()), "selection_rules.json")
+
+
+def _and_masks(masks, count):
+    # 每个掩码每行一个0/1字节，转成大整数后按位与，一次完成所有行的合并
+    if not masks:
+        return bytearray([1]) * count
+    combined = int.from_bytes(masks[0], "little")
+    for mask in masks[1:]:
+        combined &= int.from_bytes(mask, "little")
+    return bytearray(combined.to_bytes(count, "little"))
+
+
+class SelectionRule:
+    """一条选择规则，所有设置了的条件同时满足的行才会被选中
+
+    patterns 是名称模式列表，满足任意一个即可：默认为不区分大小写的通配符（如 *.tmp），
+    regex 为True时按正则表达式搜索。大小范围为 [min_size, max_size)；
+    older_than_days 要求整棵子树中最新的修改时间早于若干天前。
+    """
+
+    __slots__ = ("name", "patterns", "regex", "min_size", "max_size", "older_than_days",
+                 "min_files", "max_files")
+
+    def __init__(self, name="", patterns=(), regex=False, min_size=None, max_size=None,
+                 older_than_days=None, min_files=None, max_files=None):
+        self.name = name
+        self.patterns = list(patterns)
+        self.regex = regex
+        self.min_size = min_size
+        self.max_size = max_size
+        self.older_than_days = older_than_days
+        self.min_files = min_files
+        self.max_files = max_files
+
+    @classmethod
+    def from_dict(cls, data):
+        """从配置文件中的一项创建规则，大小可以写成 "20MB" 这样的文字；格式错误时抛出ValueError"""
+        if not isinstance(data, dict):
+            raise ValueError(f"规则必须是对象: {data!r}")
+        unknown = set(data) - set(cls.__slots__)
+        if unknown:
+            raise ValueError(f"未知的规则字段: {', '.join(sorted(unknown))}")
+        values = dict(data)
+        try:
+            for key in ("min_size", "max_size"):
+                if isinstance(values.get(key), str):
+                    values[key] = parse_size(values[key])
+            for key in ("min_size", "max_size", "min_files", "max_files"):
+                if values.get(key) is not None:
+                    values[key] = int(values[key])
+            if values.get("older_than_days") is not None:
+                values["older_than_days"] = float(values["older_than_days"])
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"规则 {data.get('name', '')} 的数值无效: {e}") from e
+        patterns = values.get("patterns", [])
+        if isinstance(patterns, str):
+            values["patterns"] = [patterns]
+        rule = cls(**values)
+        rule.matcher()  # 提前检查正则表达式
+        return rule
+
+    def to_dict(self):
+        data = {"name": self.name}
+        for key in self.__slots__[1:]:
+            value = getattr(self, key)
+            if value not in (None, [], False):
+                data[key] = value
+        return data
+
+    def matcher(self):
+        """返回名称匹配函数，没有名称条件时返回None；正则无效时抛出ValueError"""
+        if not self.patterns:
+            return None
+        if self.regex:
+            source = "|".join(f"(?:{pattern})" for pattern in self.patterns)
+        else:
+            source = "|".join(fnmatch.translate(pattern) for pattern in self.patterns)
+        try:
+            pattern = re.compile(source, re.IGNORECASE)
+        except re.error as e:
+            raise ValueError(f"无效的名称模式: {e}") from e
+        return pattern.search if self.regex else pattern.match
+
+    def mask(self, names, sizes, files, newest, now=None):
+        """对各列整体求值，返回每行一个0/1字节的掩码
+
+        sizes/files 中的负数表示尚未扫描完成，这样的行不会被选中；
+        newest 为秒，0表示未知，设置了 older_than_days 时不选中未知的行。
+        """
+        count = len(names)
+        masks = [bytearray(map((0).__le__, sizes))]
+        match = self.matcher()
+        if match is not None:
+            masks.append(bytearray(map(bool, map(match, names))))
+        if self.min_size is not None:
+            masks.append(bytearray(map(self.min_size.__le__, sizes)))
+        if self.max_size is not None:
+            masks.append(bytearray(map(self.max_size.__gt__, sizes)))
+        if self.min_files is not None:
+            masks.append(bytearray(map(self.min_files.__le__, files)))
+        if self.max_files is not None:
+            masks.append(bytearray(map(self.max_files.__ge__, files)))
+            masks.append(bytearray(map((0).__le__, files)))
+        if self.older_than_days is not None:
+            cutoff = (time.time() if now is None else now) - self.older_than_days * DAY
+            masks.append(bytearray(map(float(cutoff).__gt__, newest)))
+            masks.append(bytearray(map((0.0).__lt__, newest)))
+        return _and_masks(masks, count)
+
+
+# 读取规则预设；文件不存在时返回内置预设，内容无效时抛出ValueError
+def load_presets(path=None):
+    path = path or default_presets_path()
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        data = BUILTIN_PRESETS
+    except json.JSONDecodeError as e:
+        raise ValueError(f"规则文件格式错误: {path}: {e}") from e
+    if not isinstance(data, list):
+        raise ValueError(f"规则文件应为规则列表: {path}")
+    return [SelectionRule.from_dict(item) for item in data]
+
+
+def save_presets(rules, path=None):
+    path = path or default_presets_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump([rule.to_dict() for rule in rules], f, ensure_ascii=False, indent=2)
@@ -0,0 +1,139 @@
+import os
+import sqlite3
+import time
+
+
+# 默认的索引文件位置
+def default_index_path():
+    base = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "FolderCleaner", "size_index.sqlite3")
+
+
+# 打开默认索引，索引不可用（如目录只读）时返回None，扫描退化为完整扫描
+def open_default_index():
+    try:
+        return SizeIndex()
+    except (OSError, sqlite3.Error):
+        return None
+
+
+SCHEMA_VERSION = 1  # dirs 表结构变化时递增，旧索引会被清空
+
+
+def _root_key(root):
+    return os.path.normcase(os.path.abspath(root))
+
+
+class SizeIndex:
+    """持久化的目录大小索引，按扫描根目录分组保存每个目录自身的大小、文件数和修改时间
+
+    目录的修改时间只在其直接子项增删改名时变化，文件内容原地增长不会被发现，
+    需要时可以调用 forget(root) 强制完整重扫。
+    """
+
+    def __init__(self, path=None, max_entries=1_000_000):
+        self.path = path or default_index_path()
+        self.max_entries = max_entries
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.conn = sqlite3.connect(self.path, timeout=30)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS roots (
+                root TEXT PRIMARY KEY,
+                last_scan REAL NOT NULL,
+                entries INTEGER NOT NULL
+            )
+        """)
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            # 索引只是缓存，表结构变化时直接清空旧条目，下次扫描重新建立
+            with self.conn:
+                self.conn.execute("DROP TABLE IF EXISTS dirs")
+                self.conn.execute("DELETE FROM roots")
+            self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS dirs (
+                root TEXT NOT NULL,
+                rel TEXT NOT NULL,
+                mtime INTEGER NOT NULL,
+                own_size INTEGER NOT NULL,
+                own_files INTEGER NOT NULL,
+                children TEXT NOT NULL,
+                newest INTEGER NOT NULL,
+                PRIMARY KEY (root, rel)
+            ) WITHOUT ROWID
+        """)
+        self._root = None
+        self._cache = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def load(self, root):
+        """载入某个根目录的缓存条目，扫描前调用"""
+        self._root = _root_key(root)
+        rows = self.conn.execute(
+            "SELECT rel, mtime, own_size, own_files, children, newest FROM dirs WHERE root = ?",
+            (self._root,),
+        )
+        self._cache = {
+            rel: (mtime, own_size, own_files, children.split("\0") if children else [], newest)
+            for rel, mtime, own_size, own_files, children, newest in rows
+        }
+        return len(self._cache)
+
+    def lookup(self, rel, mtime):
+        """修改时间未变时返回 (自身大小, 文件数, 子文件夹名列表, 最新修改时间)，否则返回None"""
+        cached = self._cache.get(rel)
+        if cached is None or cached[0] != mtime:
+            return None
+        return cached[1], cached[2], cached[3], cached[4]
+
+    def save(self, table):
+        """用一次完整扫描的结果替换该根目录的全部条目，然后按容量上限淘汰旧根目录"""
+        root = _root_key(table.root)
+        children = [[] for _ in range(len(table))]
+        rels = [""]  # 相对于根目录的路径，父目录编号总是更小，可以顺序拼出
+        for i in range(1, len(table)):
+            children[table.parents[i]].append(table.names[i])
+            rels.append(os.path.join(rels[table.parents[i]], table.names[i]))
+
+        rows = (
+            (root, rels[i], table.mtimes[i],
+             table.own_sizes[i], table.own_files[i], "\0".join(children[i]), table.own_newest[i])
+            for i in range(len(table))
+        )
+        with self.conn:
+            self.conn.execute("DELETE FROM dirs WHERE root = ?", (root,))
+            self.conn.executemany("INSERT INTO dirs VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO roots VALUES (?, ?, ?)",
+                (root, time.time(), len(table)),
+            )
+            self._evict(keep=root)
+
+    def forget(self, root):
+        root = _root_key(root)
+        with self.conn:
+            self.conn.execute("DELETE FROM dirs WHERE root = ?", (root,))
+            self.conn.execute("DELETE FROM roots WHERE root = ?", (root,))
+
+    def _evict(self, keep):
+        # 总条目数超过上限时，按最近扫描时间淘汰最久未扫描的根目录
+        total = self.conn.execute("SELECT COALESCE(SUM(entries), 0) FROM roots").fetchone()[0]
+        if total <= self.max_entries:
+            return
+        stale = self.conn.execute(
+            "SELECT root, entries FROM roots WHERE root != ? ORDER BY last_scan", (keep,)
+        ).fetchall()
+        for root, entries in stale:
+            if total <= self.max_entries:
+                break
+            self.conn.execute("DELETE FROM dirs WHERE root = ?", (root,))
+            self.conn.execute("DELETE FROM roots WHERE root = ?", (root,))
+            total -= entries
@@ -0,0 +1,312 @@
+import glob
+import hashlib
+import json
+import mmap
+import os
+import struct
+import time
+import zlib
+from array import array
+
+from scan_engine import TopN, human_readable_size
+from size_index import _root_key, default_index_path
+
+MAGIC = b"FCSNAP01"
+HEADER = struct.Struct("<8sI")  # 魔数, 元数据长度
+ALIGN = 8  # 各列按8字节对齐，未压缩的列可以直接从内存映射中按int64读取
+COLUMNS = ("parents", "sizes", "files", "newest")  # int64列，另有 names 列
+SNAPSHOT_KEEP = 60  # 每个根目录保留的快照数，更早的自动删除
+MIN_RELATIVE_SIZE = 1024 * 1024  # 原大小小于1MB的文件夹不参与按增长比例排名
+
+
+# 快照的默认保存目录，与大小索引放在同一目录
+def default_snapshot_dir():
+    return os.path.join(os.path.dirname(default_index_path()), "snapshots")
+
+
+def _root_prefix(root):
+    return hashlib.sha1(_root_key(root).encode("utf-8", "surrogatepass")).hexdigest()[:12]
+
+
+# 某个根目录已有的快照文件，按时间从旧到新排列
+def list_snapshots(root, directory=None):
+    directory = directory or default_snapshot_dir()
+    return sorted(glob.glob(os.path.join(glob.escape(directory), _root_prefix(root) + "-*.fcsnap")))
+
+
+def _preorder(table):
+    """按先序遍历、同级按名称排序的顺序返回目录编号；这个顺序与按路径各级名称比较的顺序一致"""
+    names = table.names
+    parents = table.parents
+    # 全部目录按名称排序一次，再按父目录分组，各组内自然按名称有序
+    kids = [[] for _ in range(len(names))]
+    for idx in sorted(range(1, len(names)), key=names.__getitem__):
+        kids[parents[idx]].append(idx)
+    order = []
+    stack = [0]
+    while stack:
+        idx = stack.pop()
+        order.append(idx)
+        children = kids[idx]
+        if children:
+            children.reverse()  # 名称最小的最后入栈、最先出栈
+            stack.extend(children)
+    return order
+
+
+# 自动命名的快照文件：时间精确到微秒，文件名的顺序就是时间顺序；先以独占方式创建占住文件名，
+# 同一时刻保存的两个快照不会互相覆盖
+def _reserve_path(directory, prefix):
+    now = time.time()
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(now))
+    micro = int(now % 1 * 1_000_000)
+    while True:
+        path = os.path.join(directory, f"{prefix}-{stamp}-{micro:06d}.fcsnap")
+        try:
+            os.close(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL))
+            return path
+        except FileExistsError:
+            micro += 1
+
+
+# 把一次完整扫描的目录表保存为快照：按列存储，每列单独用zlib压缩；compress为False时
+# 不压缩，载入时各列直接映射到内存，不需要复制。返回快照文件路径
+# path 为None时保存到默认目录，并按 SNAPSHOT_KEEP 删除该根目录最早的快照
+def save_snapshot(table, path=None, compress=True, directory=None):
+    if table.sizes is None:
+        raise ValueError("目录表尚未汇总，无法保存快照")
+    auto = path is None
+    if auto:
+        directory = directory or default_snapshot_dir()
+        os.makedirs(directory, exist_ok=True)
+        path = _reserve_path(directory, _root_prefix(table.root))
+
+    order = _preorder(table)
+    position = array("q", [0]) * len(order)  # 原编号 -> 快照中的编号
+    for new, old in enumerate(order):
+        position[old] = new
+    parents = table.parents
+    data = {
+        "parents": array("q", [-1]) + array("q", map(position.__getitem__, map(parents.__getitem__, order[1:]))),
+        "sizes": array("q", map(table.sizes.__getitem__, order)),
+        "files": array("q", map(table.files.__getitem__, order)),
+        "newest": array("q", map(table.newest.__getitem__, order)),
+    }
+    blobs = {key: column.tobytes() for key, column in data.items()}
+    blobs["names"] = "\0".join(map(table.names.__getitem__, order)).encode("utf-8", "surrogatepass")
+
+    columns = {}
+    offset = 0
+    chunks = []
+    for key, blob in blobs.items():
+        codec = "raw"
+        if compress:
+            blob = zlib.compress(blob, 1)
+            codec = "zlib"
+        pad = -len(blob) % ALIGN
+        columns[key] = {"offset": offset, "length": len(blob), "codec": codec}
+        chunks.append(blob + b"\0" * pad)
+        offset += len(blob) + pad
+    meta = json.dumps({
+        "version": 1, "root": table.root, "created": time.time(), "count": len(order),
+        "complete": table.complete, "columns": columns,
+    }, ensure_ascii=False).encode("utf-8", "surrogatepass")
+    meta += b" " * (-(HEADER.size + len(meta)) % ALIGN)
+
+    tmp = path + ".tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(HEADER.pack(MAGIC, len(meta)))
+            f.write(meta)
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(tmp, path)
+    except BaseException:
+        for leftover in (tmp, path) if auto else (tmp,):
+            try:
+                os.remove(leftover)
+            except OSError:
+                pass
+        raise
+
+    if auto:
+        for stale in list_snapshots(table.root, directory)[:-SNAPSHOT_KEEP]:
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+    return path
+
+
+class Snapshot:
+    """载入的快照，各列为int64序列，names 为名称列表；目录按先序、同级按名称排序
+
+    未压缩的列直接映射到文件上，用完后应调用 close()。
+    """
+
+    __slots__ = ("path", "root", "created", "complete", "parents", "sizes", "files", "newest", "names",
+                 "_mmap", "_file")
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, meta_length = HEADER.unpack_from(self._mmap, 0)
+            if magic != MAGIC:
+                raise ValueError(f"不是快照文件: {path}")
+            meta = json.loads(self._mmap[HEADER.size:HEADER.size + meta_length].decode("utf-8", "surrogatepass"))
+            base = HEADER.size + meta_length
+            self.root = meta["root"]
+            self.created = meta["created"]
+            self.complete = meta["complete"]
+            view = memoryview(self._mmap)
+            for key in COLUMNS:
+                raw = self._column(view, base, meta["columns"][key])
+                setattr(self, key, raw.cast("q") if isinstance(raw, memoryview) else array("q", raw))
+            names = self._column(view, base, meta["columns"]["names"])
+            self.names = bytes(names).decode("utf-8", "surrogatepass").split("\0")
+            if len(self.names) != meta["count"] or len(self.sizes) != meta["count"]:
+                raise ValueError(f"快照文件已损坏: {path}")
+        except (struct.error, KeyError, zlib.error) as e:
+            self.close()
+            raise ValueError(f"快照文件已损坏: {path}: {e}") from e
+        except Exception:
+            self.close()
+            raise
+
+    @staticmethod
+    def _column(view, base, info):
+        data = view[base + info["offset"]:base + info["offset"] + info["length"]]
+        if info["codec"] == "zlib":
+            return zlib.decompress(data)
+        return data
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.names)
+
+    def close(self):
+        # 先释放指向映射的视图，否则映射无法关闭
+        for key in COLUMNS:
+            column = getattr(self, key, None)
+            if isinstance(column, memoryview):
+                column.release()
+            setattr(self, key, None)
+        if getattr(self, "_mmap", None) is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+
+    def path_of(self, idx):
+        parts = []
+        while idx > 0:
+            parts.append(self.names[idx])
+            idx = self.parents[idx]
+        return os.path.join(self.root, *reversed(parts))
+
+    def entries(self, max_depth=None):
+        """按快照顺序逐个产生 (排序键, 编号, 深度)；排序键是以\\0连接的各级名称，
+        两个快照的排序键可以直接比较，用于流式合并"""
+        parents = self.parents
+        names = self.names
+        stack = [(0, "", 0)]  # (编号, 排序键, 深度)
+        yield "", 0, 0
+        for idx in range(1, len(names)):
+            parent = parents[idx]
+            while stack[-1][0] != parent:
+                stack.pop()
+            key = stack[-1][1] + "\0" + names[idx]
+            depth = stack[-1][2] + 1
+            stack.append((idx, key, depth))
+            if max_depth is None or depth <= max_depth:
+                yield key, idx, depth
+
+
+class SnapshotDiff:
+    """两个快照之间的变化，各排名为 [(路径, 旧大小, 新大小)]，按变化从大到小排列"""
+
+    __slots__ = ("old_root", "new_root", "old_created", "new_created", "old_total", "new_total",
+                 "grown", "shrunk", "relative", "added", "removed")
+
+    def lines(self):
+        def row(path, old, new, label=None):
+            # 新增和消失的文件夹按类别标注，不能由大小变化的方向推断（消失的空文件夹两边都是0）
+            ratio = label or (f"{(new - old) / old * 100:+.0f}%" if old > 0 else "—")
+            sign = "-" if new < old or label == "消失" else "+"
+            return (f"{human_readable_size(abs(new - old)):>12} {sign}  {ratio:>7}  "
+                    f"{human_readable_size(old):>10} -> {human_readable_size(new):<10}  {path}")
+
+        change = self.new_total - self.old_total
+        lines = [f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(self.old_created))} -> "
+                 f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(self.new_created))}，"
+                 f"总大小 {human_readable_size(self.old_total)} -> {human_readable_size(self.new_total)}"
+                 f"（{'+' if change >= 0 else '-'}{human_readable_size(abs(change))}）"]
+        for title, items, label in (("增长最多", self.grown, None), ("增长比例最高", self.relative, None),
+                                    ("新增的文件夹", self.added, "新增"), ("减少最多", self.shrunk, None),
+                                    ("消失的文件夹", self.removed, "消失")):
+            if items:
+                lines += ["", f"{title}:"] + [row(*item, label) for item in items]
+        return lines
+
+
+# 流式比较两个快照：两边都按排序键有序，像归并一样同时向前推进，内存占用与快照大小无关
+# （排名只保留前top项）。max_depth 限制参与比较的目录深度，1表示只比较根目录的直接子文件夹
+# 新增和消失的子树只列出最上层的目录，其中的各级子目录紧随其后（先序），不再单独计入
+def diff_snapshots(old, new, top=20, max_depth=None, min_relative_size=MIN_RELATIVE_SIZE):
+    grown, shrunk, relative, added, removed = (TopN(top) for _ in range(5))
+    old_entries = old.entries(max_depth)
+    new_entries = new.entries(max_depth)
+    old_sizes = old.sizes
+    new_sizes = new.sizes
+    end = (None, -1, 0)
+    old_key, old_idx, _ = next(old_entries, end)
+    new_key, new_idx, _ = next(new_entries, end)
+    removed_prefix = added_prefix = None  # 最近一个消失/新增的目录的排序键加分隔符
+    while old_key is not None or new_key is not None:
+        if new_key is None or (old_key is not None and old_key < new_key):
+            if old_idx > 0 and not (removed_prefix and old_key.startswith(removed_prefix)):
+                removed.push(old_sizes[old_idx], (old_idx, -1))
+                removed_prefix = old_key + "\0"
+            old_key, old_idx, _ = next(old_entries, end)
+        elif old_key is None or new_key < old_key:
+            if new_idx > 0 and not (added_prefix and new_key.startswith(added_prefix)):
+                added.push(new_sizes[new_idx], (-1, new_idx))
+                added_prefix = new_key + "\0"
+            new_key, new_idx, _ = next(new_entries, end)
+        else:
+            if new_idx > 0:
+                before = old_sizes[old_idx]
+                change = new_sizes[new_idx] - before
+                if change > 0:
+                    grown.push(change, (old_idx, new_idx))
+                    if before >= min_relative_size:
+                        relative.push(change / before, (old_idx, new_idx))
+                elif change < 0:
+                    shrunk.push(-change, (old_idx, new_idx))
+            old_key, old_idx, _ = next(old_entries, end)
+            new_key, new_idx, _ = next(new_entries, end)
+
+    def resolve(ranking):
+        result = []
+        for (old_idx, new_idx), _ in ranking.items():
+            path = new.path_of(new_idx) if new_idx >= 0 else old.path_of(old_idx)
+            result.append((path, old_sizes[old_idx] if old_idx >= 0 else 0,
+                           new_sizes[new_idx] if new_idx >= 0 else 0))
+        return result
+
+    diff = SnapshotDiff()
+    diff.old_root, diff.new_root = old.root, new.root
+    diff.old_created, diff.new_created = old.created, new.created
+    diff.old_total, diff.new_total = old_sizes[0], new_sizes[0]
+    diff.grown = resolve(grown)
+    diff.shrunk = resolve(shrunk)
+    diff.relative = resolve(relative)
+    diff.added = resolve(added)
+    diff.removed = resolve(removed)
+    return diff
@@ -0,0 +1,40 @@
+import os
+import shutil
+
+from scan_engine import scan_tree
+from snapshot import Snapshot, diff_snapshots, list_snapshots, save_snapshot
+
+
+def _write(path, size):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+
+
+def test_snapshots_in_same_second_do_not_overwrite(tmp_path):
+    root = tmp_path / "root"
+    _write(str(root / "a" / "f"), 10)
+    table = scan_tree(str(root))
+    paths = [save_snapshot(table, directory=str(tmp_path / "snaps")) for _ in range(3)]
+    assert len(set(paths)) == 3
+    assert list_snapshots(str(root), str(tmp_path / "snaps")) == paths
+
+
+def test_diff_lists_only_topmost_added_and_removed(tmp_path):
+    root = tmp_path / "root"
+    snaps = str(tmp_path / "snaps")
+    _write(str(root / "gone" / "x" / "y" / "f"), 5000)
+    _write(str(root / "keep" / "f"), 10)
+    os.makedirs(root / "empty")
+    old_path = save_snapshot(scan_tree(str(root)), directory=snaps)
+    shutil.rmtree(root / "gone")
+    os.rmdir(root / "empty")
+    _write(str(root / "new" / "p" / "q" / "f"), 300)
+    new_path = save_snapshot(scan_tree(str(root)), directory=snaps)
+
+    with Snapshot(old_path) as old, Snapshot(new_path) as new:
+        diff = diff_snapshots(old, new)
+    assert [os.path.basename(path) for path, _, _ in diff.removed] == ["gone", "empty"]
+    assert [os.path.basename(path) for path, _, _ in diff.added] == ["new"]
+    empty_line = next(line for line in diff.lines() if line.endswith(os.sep + "empty"))
+    assert "消失" in empty_line and "新增" not in empty_line
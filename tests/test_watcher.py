@@ -0,0 +1,89 @@
+import os
+
+from delete_engine import delete_trees
+from scan_engine import scan_tree
+from watcher import TreeWatcher
+
+
+def _make_tree(root):
+    for path, size in (("a/b/c/f1", 1000), ("a/b/f2", 200), ("a/f3", 30), ("d/f4", 4)):
+        path = os.path.join(root, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(b"x" * size)
+
+
+def _watch(table):
+    changes = []
+    watcher = TreeWatcher(table, on_change=lambda *args: changes.append(args[3]), use_inotify=False)
+    return watcher, changes
+
+
+def _flush(watcher):
+    # 不启动监视线程，直接重新检查所有目录，相当于监视线程的一次处理
+    watcher._flush(set(watcher.dirs))
+
+
+def _assert_matches_disk(table, root, paths):
+    fresh = scan_tree(root)
+    for path in paths:
+        idx = table.index_of(os.path.join(root, path) if path else root)
+        expected = fresh.index_of(os.path.join(root, path) if path else root)
+        assert (table.sizes[idx], table.files[idx]) == (fresh.sizes[expected], fresh.files[expected]), path
+
+
+def test_delete_then_watcher_flush_counts_once(tmp_path):
+    root = str(tmp_path)
+    _make_tree(root)
+    table = scan_tree(root)
+    watcher, changes = _watch(table)
+
+    # 与图形界面删除完成时相同：从汇总中减去整个文件夹并记为已删除
+    target = os.path.join(root, "a", "b")
+    assert delete_trees([target]).deleted == [target]
+    idx = table.index_of(target)
+    table.discount(idx, table.sizes[idx], table.files[idx])
+    removed = {idx}
+
+    _flush(watcher)
+    for deltas in changes:
+        table.apply_deltas(deltas, skip=removed)
+
+    assert table.sizes[idx] == 0
+    _assert_matches_disk(table, root, ["", "a", "d"])
+
+
+def test_watcher_flush_during_delete_then_discount(tmp_path):
+    root = str(tmp_path)
+    _make_tree(root)
+    table = scan_tree(root)
+    watcher, changes = _watch(table)
+
+    # 删除进行中监视线程已经处理过一次，删除完成时再减去剩余部分
+    target = os.path.join(root, "a", "b")
+    delete_trees([target])
+    _flush(watcher)
+    for deltas in changes:
+        table.apply_deltas(deltas)
+    idx = table.index_of(target)
+    table.discount(idx, table.sizes[idx], table.files[idx])
+
+    _assert_matches_disk(table, root, ["", "a", "d"])
+
+
+def test_apply_deltas_below_table_uses_nearest_ancestor(tmp_path):
+    root = str(tmp_path)
+    _make_tree(root)
+    table = scan_tree(root)
+    watcher, changes = _watch(table)
+
+    os.makedirs(os.path.join(root, "a", "new", "deep"))
+    with open(os.path.join(root, "a", "new", "deep", "f5"), "wb") as f:
+        f.write(b"x" * 5000)
+    with open(os.path.join(root, "a", "b", "c", "f1"), "ab") as f:
+        f.write(b"x" * 10)
+    _flush(watcher)
+    for deltas in changes:
+        table.apply_deltas(deltas)
+
+    _assert_matches_disk(table, root, ["", "a", "a/b", "a/b/c", "d"])
@@ -0,0 +1,157 @@
+import threading
+import time
+import traceback
+from collections import deque
+
+FRAME_BUDGET = 0.008  # 每次处理最多占用8ms，其余时间留给输入事件和重绘
+CHUNK = 256  # 每处理这么多行大小更新检查一次是否超出预算
+BUSY_INTERVAL = 1  # 还有积压时1ms后继续，中间先让出事件循环处理输入(ms)
+ACTIVE_INTERVAL = 16  # 刚处理过更新、队列暂时为空时的检查间隔(ms)
+IDLE_TICKS = 8  # 连续这么多次没有更新后停止检查，直到有新的更新唤醒
+SLEEP_POLL = 500  # 休眠时的兜底检查间隔(ms)，防止唤醒失败时更新一直得不到处理
+
+_SIZES = 0
+_CALL = 1
+
+
+class UIScheduler:
+    """后台线程向界面提交更新的调度器，取代固定间隔轮询的通用消息队列
+
+    大小更新在提交时就按行合并：连续提交的大小更新放在同一批中，同一行只保留最新的一次，
+    最终结果不会被之后的部分结果覆盖；状态文字只保留最新的一条。其他更新 (func, args, kwargs)
+    按提交顺序执行，在它之前提交的大小更新总是先被应用。
+
+    每次处理按耗时而不是条数限制，超过 budget 秒就让出事件循环，有积压时1ms后继续，
+    队列空闲后逐渐停止检查，新的提交会唤醒它。generation 不是当前代号的提交会被丢弃，
+    generation 为None的提交总是执行。
+
+    after(ms, func) 用于安排下一次处理，在界面线程之外调用时依赖Tcl的线程支持；
+    apply_sizes({行号: (大小, 文件数, 是否为部分结果)}) 和 set_status(文字) 在界面线程中调用。
+    """
+
+    def __init__(self, after, apply_sizes, set_status, budget=FRAME_BUDGET):
+        self.after = after
+        self.apply_sizes = apply_sizes
+        self.set_status = set_status
+        self.budget = budget
+        self.generation = 0
+        self.ticks = 0  # 处理次数，用于性能测试
+        self._lock = threading.Lock()
+        self._entries = deque()  # [_SIZES, 代号, {行号: ...}] 或 [_CALL, 代号, func, args, kwargs]
+        self._status = None  # (代号, 文字)
+        self._sleeping = False
+        self._idle_ticks = 0
+        self._chain = 0  # 当前有效的处理链编号，唤醒时递增，旧链上的处理直接退出
+
+    def start(self):
+        self.after(ACTIVE_INTERVAL, self._tick_chain(self._chain))
+
+    def post_size(self, generation, row, size, files, partial=False):
+        with self._lock:
+            entries = self._entries
+            if entries and entries[-1][0] == _SIZES and entries[-1][1] == generation:
+                sizes = entries[-1][2]
+            else:
+                sizes = {}
+                entries.append([_SIZES, generation, sizes])
+            if partial and row in sizes and not sizes[row][2]:
+                return  # 最终结果优先于部分结果
+            sizes[row] = (size, files, partial)
+            wake = self._wake_locked()
+        if wake:
+            self._wake()
+
+    def post_status(self, generation, text):
+        with self._lock:
+            self._status = (generation, text)
+            wake = self._wake_locked()
+        if wake:
+            self._wake()
+
+    def post(self, generation, func, *args, **kwargs):
+        with self._lock:
+            self._entries.append([_CALL, generation, func, args, kwargs])
+            wake = self._wake_locked()
+        if wake:
+            self._wake()
+
+    def pending(self):
+        """尚未处理的更新数（大小更新按行计）"""
+        with self._lock:
+            return sum(len(entry[2]) if entry[0] == _SIZES else 1 for entry in self._entries)
+
+    def _wake_locked(self):
+        if not self._sleeping:
+            return False
+        self._sleeping = False
+        return True
+
+    def _wake(self):
+        with self._lock:
+            self._chain += 1
+            chain = self._chain
+        try:
+            self.after(0, self._tick_chain(chain))
+        except RuntimeError:
+            # Tcl不支持从其他线程调用时恢复原来的处理链，由休眠时的兜底检查处理
+            with self._lock:
+                if self._chain == chain:
+                    self._chain -= 1
+
+    def _tick_chain(self, chain):
+        return lambda: self._tick(chain)
+
+    def _stale(self, generation):
+        return generation is not None and generation != self.generation
+
+    def _tick(self, chain):
+        if chain != self._chain:
+            return  # 已被唤醒时启动的新处理链取代
+        self.ticks += 1
+        deadline = time.perf_counter() + self.budget
+        worked = False
+        while True:
+            with self._lock:
+                if not self._entries:
+                    break
+                entry = self._entries[0]
+                if entry[0] == _SIZES:
+                    sizes = entry[2]
+                    count = min(CHUNK, len(sizes))
+                    batch = dict(sizes.popitem() for _ in range(count))
+                    if not sizes:
+                        self._entries.popleft()
+                else:
+                    self._entries.popleft()
+            worked = True
+            if not self._stale(entry[1]):
+                if entry[0] == _SIZES:
+                    self.apply_sizes(batch)
+                else:
+                    try:
+                        entry[2](*entry[3], **entry[4])
+                    except Exception:
+                        # 一个回调出错不应让后面的更新停下来，但错误要留下记录
+                        traceback.print_exc()
+            if time.perf_counter() >= deadline:
+                break
+
+        with self._lock:
+            status, self._status = self._status, None
+            backlog = bool(self._entries)
+            if status is not None or backlog:
+                worked = True
+            self._idle_ticks = 0 if worked else self._idle_ticks + 1
+            if not backlog and self._idle_ticks >= IDLE_TICKS:
+                self._sleeping = True
+        if status is not None and not self._stale(status[0]):
+            self.set_status(status[1])
+
+        # 继续本处理链；休眠期间被唤醒时新链会取代它
+        if backlog:
+            delay = BUSY_INTERVAL
+        elif self._sleeping:
+            delay = SLEEP_POLL
+        else:
+            delay = ACTIVE_INTERVAL
+        self.after(delay, self._tick_chain(chain))
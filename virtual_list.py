@@ -0,0 +1,171 @@
+import os
+
+import customtkinter as ctk
+
+ROW_HEIGHT = 32  # 每行占用的像素高度
+
+
+# 截断长文件夹名
+def truncate_path(path, max_length=30):
+    basename = os.path.basename(path)
+    if len(basename) <= max_length:
+        return basename
+
+    # 截断名称，保留开头和结尾
+    half = (max_length - 3) // 2
+    return basename[:half] + "..." + basename[-half:]
+
+
+class VirtualList(ctk.CTkFrame):
+    """虚拟化的结果列表，只为可见的行创建控件，滚动时复用这些控件显示其他行
+
+    数据和选择状态都保存在 ResultModel 中，控件数量只取决于窗口高度。
+    """
+
+    def __init__(self, master, model, on_open=None, on_drill=None, **kwargs):
+        super().__init__(master, **kwargs)
+        self.model = model
+        self.on_open = on_open
+        self.on_drill = on_drill  # 点击行尾的箭头时展开该文件夹的下一级
+        self.first = 0  # 第一个可见行在显示顺序中的位置
+        self.slots = []  # 每个槽位 (row_frame, checkbox, folder_label, size_label)
+        self.slot_rows = []  # 每个槽位当前显示的行号，-1表示空闲
+        self.slot_content = []  # 每个槽位已显示的 [名称, 大小文字, 是否选中]，内容不变时不调用Tk
+
+        self.grid_rowconfigure(0, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+        self.body = ctk.CTkFrame(self, fg_color="transparent")
+        self.body.grid(row=0, column=0, sticky="nsew")
+        self.scrollbar = ctk.CTkScrollbar(self, command=self._on_scrollbar)
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+
+        self.body.bind("<Configure>", self._on_resize)
+        self._bind_wheel(self.body)
+
+    def _bind_wheel(self, widget):
+        widget.bind("<MouseWheel>", self._on_wheel)
+        widget.bind("<Button-4>", lambda e: self.scroll(-3))
+        widget.bind("<Button-5>", lambda e: self.scroll(3))
+
+    def _make_slot(self, i):
+        row_frame = ctk.CTkFrame(self.body)
+        row_frame.grid_columnconfigure(1, weight=1)
+
+        checkbox = ctk.CTkCheckBox(row_frame, text="", width=20, height=20,
+                                   command=lambda: self._on_check(i))
+        checkbox.grid(row=0, column=0, padx=5)
+
+        folder_label = ctk.CTkLabel(row_frame, text="", anchor="w", cursor="hand2")
+        folder_label.grid(row=0, column=1, sticky="w", padx=5)
+        # 点击时通过槽位找到当前显示的行，滚动和排序后无需重新绑定
+        folder_label.bind("<Button-1>", lambda e: self._on_click(i))
+
+        size_label = ctk.CTkLabel(row_frame, text="")
+        size_label.grid(row=0, column=2, sticky="e", padx=5)
+
+        if self.on_drill is not None:
+            drill_button = ctk.CTkButton(row_frame, text="›", width=24, height=20,
+                                         command=lambda: self._on_drill(i))
+            drill_button.grid(row=0, column=3, padx=(0, 5))
+
+        for widget in (row_frame, folder_label, size_label):
+            self._bind_wheel(widget)
+        return row_frame, checkbox, folder_label, size_label
+
+    def _on_resize(self, event):
+        visible = max(1, event.height // ROW_HEIGHT + 1)
+        while len(self.slots) < visible:
+            self.slots.append(self._make_slot(len(self.slots)))
+            self.slot_rows.append(-1)
+            self.slot_content.append([None, None, None])
+        while len(self.slots) > visible:
+            self.slots.pop()[0].destroy()
+            self.slot_rows.pop()
+            self.slot_content.pop()
+        self.refresh()
+
+    def _visible_rows(self):
+        return max(1, self.body.winfo_height() // ROW_HEIGHT)
+
+    def refresh(self):
+        """重新绘制所有可见行，只有内容变化的控件会被更新"""
+        count = len(self.model.order)
+        self.first = max(0, min(self.first, count - self._visible_rows()))
+        for i in range(len(self.slots)):
+            self._render_slot(i)
+        if count:
+            self.scrollbar.set(self.first / count, min(1.0, (self.first + self._visible_rows()) / count))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def refresh_rows(self, rows):
+        """只重绘当前可见的、数据发生变化的行"""
+        rows = set(rows)
+        for i, row in enumerate(self.slot_rows):
+            if row in rows:
+                self._render_slot(i)
+
+    def _render_slot(self, i):
+        row_frame, checkbox, folder_label, size_label = self.slots[i]
+        pos = self.first + i
+        if pos >= len(self.model.order):
+            if self.slot_rows[i] != -1:
+                row_frame.place_forget()
+                self.slot_rows[i] = -1
+            return
+
+        row = self.model.order[pos]
+        if self.slot_rows[i] == -1:
+            # CTk控件的place不接受width/height，行高由控件内容决定
+            row_frame.place(x=0, y=i * ROW_HEIGHT, relwidth=1.0)
+        self.slot_rows[i] = row
+
+        content = self.slot_content[i]
+        name = truncate_path(self.model.name(row))
+        if content[0] != name:
+            folder_label.configure(text=name)
+            content[0] = name
+        size_text = self.model.size_text(row)
+        if content[1] != size_text:
+            size_label.configure(text=size_text)
+            content[1] = size_text
+        checked = self.model.selected[row]
+        if content[2] != checked:
+            if checked:
+                checkbox.select()
+            else:
+                checkbox.deselect()
+            content[2] = checked
+
+    def scroll(self, delta):
+        self.first += delta
+        self.refresh()
+
+    def _on_wheel(self, event):
+        # Windows下每格滚轮delta为120
+        self.scroll(-3 if event.delta > 0 else 3)
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.first = int(float(amount) * len(self.model.order))
+            self.refresh()
+        elif unit == "pages":
+            self.scroll(int(amount) * self._visible_rows())
+        else:
+            self.scroll(int(amount))
+
+    def _on_check(self, i):
+        row = self.slot_rows[i]
+        if row != -1:
+            self.model.selected[row] = 1 if self.slots[i][1].get() else 0
+            self.slot_content[i][2] = self.model.selected[row]
+
+    def _on_drill(self, i):
+        row = self.slot_rows[i]
+        if row != -1:
+            self.on_drill(self.model.path(row))
+
+    def _on_click(self, i):
+        row = self.slot_rows[i]
+        if row != -1 and self.on_open is not None:
+            self.on_open(self.model.path(row))
@@ -0,0 +1,343 @@
+import ctypes
+import os
+import select
+import struct
+import threading
+import time
+
+from scan_engine import scan_tree
+
+DEBOUNCE = 0.5  # 最后一个事件之后静默这么久才处理
+MAX_DELAY = 3.0  # 持续有事件时最多攒这么久也要处理一次
+POLL_INTERVAL = 5.0  # 轮询模式下检查目录修改时间的间隔
+
+# inotify 事件掩码，见 <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONTFOLLOW = 0x02000000
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE
+              | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR | IN_DONTFOLLOW)
+EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+class _Inotify:
+    """通过ctypes调用的最小inotify封装，只在Linux下可用"""
+
+    def __init__(self):
+        self.libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+
+    def add_watch(self, path):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            code = ctypes.get_errno()
+            raise OSError(code, os.strerror(code), path)
+        return wd
+
+    def rm_watch(self, wd):
+        self.libc.inotify_rm_watch(self.fd, wd)
+
+    def read(self, timeout):
+        """等待最多timeout秒，返回 [(wd, mask)]"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            events.append((wd, mask))
+            offset += EVENT_HEADER.size + length
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class _DirState:
+    __slots__ = ("own_size", "own_files", "mtime", "top", "children", "wd")
+
+    def __init__(self, own_size, own_files, mtime, top):
+        self.own_size = own_size
+        self.own_files = own_files
+        self.mtime = mtime
+        self.top = top  # 所属的顶层子文件夹路径，根目录本身为None
+        self.children = set()  # 子目录名
+        self.wd = -1
+
+
+class TreeWatcher:
+    """扫描完成后监视目录树的变化，增量更新各顶层子文件夹的大小，不需要重新扫描
+
+    Linux下使用inotify，只有收到事件的目录才会被重新列出；其他平台或inotify不可用
+    （如监视数量超过 max_user_watches）时退回到定期检查目录修改时间的轮询模式。
+    事件先合并成需要重新列出的目录集合，静默 debounce 秒或累计 max_delay 秒后才统一处理，
+    大量连续事件（如 git checkout）只会产生少数几次回调。
+
+    on_change(变化的顶层子文件夹 {路径: (大小, 文件数)}, 新增的顶层子文件夹, 消失的顶层子文件夹,
+    各目录的变化 {路径: (大小差值, 文件数差值)}) 在监视线程中调用；差值记在大小变化的目录、
+    新出现或消失的子树的根上，需要累加到它（或它在原目录表中最近的上级）和所有上级目录。
+    should_stop() 返回True时停止监视。
+    """
+
+    def __init__(self, table, on_change, should_stop=None, debounce=DEBOUNCE, max_delay=MAX_DELAY,
+                 poll_interval=POLL_INTERVAL, use_inotify=True):
+        self.root = table.root
+        self.on_change = on_change
+        self.should_stop = should_stop
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.dirs = {}  # 目录路径 -> _DirState
+        self.totals = {}  # 顶层子文件夹路径 -> [大小, 文件数]
+        self.by_wd = {}  # inotify监视描述符 -> 目录路径
+        self.inotify = None
+        self.backend = "poll"
+        self._stopped = False
+        self._thread = None
+        self._deltas = {}  # 本次处理中各目录的 [大小差值, 文件数差值]
+        self._load(table)
+        if use_inotify and os.name == "posix" and hasattr(select, "select"):
+            self._start_inotify()
+
+    def _load(self, table):
+        paths = table.all_paths()
+        parents = table.parents
+        tops = [None] * len(paths)
+        for i in range(len(paths)):
+            parent = parents[i]
+            if parent == 0:
+                tops[i] = paths[i]
+                self.totals[paths[i]] = [0, 0]
+            elif parent > 0:
+                tops[i] = tops[parent]
+            self.dirs[paths[i]] = _DirState(table.own_sizes[i], table.own_files[i], table.mtimes[i], tops[i])
+            if parent >= 0:
+                self.dirs[paths[parent]].children.add(os.path.basename(paths[i]))
+            if tops[i] is not None:
+                total = self.totals[tops[i]]
+                total[0] += table.own_sizes[i]
+                total[1] += table.own_files[i]
+
+    def _start_inotify(self):
+        try:
+            self.inotify = _Inotify()
+            for path, state in self.dirs.items():
+                self._watch(path, state)
+        except (OSError, AttributeError):
+            # 监视数量超出系统限制（ENOSPC）或平台没有inotify时使用轮询
+            if self.inotify is not None:
+                self.inotify.close()
+                self.inotify = None
+            self.by_wd.clear()
+            for state in self.dirs.values():
+                state.wd = -1
+            return
+        self.backend = "inotify"
+
+    def _watch(self, path, state):
+        try:
+            state.wd = self.inotify.add_watch(path)
+        except (FileNotFoundError, PermissionError):
+            return  # 目录已经被删除（父目录的事件会处理它）或无权读取
+        self.by_wd[state.wd] = path
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="tree-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped = True
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive() and not self._stopping()
+
+    def _stopping(self):
+        return self._stopped or (self.should_stop is not None and self.should_stop())
+
+    def _run(self):
+        dirty = set()
+        first_event = last_event = 0.0
+        next_poll = time.monotonic() + self.poll_interval
+        try:
+            while not self._stopping():
+                now = time.monotonic()
+                if self.inotify is not None:
+                    events = self.inotify.read(0.2)
+                    for wd, mask in events:
+                        if mask & IN_Q_OVERFLOW:
+                            dirty.update(self.dirs)  # 事件丢失，全部重新检查
+                            continue
+                        path = self.by_wd.get(wd)
+                        if path is None:
+                            continue
+                        if mask & IN_IGNORED:
+                            self.by_wd.pop(wd, None)
+                            continue
+                        dirty.add(path)
+                    new_events = bool(events)
+                else:
+                    time.sleep(0.2)
+                    new_events = False
+                    if now >= next_poll:
+                        dirty.update(self._poll())
+                        next_poll = time.monotonic() + self.poll_interval
+                        new_events = bool(dirty)
+                now = time.monotonic()
+                if new_events:
+                    if not first_event:
+                        first_event = now
+                    last_event = now
+                if dirty and (now - last_event >= self.debounce or now - first_event >= self.max_delay):
+                    self._flush(dirty)
+                    dirty = set()
+                    first_event = last_event = 0.0
+        finally:
+            if self.inotify is not None:
+                self.inotify.close()
+                self.inotify = None
+
+    def _poll(self):
+        """轮询模式：修改时间变化的目录需要重新列出，无法察觉文件原地增长"""
+        changed = []
+        for path, state in self.dirs.items():
+            if self._stopping():
+                break
+            try:
+                mtime = os.stat(path, follow_symlinks=False).st_mtime_ns
+            except OSError:
+                changed.append(path)
+                continue
+            if mtime != state.mtime:
+                changed.append(path)
+        return changed
+
+    def _flush(self, dirty):
+        changed = set()
+        added = []
+        removed = []
+        self._deltas = {}
+        # 先处理上层目录，被删除的子树中的目录不必再单独处理
+        for path in sorted(dirty, key=len):
+            if path in self.dirs:
+                self._refresh(path, changed, added, removed)
+        if changed or added or removed:
+            totals = {top: tuple(self.totals[top]) for top in changed if top in self.totals}
+            deltas = {path: tuple(delta) for path, delta in self._deltas.items() if delta[0] or delta[1]}
+            self.on_change(totals, added, removed, deltas)
+
+    def _delta(self, path, size, files):
+        delta = self._deltas.setdefault(path, [0, 0])
+        delta[0] += size
+        delta[1] += files
+
+    def _refresh(self, path, changed, added, removed):
+        """重新列出一个目录，把自身大小的差值累加到所属顶层子文件夹"""
+        state = self.dirs[path]
+        size = 0
+        count = 0
+        subdirs = set()
+        try:
+            mtime = os.stat(path, follow_symlinks=False).st_mtime_ns
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.add(entry.name)
+                        elif entry.is_file(follow_symlinks=False):
+                            size += entry.stat(follow_symlinks=False).st_size
+                            count += 1
+                    except OSError:
+                        continue
+        except OSError:
+            if path != self.root:
+                self._remove(path, changed, removed)
+            return
+
+        state.mtime = mtime
+        if size != state.own_size or count != state.own_files:
+            self._delta(path, size - state.own_size, count - state.own_files)
+            if state.top is not None:
+                total = self.totals[state.top]
+                total[0] += size - state.own_size
+                total[1] += count - state.own_files
+                changed.add(state.top)
+        state.own_size = size
+        state.own_files = count
+
+        for name in state.children - subdirs:
+            self._remove(os.path.join(path, name), changed, removed)
+        for name in subdirs - state.children:
+            self._add(os.path.join(path, name), state.top, changed, added)
+
+    def _add(self, path, top, changed, added):
+        """新出现的子目录：扫描整棵子树并开始监视"""
+        table = scan_tree(path, should_stop=self._stopping)
+        if top is None:
+            top = path
+            self.totals[top] = [0, 0]
+            added.append(path)
+        total = self.totals[top]
+        self._delta(path, table.sizes[0], table.files[0])
+        paths = table.all_paths()
+        for i in range(len(table)):
+            child = paths[i]
+            state = _DirState(table.own_sizes[i], table.own_files[i], table.mtimes[i], top)
+            self.dirs[child] = state
+            parent = table.parents[i]
+            parent_path = paths[parent] if parent >= 0 else os.path.dirname(path)
+            self.dirs[parent_path].children.add(os.path.basename(child))
+            total[0] += state.own_size
+            total[1] += state.own_files
+            if self.inotify is not None:
+                self._watch(child, state)
+        changed.add(top)
+
+    def _remove(self, path, changed, removed):
+        """子目录消失：从所属顶层子文件夹中减去整棵子树"""
+        state = self.dirs.pop(path, None)
+        if state is None:
+            return
+        parent = self.dirs.get(os.path.dirname(path))
+        if parent is not None:
+            parent.children.discard(os.path.basename(path))
+        stack = [(path, state)]
+        while stack:
+            current, current_state = stack.pop()
+            self._delta(path, -current_state.own_size, -current_state.own_files)
+            if current_state.wd >= 0 and self.inotify is not None:
+                self.by_wd.pop(current_state.wd, None)
+                self.inotify.rm_watch(current_state.wd)
+            if current_state.top is not None and current_state.top in self.totals:
+                total = self.totals[current_state.top]
+                total[0] -= current_state.own_size
+                total[1] -= current_state.own_files
+            for name in current_state.children:
+                child = os.path.join(current, name)
+                child_state = self.dirs.pop(child, None)
+                if child_state is not None:
+                    stack.append((child, child_state))
+        if state.top == path:
+            del self.totals[path]
+            removed.append(path)
+            changed.discard(path)
+        elif state.top is not None:
+            changed.add(state.top)